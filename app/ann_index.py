@@ -0,0 +1,269 @@
+import os
+import json
+import math
+import time
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+from adalflow.utils import printc
+
+from app.telemetry import span
+from app.vector_store import VectorStore
+
+# Index kinds and what they trade: exact search, inverted lists, graph, and compressed codes;
+# "matrix" is exact search straight over the store's (possibly int8) matrix, without a copy
+INDEX_KINDS = ("flat", "matrix", "ivf", "hnsw", "ivfpq", "sq8", "ivfsq8")
+
+INDEX_FILE = "index.faiss"
+INDEX_META_FILE = "index.json"
+
+
+# Number of IVF lists: ~4*sqrt(n), with at least 39 training points per list as faiss recommends
+def _nlist(n: int, cfg: Dict[str, Any]) -> int:
+    return max(1, min(cfg.get("nlist") or int(4 * math.sqrt(n)), n // 39))
+
+
+# Largest number of PQ sub-quantizers <= the configured one that divides the dimension
+def _pq_m(dim: int, cfg: Dict[str, Any]) -> int:
+    m = min(cfg.get("pq_m", 32), dim)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def factory_string(kind: str, n: int, dim: int, cfg: Dict[str, Any]) -> str:
+    """faiss.index_factory description for `kind` sized for `n` vectors; small inputs fall back to Flat."""
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index kind {kind!r}; expected one of {INDEX_KINDS}")
+    if kind == "matrix":
+        return "Matrix"
+    if kind == "flat" or n < cfg.get("min_vectors", 0):
+        return "Flat"
+    if kind == "ivf":
+        return f"IVF{_nlist(n, cfg)},Flat"
+    if kind == "hnsw":
+        return f"HNSW{cfg.get('hnsw_m', 32)},Flat"
+    if kind == "ivfpq":
+        if n < 1 << cfg.get("pq_bits", 8):
+            return "Flat"  # too few vectors to train the PQ codebooks
+        return f"IVF{_nlist(n, cfg)},PQ{_pq_m(dim, cfg)}x{cfg.get('pq_bits', 8)}"
+    if kind == "sq8":
+        return "SQ8"
+    return f"IVF{_nlist(n, cfg)},SQ8"
+
+
+# Copy of the matrix as unit-length float32 rows, so inner product is cosine similarity
+def normalized(vectors: np.ndarray) -> np.ndarray:
+    xb = np.array(vectors, dtype=np.float32, copy=True)
+    faiss.normalize_L2(xb)
+    return xb
+
+
+# Best `k` (scores, ids) per row of `scores`, best first; `ids` maps columns to row ids when given
+def _top_k(scores: np.ndarray, k: int, ids: Optional[np.ndarray] = None):
+    found = min(k, scores.shape[1])
+    D = np.full((len(scores), k), -np.inf, dtype=np.float32)
+    I = np.full((len(scores), k), -1, dtype=np.int64)
+    if found:
+        top = np.argpartition(-scores, found - 1, axis=1)[:, :found]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        D[:, :found] = np.take_along_axis(top_scores, order, axis=1)
+        I[:, :found] = top if ids is None else np.take_along_axis(ids, top, axis=1)
+    return D, I
+
+
+class MatrixIndex:
+    """Exact inner-product search over a vector matrix in place, duck-typing `faiss.Index`.
+
+    Only what the retriever uses is provided: `search`, `ntotal` and `d`.
+    The matrix is typically the store's memory map, in float32, float16 or
+    int8, so the index holds no copy of it, only each row's inverse norm;
+    pages are shared between processes through the OS page cache. Rows are
+    widened to float32 a block at a time for the BLAS product, and top-k is
+    taken with argpartition. An int8 row's scale cancels out of the cosine.
+    int8 searches about as fast as float32; numpy widens float16 slowly.
+
+    With `coarse_dims` set (see `set_coarse`), search is coarse-to-fine:
+    a resident copy of each row's leading dimensions is searched for
+    `coarse_candidates` rows, which are then rescored at full dimension.
+    This suits Matryoshka embeddings, whose prefixes are embeddings too.
+    """
+
+    def __init__(self, vectors: np.ndarray, block_rows: int = 0):
+        self.vectors = vectors
+        self.ntotal, self.d = vectors.shape
+        # ~512 KB of float32 per block: widened rows stay in cache for the product
+        self.block_rows = block_rows or max(64, (1 << 17) // max(1, self.d))
+        self.inv_norms = self._inv_norms(vectors)
+        self.coarse_dims = 0
+        self.coarse_candidates = 0
+        self.coarse: Optional[np.ndarray] = None
+        self.coarse_inv_norms: Optional[np.ndarray] = None
+
+    def _blocks(self, matrix: np.ndarray):
+        for start in range(0, len(matrix), self.block_rows):
+            yield start, np.asarray(matrix[start:start + self.block_rows], dtype=np.float32)
+
+    def _inv_norms(self, matrix: np.ndarray) -> np.ndarray:
+        inv_norms = np.empty(len(matrix), dtype=np.float32)
+        for start, block in self._blocks(matrix):
+            norms = np.sqrt(np.einsum("ij,ij->i", block, block))
+            inv_norms[start:start + len(block)] = 1 / np.where(norms == 0, 1, norms)
+        return inv_norms
+
+    # Cosine scores of every row of `matrix` against the queries
+    def _scores(self, xq: np.ndarray, matrix: np.ndarray, inv_norms: np.ndarray) -> np.ndarray:
+        scores = np.empty((len(xq), len(matrix)), dtype=np.float32)
+        for start, block in self._blocks(matrix):
+            np.matmul(xq, block.T, out=scores[:, start:start + len(block)])
+        scores *= inv_norms
+        return scores
+
+    def set_coarse(self, dims: int, candidates: int):
+        """Search the first `dims` dimensions for `candidates` rows before rescoring; 0 (or >= d) turns it off."""
+        dims = dims if 0 < dims < self.d else 0
+        if dims != self.coarse_dims:
+            self.coarse = np.ascontiguousarray(self.vectors[:, :dims]) if dims else None
+            self.coarse_inv_norms = self._inv_norms(self.coarse) if dims else None
+            self.coarse_dims = dims
+        self.coarse_candidates = candidates
+
+    def search(self, xq: np.ndarray, k: int):
+        """(scores, ids) of the `k` best rows per query, padded with -1 ids like faiss."""
+        xq = np.ascontiguousarray(xq, dtype=np.float32).reshape(-1, self.d)
+        if not self.coarse_dims:
+            return _top_k(self._scores(xq, self.vectors, self.inv_norms), k)
+        scores = self._scores(np.ascontiguousarray(xq[:, :self.coarse_dims]), self.coarse, self.coarse_inv_norms)
+        fetch = min(max(k, self.coarse_candidates), self.ntotal)
+        candidates = _top_k(scores, fetch)[1]
+        # Rescore each query's candidates at full dimension, reading only those rows
+        rescored = np.empty(candidates.shape, dtype=np.float32)
+        for q, ids in enumerate(candidates):
+            rescored[q] = np.asarray(self.vectors[ids], dtype=np.float32) @ xq[q] * self.inv_norms[ids]
+        return _top_k(rescored, k, candidates)
+
+
+def set_search_params(index: faiss.Index, cfg: Dict[str, Any]):
+    """Apply query-time knobs (IVF nprobe, HNSW efSearch, matrix coarse-to-fine search) from config."""
+    if isinstance(index, MatrixIndex):
+        index.set_coarse(cfg.get("coarse_dims", 0), cfg.get("coarse_candidates", 200))
+        return
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(cfg.get("nprobe", 16), ivf.nlist)
+    hnsw = faiss.downcast_index(index)
+    if isinstance(hnsw, faiss.IndexHNSW):
+        hnsw.hnsw.efSearch = cfg.get("ef_search", 64)
+
+
+def build_index(vectors: np.ndarray, kind: str, cfg: Dict[str, Any]) -> faiss.Index:
+    """Build an inner-product index over `vectors`, training on a random sample when the kind needs it."""
+    n, dim = vectors.shape
+    spec = factory_string(kind, n, dim, cfg)
+    if spec == "Matrix":
+        index = MatrixIndex(vectors)
+        set_search_params(index, cfg)
+        return index
+    started = time.perf_counter()
+    xb = normalized(vectors)
+    index = faiss.index_factory(dim, spec, faiss.METRIC_INNER_PRODUCT)
+    hnsw = faiss.downcast_index(index)
+    if isinstance(hnsw, faiss.IndexHNSW):
+        hnsw.hnsw.efConstruction = cfg.get("ef_construction", 80)
+    if not index.is_trained:
+        sample_size = min(n, cfg.get("train_size", 100_000))
+        sample = np.random.default_rng(0).choice(n, size=sample_size, replace=False)
+        index.train(xb[np.sort(sample)])
+    index.add(xb)
+    set_search_params(index, cfg)
+    printc(f"Built {spec} index over {n} vectors in {time.perf_counter() - started:.2f}s", color="blue")
+    return index
+
+
+def is_flat(index: faiss.Index) -> bool:
+    """Flat-code indexes use row positions as ids, so they can be patched in place by `remove_ids`/`add`."""
+    return not isinstance(index, MatrixIndex) and isinstance(faiss.downcast_index(index), faiss.IndexFlatCodes)
+
+
+def index_nbytes(index: faiss.Index) -> int:
+    """Approximate resident size of an index, for memory budgeting."""
+    if isinstance(index, MatrixIndex):
+        if index.coarse_dims:
+            # Full rows are only read for the candidates being rescored
+            return index.coarse.nbytes + index.coarse_inv_norms.nbytes + index.inv_norms.nbytes
+        return index.vectors.nbytes + index.inv_norms.nbytes
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        links = index.hnsw.nb_neighbors(0) * 4
+        return index.ntotal * (faiss.downcast_index(index.storage).sa_code_size() + links)
+    ids = 8 if faiss.try_extract_index_ivf(index) is not None else 0
+    return index.ntotal * (index.sa_code_size() + ids)
+
+
+# Build-time settings that shape an index but not its factory string
+def _build_params(spec: str, cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {"ef_construction": cfg.get("ef_construction", 80)} if spec.startswith("HNSW") else {}
+
+
+def _read_meta(store: VectorStore) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(store.path, INDEX_META_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_index(index: faiss.Index, store: VectorStore, kind: str, cfg: Dict[str, Any]):
+    """Persist a trained index inside the store directory; flat indexes are cheaper to rebuild than to copy."""
+    spec = factory_string(kind, len(store), store.dim, cfg)
+    if spec in ("Flat", "Matrix"):
+        return
+    # Per-process name: readers of a published store may each build a missing index
+    tmp_path = os.path.join(store.path, f"{INDEX_FILE}.{os.getpid()}.tmp")
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, os.path.join(store.path, INDEX_FILE))
+    with open(os.path.join(store.path, INDEX_META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"kind": kind, "spec": spec, "count": len(store), "dim": store.dim, "build": _build_params(spec, cfg)}, f)
+
+
+def load_or_build_index(store: VectorStore, cfg: Dict[str, Any], kind: Optional[str] = None) -> faiss.Index:
+    """The store's persisted index when it matches the store and config (factory string and
+    build settings), otherwise a freshly built (and saved) one.
+
+    The index lives inside the store directory, so rewriting the store
+    invalidates it automatically. A "matrix" index searches the store's own
+    memory-mapped vectors, in whatever dtype they were written.
+    """
+    kind = kind or cfg.get("kind", "flat")
+    spec = factory_string(kind, len(store), store.dim, cfg)
+    with span("index", kind=spec, items=len(store)) as index_span:
+        if spec == "Matrix":
+            index = MatrixIndex(store.vectors)
+            set_search_params(index, cfg)
+            index_span.set(coarse_dims=index.coarse_dims)
+            return index
+        meta = _read_meta(store)
+        if (meta.get("spec") == spec and meta.get("count") == len(store) and spec != "Flat"
+                and meta.get("build", {}) == _build_params(spec, cfg)):
+            try:
+                index = faiss.read_index(os.path.join(store.path, INDEX_FILE))
+                set_search_params(index, cfg)
+                index_span.set(loaded=True)
+                printc(f"Loaded {spec} index from {store.path}", color="blue")
+                return index
+            except RuntimeError as e:
+                printc(f"Could not read saved index, rebuilding: {e}", color="yellow")
+        index = build_index(store.vector_matrix(), kind, cfg)
+        save_index(index, store, kind, cfg)
+        return index
+
+
+def attach_index(retriever, index: faiss.Index):
+    """Point an adalflow `FAISSRetriever` at a prebuilt index instead of its own flat one."""
+    retriever.index = index
+    retriever.dimensions = index.d
+    retriever.total_documents = index.ntotal
+    retriever.indexed = True
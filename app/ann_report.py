@@ -0,0 +1,143 @@
+"""Recall-vs-latency report for the ANN index kinds in `app.ann_index`.
+
+Run against an indexed repo's store, or synthetic clustered vectors to size
+settings for repos larger than any you have indexed::
+
+    python -m app.ann_report --store ~/.adalflow/databases/<repo>.store.v<N>
+    python -m app.ann_report --synthetic 1000000 --dim 768 --json report.json
+
+Every kind is compared with exact flat search on the same queries: recall@k
+is the fraction of the true top-k found, latency is per single query.
+
+The matrix kind is also swept over coarse-to-fine settings: searching only
+the leading `coarse_dims` dimensions, then rescoring `coarse_candidates`
+rows at full dimension. With `coarse_candidates` equal to k, its recall is
+that of embeddings truncated to `coarse_dims`, such as a reduced Gemini
+`output_dimensionality`. ``--matryoshka`` gives the synthetic vectors
+front-loaded dimensions, as Matryoshka-trained embedders do::
+
+    python -m app.ann_report --synthetic 200000 --matryoshka --kinds matrix
+"""
+import json
+import time
+import argparse
+from typing import Any, Dict, List
+
+import faiss
+import numpy as np
+
+from app.ann_index import INDEX_KINDS, build_index, factory_string, index_nbytes, normalized, set_search_params
+from app.config import config
+from app.vector_store import VectorStore
+
+
+# Clustered unit vectors, closer to real embeddings than uniform noise; with `matryoshka`
+# dimension i is scaled by 1/sqrt(i + 1), so leading dimensions carry most of the signal
+def synthetic_vectors(n: int, dim: int, clusters: int = 1000, seed: int = 0, matryoshka: bool = False) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    xb = centers[rng.integers(0, clusters, size=n)] + rng.normal(size=(n, dim)).astype(np.float32)
+    if matryoshka:
+        xb /= np.sqrt(np.arange(1, dim + 1, dtype=np.float32))
+    return normalized(xb)
+
+
+# Queries near stored vectors but not identical to them
+def sample_queries(vectors: np.ndarray, count: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    rows = vectors[rng.choice(len(vectors), size=min(count, len(vectors)), replace=False)]
+    noise = rng.normal(scale=0.3 / np.sqrt(vectors.shape[1]), size=rows.shape).astype(np.float32)
+    return normalized(normalized(rows) + noise)
+
+
+def _timed_search(index: faiss.Index, queries: np.ndarray, k: int):
+    latencies, results = [], []
+    for q in queries:
+        started = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append(ids[0])
+    return np.asarray(results), np.asarray(latencies)
+
+
+def _recall(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+
+
+# Query-time settings to sweep for each kind: nprobe for IVF, efSearch for HNSW,
+# leading dimensions and rescored candidates for the matrix
+def _sweep(kind: str, dim: int, k: int) -> List[Dict[str, int]]:
+    if kind.startswith("ivf"):
+        return [{"nprobe": p} for p in (1, 4, 16, 64)]
+    if kind == "hnsw":
+        return [{"ef_search": e} for e in (16, 64, 256)]
+    if kind == "matrix":
+        return [{"coarse_dims": 0}] + [
+            {"coarse_dims": d, "coarse_candidates": c} for d in (64, 128, 256) if d < dim for c in (k, 10 * k, 40 * k)
+        ]
+    return [{}]
+
+
+def run_report(vectors: np.ndarray, kinds: List[str], queries: int = 200, k: int = 10) -> List[Dict[str, Any]]:
+    cfg = {**config["index"], "min_vectors": 0}
+    n, dim = vectors.shape
+    xq = sample_queries(vectors, queries)
+    flat = build_index(vectors, "flat", cfg)
+    truth, _ = _timed_search(flat, xq, k)
+
+    rows = []
+    for kind in kinds:
+        started = time.perf_counter()
+        index = build_index(vectors, kind, cfg)
+        build_seconds = time.perf_counter() - started
+        for params in _sweep(kind, dim, k):
+            set_search_params(index, {**cfg, **params})
+            found, latencies = _timed_search(index, xq, k)
+            rows.append({
+                "kind": kind,
+                "spec": factory_string(kind, n, dim, cfg),
+                "params": params,
+                f"recall@{k}": round(_recall(found, truth), 4),
+                "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+                "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+                "build_s": round(build_seconds, 2),
+                "index_mb": round(index_nbytes(index) / 1024 ** 2, 1),
+            })
+    return rows
+
+
+def _print_table(rows: List[Dict[str, Any]]):
+    headers = list(rows[0])
+    widths = [max(len(h), *(len(str(r[h])) for r in rows)) for h in headers]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(row[h]).ljust(w) for h, w in zip(headers, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--store", help="path of an indexed repo's .store directory")
+    source.add_argument("--synthetic", type=int, help="number of synthetic vectors to generate")
+    parser.add_argument("--dim", type=int, default=config["embedder"]["dimensions"])
+    parser.add_argument("--matryoshka", action="store_true", help="synthetic vectors with front-loaded dimensions")
+    parser.add_argument("--kinds", default=",".join(INDEX_KINDS), help="comma-separated index kinds")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--json", help="also write the rows to this file")
+    args = parser.parse_args()
+
+    if args.store:
+        vectors = normalized(VectorStore.open(args.store).vector_matrix())
+    else:
+        vectors = synthetic_vectors(args.synthetic, args.dim, matryoshka=args.matryoshka)
+    rows = run_report(vectors, [k for k in args.kinds.split(",") if k], args.queries, args.k)
+    _print_table(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"vectors": len(vectors), "dim": vectors.shape[1], "rows": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+"""End-to-end benchmark: repository scan, chunking, embedding, index build/load, retrieval and query latency.
+
+Runs fully offline, with the hashing embedder and the mock LLM from
+`app.providers` standing in for the model APIs (their latency is
+configurable), on synthetic repos of preset sizes or on real checkouts::
+
+    python -m app.benchmark --synthetic small,medium --json bench.json
+    python -m app.benchmark --repo . --repo https://github.com/SylphAI-Inc/AdalFlow
+    python -m app.benchmark --synthetic small --baseline bench.json --tolerance 0.2
+
+Each fixture runs in a fresh process with its own temporary adalflow root,
+so peak RSS is per fixture and nothing touches ~/.adalflow. Query caches
+are off: every query is retrieved and answered from scratch. With
+`--baseline` or `--limits` the exit status is 1 when a metric regressed.
+"""
+import io
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import platform
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Files per synthetic repo size
+SYNTHETIC_SIZES = {"tiny": 20, "small": 200, "medium": 2000, "large": 20000}
+
+# Smallest change worth reporting as a regression, whatever the relative tolerance
+NOISE_FLOOR = {"_ms": 1.0, "_s": 0.05, "_mb": 16.0, "_per_s": 0.0}
+
+_WORDS = [
+    "user", "repo", "index", "token", "cache", "query", "file", "chunk", "vector", "config",
+    "session", "commit", "request", "response", "score", "batch", "stream", "graph", "node", "event",
+]
+_VERBS = ["parse", "load", "build", "merge", "split", "fetch", "embed", "render", "update", "validate"]
+
+
+def _identifier(rng: random.Random, capitalize: bool = False) -> str:
+    words = [rng.choice(_VERBS)] + rng.sample(_WORDS, 2)
+    if capitalize:
+        return "".join(w.capitalize() for w in words[1:])
+    return "_".join(words)
+
+
+def _synthetic_function(rng: random.Random, name: str, indent: str = "") -> str:
+    args = rng.sample(_WORDS, rng.randint(1, 3))
+    lines = [f"{indent}def {name}({', '.join(args)}):", f'{indent}    """{name.replace("_", " ").capitalize()} for the given {args[0]}."""']
+    for _ in range(rng.randint(3, 20)):
+        target, source = rng.choice(_WORDS), rng.choice(args)
+        lines.append(f"{indent}    {target} = {rng.choice(_VERBS)}_{source}({source}, limit={rng.randint(1, 100)})")
+    lines.append(f"{indent}    return {args[0]}")
+    return "\n".join(lines) + "\n"
+
+
+def _synthetic_module(rng: random.Random) -> str:
+    parts = [f'"""{rng.choice(_WORDS).capitalize()} {rng.choice(_WORDS)} helpers."""\nimport os\n']
+    for _ in range(rng.randint(2, 8)):
+        if rng.random() < 0.3:
+            methods = "\n".join(_synthetic_function(rng, _identifier(rng), "    ") for _ in range(rng.randint(2, 5)))
+            parts.append(f"class {_identifier(rng, capitalize=True)}:\n{methods}")
+        else:
+            parts.append(_synthetic_function(rng, _identifier(rng)))
+    return "\n\n".join(parts)
+
+
+def _synthetic_doc(rng: random.Random) -> str:
+    paragraphs = [
+        " ".join(rng.choice(_WORDS + _VERBS) for _ in range(rng.randint(30, 120))) + "."
+        for _ in range(rng.randint(2, 6))
+    ]
+    return f"# {rng.choice(_WORDS).capitalize()}\n\n" + "\n\n".join(paragraphs) + "\n"
+
+
+def make_synthetic_repo(path: str, files: int, seed: int = 0) -> str:
+    """Write a repo of Python modules, ~10% Markdown docs and ~5% vendored copies (duplicate chunks)."""
+    rng = random.Random(seed)
+    written: List[str] = []
+    for i in range(files):
+        package = os.path.join(path, f"pkg{i // 50}")
+        os.makedirs(package, exist_ok=True)
+        if i % 10 == 9:
+            name, text = os.path.join(package, f"notes_{i}.md"), _synthetic_doc(rng)
+        elif written and i % 20 == 19:
+            source = rng.choice(written)
+            name = os.path.join(path, "vendor", os.path.relpath(source, path))
+            os.makedirs(os.path.dirname(name), exist_ok=True)
+            shutil.copyfile(source, name)
+            continue
+        else:
+            name, text = os.path.join(package, f"{_identifier(rng)}_{i}.py"), _synthetic_module(rng)
+            written.append(name)
+        with open(name, "w", encoding="utf-8") as f:
+            f.write(text)
+    return path
+
+
+def _queries(documents, count: int, seed: int = 0) -> List[str]:
+    """Questions about identifiers and phrases sampled from the indexed chunks, like users ask them."""
+    rng = random.Random(seed)
+    names = sorted({m for doc in documents for m in re.findall(r"(?:def|class|function)\s+(\w+)", doc.text)})
+    templates = ["What does {} do?", "Where is {} used?", "How does {} handle errors?"]
+    queries = [rng.choice(templates).format(name) for name in rng.sample(names, min(len(names), count // 2))]
+    while len(queries) < count and documents:
+        words = documents[rng.randrange(len(documents))].text.split()
+        start = rng.randrange(max(1, len(words) - 6))
+        queries.append("How does the code " + " ".join(words[start:start + 6]) + " work?")
+    rng.shuffle(queries)
+    return queries[:count]
+
+
+def _percentiles(latencies_ms: List[float], prefix: str) -> Dict[str, float]:
+    return {f"{prefix}_p{p}_ms": round(float(np.percentile(latencies_ms, p)), 3) for p in (50, 95, 99)}
+
+
+def _peak_rss_mb() -> float:
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    return round(peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def _configure(options: Dict[str, Any]):
+    from app.config import config
+
+    config["embedder"].update(
+        provider="local",
+        model_kwargs={"model": options["embedder_model"]},
+        dimensions=options["dim"],
+        latency_ms=options["embed_latency_ms"],
+    )
+    config["generator"].update(
+        provider="mock", latency_ms=options["llm_latency_ms"], tokens_per_second=options["llm_tokens_per_second"]
+    )
+    config["generator"]["model_kwargs"]["model"] = "mock"
+    config["embedding_cache"]["enabled"] = False
+    config["query_cache"]["enabled"] = False
+    if options.get("index_kind"):
+        config["index"]["kind"] = options["index_kind"]
+    return config
+
+
+def run_fixture(fixture: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Benchmark one fixture; meant to run in its own process."""
+    root = tempfile.mkdtemp(prefix="githubchat-bench-")
+    # The adalflow root (stores, caches) lives under HOME; keep the run away from the real one
+    os.environ["HOME"] = root
+    log = io.StringIO()
+    try:
+        if options["verbose"]:
+            return _run_fixture(fixture, options, root)
+        # Pipeline logs and progress bars would drown the results
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            return _run_fixture(fixture, options, root)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def _run_fixture(fixture: Dict[str, Any], options: Dict[str, Any], root: str) -> Dict[str, Any]:
+    config = _configure(options)
+    from app.ann_index import load_or_build_index
+    from app.data_pipeline import read_all_documents, split_documents, prepare_splitter, prepare_deduplicator
+    from app.data_pipeline import prepare_embedder_transformer
+    from app.git_repo import download_github_repo, parse_repo_url
+    from app.index_versions import publish, version_dir
+    from app.lexical_index import LexicalIndex
+    from app.providers import embedder_id
+    from app.rag import RAG, Memory
+    from app.symbol_index import SymbolIndex
+    from app.vector_store import VectorStore
+
+    if fixture["kind"] == "synthetic":
+        repo = make_synthetic_repo(os.path.join(root, fixture["name"]), fixture["files"], options["seed"])
+    elif fixture["source"].startswith("http"):
+        repo = os.path.join(root, parse_repo_url(fixture["source"]).key.replace("/", "_"))
+        download_github_repo(fixture["source"], repo, **config["repo_fetch"])
+    else:
+        repo = os.path.abspath(fixture["source"])
+
+    metrics: Dict[str, float] = {}
+    started = time.perf_counter()
+    documents = list(read_all_documents(repo))
+    scan_s = time.perf_counter() - started
+    total_mb = sum(len(doc.text.encode("utf-8")) for doc in documents) / 1024 ** 2
+    metrics.update(scan_s=scan_s, scan_files_per_s=len(documents) / scan_s, scan_mb_per_s=total_mb / scan_s)
+
+    started = time.perf_counter()
+    chunks = split_documents(documents, prepare_splitter())
+    split_count = len(chunks)
+    deduplicator = prepare_deduplicator()
+    if deduplicator and chunks:
+        chunks = deduplicator(chunks)
+    chunk_s = time.perf_counter() - started
+    metrics.update(chunk_s=chunk_s, chunk_chunks_per_s=split_count / chunk_s)
+    if not chunks:
+        raise ValueError(f"Fixture {fixture['name']} has no indexable content")
+
+    started = time.perf_counter()
+    embedded = list(prepare_embedder_transformer()(chunks))
+    embed_s = time.perf_counter() - started
+    metrics.update(embed_s=embed_s, embed_chunks_per_s=len(embedded) / embed_s)
+
+    # Published where DatabaseManager looks for this repo's index, so RAG.load_retriever finds it below
+    databases = os.path.join(root, ".adalflow", "databases")
+    base = os.path.join(databases, f"{os.path.basename(repo)}.store")
+    started = time.perf_counter()
+    store = VectorStore.write(version_dir(base, 1), embedded, dtype=config["vector_store"]["dtype"])
+    load_or_build_index(store, config["index"])
+    LexicalIndex.load_or_build(store)
+    if config["symbols"]["enabled"]:
+        # From the files already scanned, as indexing does; otherwise loading would re-read the repo
+        SymbolIndex.load_or_build(store, lambda: documents)
+    publish(os.path.join(databases, f"{os.path.basename(repo)}.meta.json"), base, store.path, None, embedder_id(config["embedder"]))
+    metrics["index_build_s"] = time.perf_counter() - started
+    del store, embedded
+
+    started = time.perf_counter()
+    rag = RAG()
+    if not rag.load_retriever(repo):
+        raise RuntimeError(f"Index for {repo} was not found after building it")
+    metrics["index_load_s"] = time.perf_counter() - started
+    metrics["index_mb"] = rag.index_bytes() / 1024 ** 2
+
+    queries = _queries(chunks, options["queries"], options["seed"])
+    for query in queries[:options["warmup"]]:
+        rag.call(query, memory=Memory())
+    retrieval, end_to_end = [], []
+    for query in queries:
+        started = time.perf_counter()
+        rag._search(query)
+        retrieval.append((time.perf_counter() - started) * 1000)
+    for query in queries:
+        started = time.perf_counter()
+        rag.call(query, memory=Memory())
+        end_to_end.append((time.perf_counter() - started) * 1000)
+    metrics.update(_percentiles(retrieval, "retrieval"))
+    metrics.update(_percentiles(end_to_end, "e2e"))
+    metrics["peak_rss_mb"] = _peak_rss_mb()
+
+    return {
+        "name": fixture["name"],
+        "source": fixture.get("source") or f"synthetic:{fixture['files']}",
+        "files": len(documents),
+        "mb": round(total_mb, 2),
+        "chunks": split_count,
+        "chunks_indexed": len(chunks),
+        "queries": len(queries),
+        "embedder": embedder_id(config["embedder"]),
+        "index_kind": config["index"]["kind"],
+        "metrics": {name: round(value, 4) for name, value in metrics.items()},
+    }
+
+
+# +1 when a larger value is better (throughput), -1 when smaller is (time, latency, memory)
+def _direction(metric: str) -> int:
+    return 1 if metric.endswith("_per_s") else -1
+
+
+def _noise_floor(metric: str) -> float:
+    return next((floor for suffix, floor in NOISE_FLOOR.items() if metric.endswith(suffix)), 0.0)
+
+
+def compare_to_baseline(fixtures: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Metrics that got worse than the baseline run of the same fixture by more than `tolerance` (relative)."""
+    previous = {f["name"]: f["metrics"] for f in baseline.get("fixtures", [])}
+    failures = []
+    for fixture in fixtures:
+        for metric, value in fixture["metrics"].items():
+            old = previous.get(fixture["name"], {}).get(metric)
+            if old is None:
+                continue
+            worse_by = (old - value) if _direction(metric) > 0 else (value - old)
+            if worse_by > tolerance * abs(old) and worse_by > _noise_floor(metric):
+                failures.append(f"{fixture['name']}.{metric}: {value} vs baseline {old} ({worse_by / abs(old):+.0%} worse)")
+    return failures
+
+
+def check_limits(fixtures: List[Dict[str, Any]], limits: Dict[str, Any]) -> List[str]:
+    """Absolute limits, ``{"<fixture name or *>": {"<metric>": {"max": x} or {"min": y}}}``."""
+    failures = []
+    for fixture in fixtures:
+        rules = {**limits.get("*", {}), **limits.get(fixture["name"], {})}
+        for metric, bound in rules.items():
+            value = fixture["metrics"].get(metric)
+            if value is None:
+                continue
+            if "max" in bound and value > bound["max"]:
+                failures.append(f"{fixture['name']}.{metric}: {value} > max {bound['max']}")
+            if "min" in bound and value < bound["min"]:
+                failures.append(f"{fixture['name']}.{metric}: {value} < min {bound['min']}")
+    return failures
+
+
+def run_benchmarks(fixtures: List[Dict[str, Any]], options: Dict[str, Any]) -> Dict[str, Any]:
+    results = []
+    for fixture in fixtures:
+        # A fresh process per fixture: peak RSS and import-time state are not shared between runs
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            result = pool.submit(run_fixture, fixture, options).result()
+        results.append(result)
+        print(f"{fixture['name']}: {json.dumps(result['metrics'])}", file=sys.stderr)
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "options": options,
+        "fixtures": results,
+    }
+
+
+def _print_table(fixtures: List[Dict[str, Any]]):
+    metrics = list(fixtures[0]["metrics"])
+    names = [f["name"] for f in fixtures]
+    width = max(len(m) for m in metrics + ["files", "chunks"])
+    columns = [max(12, len(n)) for n in names]
+    print(" " * width + "  " + "  ".join(n.rjust(c) for n, c in zip(names, columns)))
+    for row in ["files", "chunks"] + metrics:
+        values = [f[row] if row in f else f["metrics"][row] for f in fixtures]
+        print(row.ljust(width) + "  " + "  ".join(str(v).rjust(c) for v, c in zip(values, columns)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", default=None, help=f"comma-separated sizes: {', '.join(SYNTHETIC_SIZES)}")
+    parser.add_argument("--repo", action="append", default=[], help="local path or GitHub URL; repeatable")
+    parser.add_argument("--queries", type=int, default=100, help="queries per fixture")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="delay per embedding call")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="mock LLM time to first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0, help="mock LLM generation speed; 0 is instant")
+    parser.add_argument("--embedder-model", default="hashing", help="local embedder: hashing or a sentence-transformers model")
+    parser.add_argument("--dim", type=int, default=768, help="hashing embedder dimensions")
+    parser.add_argument("--index-kind", default=None, help="ANN index kind; defaults to the configured one")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression against --baseline")
+    parser.add_argument("--limits", help="JSON file of absolute metric limits per fixture")
+    parser.add_argument("--verbose", action="store_true", help="show pipeline logs")
+    args = parser.parse_args()
+
+    fixtures = [
+        {"kind": "synthetic", "name": f"synthetic-{size}", "files": SYNTHETIC_SIZES[size]}
+        for size in (args.synthetic or ("" if args.repo else "small")).split(",") if size
+    ]
+    fixtures += [{"kind": "repo", "name": os.path.basename(r.rstrip("/")) or r, "source": r} for r in args.repo]
+    options = {
+        "queries": args.queries, "warmup": args.warmup, "seed": args.seed, "verbose": args.verbose,
+        "embed_latency_ms": args.embed_latency_ms, "llm_latency_ms": args.llm_latency_ms,
+        "llm_tokens_per_second": args.llm_tokens_per_second, "embedder_model": args.embedder_model,
+        "dim": args.dim, "index_kind": args.index_kind,
+    }
+    report = run_benchmarks(fixtures, options)
+    _print_table(report["fixtures"])
+
+    failures: List[str] = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("options") != options:
+            print(f"Warning: baseline was run with different options: {baseline.get('options')}", file=sys.stderr)
+        failures += compare_to_baseline(report["fixtures"], baseline, args.tolerance)
+    if args.limits:
+        with open(args.limits, "r", encoding="utf-8") as f:
+            failures += check_limits(report["fixtures"], json.load(f))
+    report["regressions"] = failures
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import os
+import ast
+from copy import deepcopy
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from adalflow.core.component import DataComponent
+from adalflow.core.types import Document
+from adalflow.components.data_process import TextSplitter
+
+from app.repo_scanner import CODE_EXTS
+
+# Languages whose blocks are delimited by brackets rather than indentation
+_OPENERS, _CLOSERS = "([{", ")]}"
+# Lines that belong with the declaration below them: comments, decorators, annotations
+_LEADING_PREFIXES = ("#", "//", "/*", "*", "@", "--")
+
+# A chunk as (first line, last line, text); lines are 1-based and inclusive
+Chunk = Tuple[int, int, str]
+
+
+# Depth at which each Python statement starts, keyed by its first line (decorators included)
+def _python_statement_depths(text: str) -> Optional[Dict[int, int]]:
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return None
+    depths: Dict[int, int] = {}
+
+    def visit(body: Sequence[ast.stmt], depth: int):
+        for node in body:
+            decorators = getattr(node, "decorator_list", [])
+            start = min([node.lineno] + [d.lineno for d in decorators]) - 1
+            depths[start] = min(depth, depths.get(start, depth))
+            for field in ("body", "orelse", "finalbody"):
+                children = getattr(node, field, None)
+                if isinstance(children, list) and children and isinstance(children[0], ast.stmt):
+                    visit(children, depth + 1)
+            for handler in getattr(node, "handlers", []):
+                visit(handler.body, depth + 1)
+
+    visit(tree.body, 0)
+    return depths
+
+
+# Bracket depth at the start of every line, skipping strings and comments
+def _bracket_depths(lines: Sequence[str]) -> List[int]:
+    depths, depth, quote, block_comment = [], 0, None, False
+    for line in lines:
+        depths.append(depth)
+        i = 0
+        while i < len(line):
+            ch, pair = line[i], line[i:i + 2]
+            if block_comment:
+                if pair == "*/":
+                    block_comment, i = False, i + 1
+            elif quote:
+                if ch == "\\":
+                    i += 1
+                elif ch == quote:
+                    quote = None
+            elif pair == "//":
+                break
+            elif pair == "/*":
+                block_comment, i = True, i + 1
+            elif ch in "\"'`":
+                quote = ch
+            elif ch in _OPENERS:
+                depth += 1
+            elif ch in _CLOSERS:
+                depth = max(0, depth - 1)
+            i += 1
+        if quote != "`":
+            quote = None  # only template literals span lines
+    return depths
+
+
+# Nesting depth of each line that can start a new unit, None for lines that can't
+def _unit_depths(text: str, lines: Sequence[str], ext: str) -> List[Optional[int]]:
+    python_depths = _python_statement_depths(text) if ext == ".py" else None
+    if python_depths is not None:
+        return [python_depths.get(i) for i in range(len(lines))]
+    if ext == ".py":
+        # Unparseable Python: fall back to indentation
+        bracket_depths = [len(line) - len(line.lstrip()) for line in lines]
+    else:
+        bracket_depths = _bracket_depths(lines)
+    depths: List[Optional[int]] = []
+    for line, depth in zip(lines, bracket_depths):
+        stripped = line.strip()
+        starts_unit = stripped and not stripped.startswith(_LEADING_PREFIXES) and stripped[0] not in _CLOSERS
+        depths.append(depth if starts_unit else None)
+    return depths
+
+
+class _Source:
+    """Lines of one file with their unit depths and cumulative character offsets."""
+
+    def __init__(self, text: str, ext: str):
+        self.lines = text.splitlines(keepends=True)
+        self.depths = _unit_depths(text, self.lines, ext)
+        self.offsets = [0]
+        for line in self.lines:
+            self.offsets.append(self.offsets[-1] + len(line))
+
+    def size(self, start: int, end: int) -> int:
+        return self.offsets[end] - self.offsets[start]
+
+
+class CodeChunker:
+    """Split source files on function/class boundaries instead of fixed word windows.
+
+    Top-level units (statements for Python via `ast`; bracket-depth-0 lines
+    elsewhere) become chunks, with leading comments and decorators kept with
+    the unit below them. Units smaller than `min_chars` are merged with their
+    neighbours; units larger than `max_chars` are split at the next nesting
+    level (methods, then statements) and finally at blank lines.
+    """
+
+    def __init__(self, max_chars: int = 2000, min_chars: int = 400, max_depth: int = 4):
+        self.max_chars = max_chars
+        self.min_chars = min_chars
+        self.max_depth = max_depth
+
+    def split(self, text: str, ext: str) -> List[Chunk]:
+        src = _Source(text, ext)
+        chunks = []
+        for start, end in self._split_range(src, 0, len(src.lines), level=0, head=False):
+            body = "".join(src.lines[start:end])
+            if body.strip():
+                chunks.extend(self._cut_long_line(start, end, body))
+        return chunks
+
+    # Line ranges covering [start, end), each under max_chars where the code allows it.
+    # `head` ranges begin with a unit of their own, which is split into its children.
+    def _split_range(self, src: _Source, start: int, end: int, level: int, head: bool) -> List[Tuple[int, int]]:
+        if src.size(start, end) <= self.max_chars:
+            return [(start, end)]
+        bounds = self._boundaries(src, start, end, head) if level < self.max_depth else []
+        if not bounds:
+            return self._split_lines(src, start, end)
+        pieces = []
+        for piece_start, piece_end in zip([start] + bounds, bounds + [end]):
+            pieces.extend(self._split_range(src, piece_start, piece_end, level + 1, head=True))
+        return self._merge_small(src, pieces)
+
+    # Unit starts at the shallowest depth inside the range, moved up over their leading comments
+    def _boundaries(self, src: _Source, start: int, end: int, head: bool) -> List[int]:
+        candidates = [i for i in range(start, end) if src.depths[i] is not None]
+        if head and candidates:
+            head_depth = src.depths[candidates[0]]
+            candidates = [i for i in candidates if src.depths[i] > head_depth]
+        if not candidates:
+            return []
+        depth = min(src.depths[i] for i in candidates)
+        bounds = []
+        for i in candidates:
+            if src.depths[i] != depth:
+                continue
+            while i - 1 > start and src.lines[i - 1].strip().startswith(_LEADING_PREFIXES):
+                i -= 1
+            if i > start and (not bounds or i > bounds[-1]):
+                bounds.append(i)
+        return bounds
+
+    # Merge neighbouring ranges while one of them is small and the result still fits
+    def _merge_small(self, src: _Source, pieces: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        merged = [pieces[0]]
+        for start, end in pieces[1:]:
+            prev_start, prev_end = merged[-1]
+            small = src.size(prev_start, prev_end) < self.min_chars or src.size(start, end) < self.min_chars
+            if small and src.size(prev_start, end) <= self.max_chars:
+                merged[-1] = (prev_start, end)
+            else:
+                merged.append((start, end))
+        return merged
+
+    # No structure left to split on: pack lines, preferring to cut after a blank line
+    def _split_lines(self, src: _Source, start: int, end: int) -> List[Tuple[int, int]]:
+        ranges, chunk_start, last_blank = [], start, None
+        for i in range(start, end):
+            if i > chunk_start and src.size(chunk_start, i + 1) > self.max_chars:
+                cut = last_blank if last_blank and last_blank - chunk_start > (i - chunk_start) // 2 else i
+                ranges.append((chunk_start, cut))
+                chunk_start, last_blank = cut, None
+            if not src.lines[i].strip():
+                last_blank = i + 1
+        ranges.append((chunk_start, end))
+        return ranges
+
+    # A single line longer than max_chars (minified code, data) is cut by characters
+    def _cut_long_line(self, start: int, end: int, body: str) -> List[Chunk]:
+        if len(body) <= self.max_chars or end - start > 1:
+            return [(start + 1, end, body)]
+        return [(start + 1, end, body[i:i + self.max_chars]) for i in range(0, len(body), self.max_chars)]
+
+
+class CodeAwareSplitter(DataComponent):
+    """Document splitter: code files by `CodeChunker`, everything else by adalflow's `TextSplitter`.
+
+    Code chunks record ``start_line``/``end_line`` (1-based, inclusive) in
+    ``meta_data`` and do not overlap.
+    """
+
+    def __init__(self, text_splitter: dict, code_splitter: dict):
+        super().__init__()
+        self.text_splitter = TextSplitter(**text_splitter)
+        self.chunker = CodeChunker(**code_splitter)
+
+    def call(self, documents: List[Document]) -> List[Document]:
+        chunks: List[Document] = []
+        for doc in documents:
+            ext = os.path.splitext((doc.meta_data or {}).get("file_path", ""))[1]
+            if ext in CODE_EXTS:
+                chunks.extend(self._split_code(doc, ext))
+            else:
+                chunks.extend(self.text_splitter([doc]))
+        return chunks
+
+    def _split_code(self, doc: Document, ext: str) -> List[Document]:
+        chunks = []
+        for order, (start_line, end_line, text) in enumerate(self.chunker.split(doc.text, ext)):
+            meta_data = deepcopy(doc.meta_data)
+            meta_data.update(start_line=start_line, end_line=end_line)
+            chunks.append(Document(text=text, meta_data=meta_data, parent_doc_id=f"{doc.id}", order=order))
+        return chunks
@@ -1,35 +1,185 @@
 import os
 from dotenv import load_dotenv
 
-from adalflow.components.model_client.groq_client import GroqAPIClient
-
-from app.gemini_embedder import GeminiEmbedderClient
+from app.embedding_cache import CachedEmbedderClient, get_shared_cache
+from app.providers import create_embedder, create_generator, embedder_defaults, generator_default_model
 
 load_dotenv(verbose=True)
 
+# Backends by name, see app/providers.py: local + mock run fully offline
+EMBEDDER_PROVIDER = os.getenv("EMBEDDER_PROVIDER", "gemini")
+GENERATOR_PROVIDER = os.getenv("GENERATOR_PROVIDER", "groq")
+_default_embed_model, _default_embed_dims = embedder_defaults(EMBEDDER_PROVIDER)
+
+# Wrap an embedder client with the shared on-disk embedding cache, if enabled
+def _with_embedding_cache(client):
+    cache_config = config["embedding_cache"]
+    if not cache_config["enabled"]:
+        return client
+    cache = get_shared_cache(cache_config["path"], max_bytes=cache_config["max_size_mb"] * 1024 ** 2)
+    return CachedEmbedderClient(client, cache, dimensions=config["embedder"]["dimensions"])
+
 config = {
     "embedder": {
+        # Texts per embedder call; GeminiEmbedderClient sends up to 100 per request
         "batch_size": 100,
-        # Use custom GeminiEmbedderClient for cloud-based embeddings
-        "model_client": lambda: GeminiEmbedderClient(api_key=os.getenv("GEMINI_API_KEY")),
+        "provider": EMBEDDER_PROVIDER,
+        # GeminiEmbedderClient for cloud-based embeddings, or a local one
+        "model_client": lambda: _with_embedding_cache(create_embedder(config["embedder"])),
         "model_kwargs": {
-            "model": "gemini-embedding-001",
+            "model": os.getenv("EMBEDDER_MODEL", _default_embed_model),
         },
-        "dimensions": 768,
+        "dimensions": int(os.getenv("EMBEDDER_DIMENSIONS", _default_embed_dims)),
+        # Simulated per-call latency of the local embedder, for benchmarking
+        "latency_ms": float(os.getenv("EMBEDDER_LATENCY_MS", "0")),
         "encoding_format": "float",
+        # Concurrent indexing: batches in flight and the API quota to stay within
+        "max_in_flight": int(os.getenv("EMBED_MAX_IN_FLIGHT", 4)),
+        "requests_per_minute": int(os.getenv("EMBED_REQUESTS_PER_MINUTE", 1500)),
+        "tokens_per_minute": int(os.getenv("EMBED_TOKENS_PER_MINUTE", 1_000_000)),
+        "max_retries": 8,
+    },
+    # Content-addressed embedding cache shared by all repos; path None uses the adalflow root
+    "embedding_cache": {
+        "enabled": os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() != "false",
+        "path": os.getenv("EMBEDDING_CACHE_PATH"),
+        "max_size_mb": int(os.getenv("EMBEDDING_CACHE_MAX_MB", 2048)),
+    },
+    # Remote repos are cloned shallow; sparse fetches only blobs of indexable files
+    "repo_fetch": {
+        "depth": 1,
+        "sparse": True,
+    },
+    # Repository scanning: reader threads and the largest file worth indexing
+    "scanner": {
+        "max_workers": 8,
+        "max_file_bytes": 1_000_000,
+    },
+    # On-disk chunk store: float32, or lossy float16/int8 (unit rows quantized per row, a quarter of float32)
+    "vector_store": {
+        "dtype": os.getenv("VECTOR_STORE_DTYPE", "float32"),
+    },
+    # Index versions published for every process on the host, see app/index_versions.py
+    "sharing": {
+        # Seconds between a loaded repo's checks for a newer published version (0 = every request)
+        "refresh_seconds": float(os.getenv("INDEX_REFRESH_SECONDS", "2")),
+        # Versions kept on disk: the current one plus those readers may still be loading
+        "keep_versions": int(os.getenv("INDEX_KEEP_VERSIONS", "2")),
+    },
+    # Loaded repo indexes and per-session conversation memory held by the API server
+    "registry": {
+        "max_index_mb": int(os.getenv("RAG_REGISTRY_MAX_MB", "1024")),
+        "max_sessions": int(os.getenv("RAG_MAX_SESSIONS", "1000")),
+        "session_ttl_seconds": int(os.getenv("RAG_SESSION_TTL_SECONDS", str(6 * 3600))),
+    },
+    # Admission control in the API server: concurrent slots, bounded wait queue and how long to wait in it.
+    # Beyond the queue requests get 429, after the wait 503, both with Retry-After.
+    "admission": {
+        "query_concurrency": int(os.getenv("QUERY_CONCURRENCY", "16")),
+        "query_queue": int(os.getenv("QUERY_QUEUE", "64")),
+        "query_queue_timeout": float(os.getenv("QUERY_QUEUE_TIMEOUT", "10")),
+        # Indexing jobs (clone + embed) are memory and API-quota heavy; queued jobs stay "queued"
+        "index_concurrency": int(os.getenv("INDEX_CONCURRENCY", "2")),
+        "index_queue": int(os.getenv("INDEX_QUEUE", "16")),
+        "index_queue_timeout": float(os.getenv("INDEX_QUEUE_TIMEOUT", "1800")),
+    },
+    # In-memory query caches: question -> embedding (shared), and per repo index -> generated answer
+    "query_cache": {
+        "enabled": os.getenv("QUERY_CACHE_ENABLED", "true").lower() != "false",
+        "embedding_max_entries": int(os.getenv("QUERY_CACHE_EMBEDDINGS", "10000")),
+        "answer_max_entries": int(os.getenv("QUERY_CACHE_ANSWERS", "1000")),
+        "ttl_seconds": int(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600")),
+        # Minimum cosine similarity between two questions for them to share a cached answer
+        "similarity_threshold": float(os.getenv("QUERY_CACHE_SIMILARITY", "0.95")),
+    },
+    # Search index over chunk vectors: flat (exact, float32 copy), matrix (exact, over the store's own vectors),
+    # ivf, hnsw, ivfpq, sq8 or ivfsq8; see app/ann_index.py
+    "index": {
+        "kind": os.getenv("ANN_INDEX", "flat"),
+        # Repos with fewer chunks than this always use exact flat search
+        "min_vectors": int(os.getenv("ANN_MIN_VECTORS", "50000")),
+        "nlist": None,  # IVF lists; None picks ~4*sqrt(chunks)
+        "nprobe": int(os.getenv("ANN_NPROBE", "16")),
+        "hnsw_m": 32,
+        "ef_construction": 80,
+        "ef_search": int(os.getenv("ANN_EF_SEARCH", "64")),
+        "pq_m": 32,
+        "pq_bits": 8,
+        "train_size": 100_000,
+        # Coarse-to-fine matrix search: scan this many leading dimensions (0 = off), then rescore
+        # this many candidates at full dimension; meant for Matryoshka embeddings such as Gemini's
+        "coarse_dims": int(os.getenv("ANN_COARSE_DIMS", "0")),
+        "coarse_candidates": int(os.getenv("ANN_COARSE_CANDIDATES", "200")),
     },
     "retriever": {"top_k": 3},
+    # BM25 over code-aware tokens, fused with dense results by reciprocal rank
+    "hybrid": {
+        "enabled": os.getenv("HYBRID_SEARCH", "true").lower() != "false",
+        "candidates": 20,  # taken from each ranking before fusion
+        "rrf_k": 60,
+        # Skip query embedding when the query names identifiers found in at most this many chunks
+        "fast_path": True,
+        "fast_path_max_df": 10,
+        # ...and the best BM25 hit outscores the runner-up by at least this fraction
+        "fast_path_margin": 0.2,
+    },
+    # Second-stage ranking of over-fetched candidates, see app/reranker.py
+    "reranker": {
+        "provider": os.getenv("RERANKER", "lexical"),  # lexical, cross-encoder or none
+        "candidates": int(os.getenv("RERANK_CANDIDATES", "50")),  # fetched from each ranking, reranked down to top_k
+        "model": os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"),
+    },
+    # Symbol graph (definitions, imports, calls), see app/symbol_index.py
+    "symbols": {
+        "enabled": os.getenv("SYMBOL_INDEX", "true").lower() != "false",
+        "max_hits": 5,  # chunks taken from a lookup like "who calls X" or "where is Y defined"
+        "expand": int(os.getenv("SYMBOL_EXPANSION", "2")),  # definitions of called symbols added to the results
+        "max_definitions": 3,  # names defined in more places are too ambiguous to expand
+        # Skip query embedding when a structural question is answered by the symbol index alone
+        "fast_path": True,
+    },
     "generator": {
-        "model_client": lambda: GroqAPIClient(api_key=os.getenv("GROQ_API_KEY")),
+        "provider": GENERATOR_PROVIDER,
+        # CustomGroqClient implements acall, so generation can run without blocking the event loop
+        "model_client": lambda: create_generator(config["generator"]),
         "model_kwargs": {
-            "model": "groq/compound",
+            "model": os.getenv("GENERATOR_MODEL", generator_default_model(GENERATOR_PROVIDER)),
             "temperature": 0.3,
             "stream": False,
         },
+        # Mock generator: time to first token and streaming speed (0 = instant)
+        "latency_ms": float(os.getenv("MOCK_LLM_LATENCY_MS", "200")),
+        "tokens_per_second": float(os.getenv("MOCK_LLM_TOKENS_PER_SECOND", "0")),
     },
+    # Logging and tracing, see app/telemetry.py; DEBUG logs raw model responses and a span tree per request
+    "observability": {
+        "log_level": os.getenv("LOG_LEVEL", "INFO"),
+    },
+    # Prompt size control, see app/context_budget.py
+    "context_budget": {
+        "max_prompt_tokens": int(os.getenv("CONTEXT_MAX_TOKENS", "12000")),
+        "history_share": 0.25,  # of the tokens left after the template and query
+        "recent_turns": 2,  # newest turns kept verbatim
+        "old_turn_tokens": 120,  # older answers are trimmed to this many tokens
+    },
+    # Prose and config files (DOC_EXTS in app/repo_scanner.py)
     "text_splitter": {
         "split_by": "word",
         "chunk_size": 200,
         "chunk_overlap": 100,
     },
+    # Index-time duplicate chunk removal, see app/dedup.py
+    "dedup": {
+        "enabled": os.getenv("CHUNK_DEDUP", "true").lower() != "false",
+        "near_duplicates": True,
+        "threshold": 0.85,  # estimated Jaccard similarity of 5-word shingles
+        "num_perm": 64,
+        "bands": 8,
+        "shingle_size": 5,
+    },
+    # Source files (CODE_EXTS): one chunk per function/class, see app/code_chunker.py
+    "code_splitter": {
+        "max_chars": 2000,  # larger units are split at methods, then statements, then blank lines
+        "min_chars": 400,  # smaller neighbouring units are merged
+    },
 }
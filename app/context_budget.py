@@ -0,0 +1,196 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from adalflow.core.tokenizer import Tokenizer
+from adalflow.core.types import AssistantResponse, DialogTurn, Document
+
+_tokenizer: Optional[Tokenizer] = None
+_tokenizer_lock = threading.Lock()
+
+
+# Shared cl100k tokenizer; loading the encoding is the slow part
+def get_tokenizer() -> Tokenizer:
+    global _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is None:
+            _tokenizer = Tokenizer()
+        return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    return get_tokenizer().count_tokens(text) if text else 0
+
+
+# First `max_tokens` tokens of text, marked as cut when anything was dropped
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    tokens = get_tokenizer().encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return get_tokenizer().decode(tokens[:max(0, max_tokens)]).rstrip() + " …"
+
+
+@dataclass
+class PromptUsage:
+    """Estimated prompt tokens per component for one request, and what was cut to fit the budget."""
+
+    budget: int = 0
+    template: int = 0  # system prompt and output format instructions
+    query: int = 0
+    history: int = 0
+    contexts: int = 0
+    history_turns: int = 0
+    history_turns_trimmed: int = 0
+    history_turns_dropped: int = 0
+    context_chunks: int = 0  # retrieved chunks included, before merging
+    context_chunks_merged: int = 0  # chunks folded into an adjacent chunk of the same file
+    context_chunks_dropped: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.template + self.query + self.history + self.contexts
+
+    def to_dict(self) -> Dict[str, int]:
+        return {**asdict(self), "total": self.total}
+
+
+# Lines of a code chunk keyed by line number, or None when the text is not a whole-line slice
+def _numbered_lines(doc: Document) -> Optional[Dict[int, str]]:
+    start, end = doc.meta_data.get("start_line"), doc.meta_data.get("end_line")
+    if start is None or end is None:
+        return None
+    lines = doc.text.splitlines(keepends=True)
+    if len(lines) != end - start + 1:
+        return None
+    return dict(zip(range(start, end + 1), lines))
+
+
+# Length of the longest suffix of `a` that is also a prefix of `b` (the splitter's word overlap)
+def _overlap(a: str, b: str) -> int:
+    probe = b.split(maxsplit=1)[0] if b.strip() else ""
+    idx = a.find(probe) if probe else -1
+    while idx != -1:
+        if b.startswith(a[idx:]):
+            return len(a) - idx
+        idx = a.find(probe, idx + 1)
+    return 0
+
+
+def merge_adjacent(first: Document, second: Document) -> Optional[Document]:
+    """One document spanning two neighbouring chunks of the same file, overlap removed; None if not adjacent."""
+    if first.meta_data.get("file_path") != second.meta_data.get("file_path"):
+        return None
+    first_lines, second_lines = _numbered_lines(first), _numbered_lines(second)
+    if first_lines is not None and second_lines is not None:
+        lo, hi = sorted([first_lines, second_lines], key=min)
+        if min(hi) > max(lo) + 1:
+            return None
+        lines = {**lo, **hi}
+        text = "".join(lines[n] for n in sorted(lines))
+        meta_data = {**first.meta_data, "start_line": min(lines), "end_line": max(lines)}
+    elif first.parent_doc_id and first.parent_doc_id == second.parent_doc_id and abs(first.order - second.order) == 1:
+        lo, hi = sorted([first, second], key=lambda doc: doc.order)
+        text = lo.text + hi.text[_overlap(lo.text, hi.text):]
+        meta_data = dict(first.meta_data)
+    else:
+        return None
+    return Document(
+        id=first.id, text=text, meta_data=meta_data, parent_doc_id=first.parent_doc_id, order=first.order
+    )
+
+
+class ContextBudgeter:
+    """Fit conversation history and retrieved chunks into a prompt token budget.
+
+    History gets up to `history_share` of what the template and query leave:
+    the newest `recent_turns` turns verbatim, older answers trimmed to
+    `old_turn_tokens`, and the oldest turns dropped once even that does not
+    fit. Retrieved chunks fill the rest in rank order; a chunk adjacent to
+    one already packed from the same file is merged into it, paying only for
+    the lines it adds. Token counts are cl100k estimates.
+    """
+
+    def __init__(self, max_prompt_tokens: int = 12_000, history_share: float = 0.25, recent_turns: int = 2,
+                 old_turn_tokens: int = 120, context_header_tokens: int = 12):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.history_share = history_share
+        self.recent_turns = recent_turns
+        self.old_turn_tokens = old_turn_tokens
+        self.context_header_tokens = context_header_tokens  # "N.\nFile Path: ...\nContent: "
+
+    def fit(
+        self, template_tokens: int, query: str, dialog_turns: "OrderedDict[int, DialogTurn]", documents: Sequence[Document]
+    ) -> Tuple["OrderedDict[int, DialogTurn]", List[Document], PromptUsage]:
+        usage = PromptUsage(budget=self.max_prompt_tokens, template=template_tokens, query=count_tokens(query))
+        available = max(0, self.max_prompt_tokens - usage.template - usage.query)
+        history = self._fit_history(dialog_turns, int(available * self.history_share), usage)
+        contexts = self._fit_contexts(documents, available - usage.history, usage)
+        return history, contexts, usage
+
+    def _fit_history(self, dialog_turns, budget: int, usage: PromptUsage) -> "OrderedDict[int, DialogTurn]":
+        turns = list(dialog_turns.items())
+        kept: List[Tuple[Any, DialogTurn, int]] = []
+        used = 0
+        # Newest first, so it is always the oldest turns that are lost
+        for age, (key, turn) in enumerate(reversed(turns)):
+            response = turn.assistant_response.response_str or ""
+            cost = self._turn_cost(turn.user_query.query_str, response)
+            trimmed = response
+            # Older turns, and recent ones that don't fit whole, are cut down to their opening
+            if age >= self.recent_turns or used + cost > budget:
+                trimmed = truncate_tokens(response, self.old_turn_tokens)
+                if trimmed != response:
+                    turn = DialogTurn(
+                        id=turn.id, user_query=turn.user_query, assistant_response=AssistantResponse(response_str=trimmed)
+                    )
+                    cost = self._turn_cost(turn.user_query.query_str, trimmed)
+            if used + cost > budget:
+                usage.history_turns_dropped = len(turns) - len(kept)
+                break
+            kept.append((key, turn, cost))
+            used += cost
+            usage.history_turns_trimmed += trimmed != response
+        usage.history, usage.history_turns = used, len(kept)
+        return OrderedDict((key, turn) for key, turn, _ in reversed(kept))
+
+    @staticmethod
+    def _turn_cost(query: str, response: str) -> int:
+        return count_tokens(query) + count_tokens(response) + 6  # "k.\nUser: \nAssistant: "
+
+    def _fit_contexts(self, documents: Sequence[Document], budget: int, usage: PromptUsage) -> List[Document]:
+        packed: List[Document] = []
+        costs: List[int] = []
+        used = 0
+        for doc in documents:
+            merged_at = None
+            for i, existing in enumerate(packed):
+                merged = merge_adjacent(existing, doc)
+                if merged is not None:
+                    merged_at = i
+                    break
+            if merged_at is not None:
+                cost = count_tokens(merged.text) + self.context_header_tokens
+                if used - costs[merged_at] + cost <= budget:
+                    used += cost - costs[merged_at]
+                    packed[merged_at], costs[merged_at] = merged, cost
+                    usage.context_chunks += 1
+                    usage.context_chunks_merged += 1
+                    continue
+            cost = count_tokens(doc.text) + self.context_header_tokens
+            if used + cost <= budget:
+                packed.append(doc)
+                costs.append(cost)
+                used += cost
+                usage.context_chunks += 1
+            else:
+                usage.context_chunks_dropped += 1
+        if not packed and documents and budget > self.context_header_tokens:
+            # Nothing fits whole: a cut-down best chunk beats no context at all
+            best = documents[0]
+            text = truncate_tokens(best.text, budget - self.context_header_tokens)
+            packed.append(Document(id=best.id, text=text, meta_data=best.meta_data, parent_doc_id=best.parent_doc_id, order=best.order))
+            used = count_tokens(text) + self.context_header_tokens
+            usage.context_chunks, usage.context_chunks_dropped = 1, len(documents) - 1
+        usage.contexts = used
+        return packed
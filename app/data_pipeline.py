@@ -1,138 +1,382 @@
 import os
-import glob
-import subprocess
+import time
+from itertools import islice
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
 
+import numpy as np
 import adalflow as adal
 from adalflow.utils import printc
 from adalflow.core.db import LocalDB
 from adalflow.core.types import Document, List
 from adalflow.utils import get_adalflow_default_root_path
-from adalflow.components.data_process import TextSplitter, ToEmbeddings
 
 from app.config import config
+from app.providers import embedder_id
+from app.embedding_scheduler import EmbeddingScheduler, ScheduledToEmbeddings
+from app.vector_store import VectorStore
+from app.ann_index import factory_string, load_or_build_index
+from app.index_versions import publish, read_manifest, store_dir, version_dir, writer_lock
+from app.lexical_index import LexicalIndex
+from app.symbol_index import SymbolIndex, collect_symbols
+from app.code_chunker import CodeAwareSplitter
+from app.dedup import ChunkDeduplicator, chunk_file_paths, content_hash
+from app.repo_scanner import scan_repository, load_document, is_indexable_name, is_path_ignored
+from app.git_repo import download_github_repo, parse_repo_url, get_head_commit, diff_commits
+from app.telemetry import span, record_span
 
-# Clone github repo to local path
-def download_github_repo(repo_url: str, local_path: str):
-    try:
-        subprocess.run(["git", "--version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        os.makedirs(local_path, exist_ok=True)
-        result = subprocess.run(["git", "clone", repo_url, local_path], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        return result.stdout.decode("utf-8")
-    except subprocess.CalledProcessError as e:
-        return f"Error during cloning: {e.stderr.decode('utf-8')}"
-    except Exception as e:
-        return f"Unexpected error: {str(e)}"
-
-# Read all documents from local path
-def read_all_documents(path: str):
-    documents = []
-    code_exts = [".py", ".js", ".ts", ".java", ".cpp", ".c", ".go", ".rs"]
-    doc_exts = [".md", ".txt", ".rst", ".json", ".yaml", ".yml"]
-
-    for ext in code_exts + doc_exts:
-        for file_path in glob.glob(f"{path}/**/*{ext}", recursive=True):
-            if ".venv" in file_path or "node_modules" in file_path:
-                continue
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    rel = os.path.relpath(file_path, path)
-                    is_code = ext in code_exts
-                    doc = Document(
-                        text=content,
-                        meta_data={
-                            "file_path": rel,
-                            "type": ext[1:],
-                            "is_code": is_code,
-                            "is_implementation": is_code,
-                            "title": rel,
-                        },
-                    )
-                    documents.append(doc)
-            except Exception as e:
-                print(f"Error reading {file_path}: {e}")
-    return documents
+# Read all documents from local path, lazily, one per indexable file
+def read_all_documents(path: str) -> Iterator[Document]:
+    return scan_repository(
+        path,
+        max_workers=config["scanner"]["max_workers"],
+        max_file_bytes=config["scanner"]["max_file_bytes"],
+    )
 
-# Prepare data pipeline for embedding
-def prepare_data_pipeline():
-    splitter = TextSplitter(**config["text_splitter"])
-    embedder = adal.Embedder(
-        model_client=config["embedder"]["model_client"](),
-        model_kwargs=config["embedder"]["model_kwargs"],
+# Whether a changed repo-relative file should be (re)indexed
+def is_indexable(path: str, rel: str) -> bool:
+    full_path = os.path.join(path, rel)
+    return (
+        is_indexable_name(os.path.basename(rel))
+        and os.path.isfile(full_path)
+        and os.path.getsize(full_path) <= config["scanner"]["max_file_bytes"]
+        and not is_path_ignored(path, rel)
     )
-    embedder_transformer = ToEmbeddings(
-        embedder=embedder, batch_size=config["embedder"]["batch_size"]
+
+# Split documents as they stream in, so whole files are not all held in memory
+def split_documents(documents: Iterable[Document], splitter: CodeAwareSplitter, batch_size: int = 64) -> List[Document]:
+    chunks: List[Document] = []
+    documents = iter(documents)
+    seconds = 0.0  # splitter time only; reading the documents is the scan stage's
+    while batch := list(islice(documents, batch_size)):
+        started = time.perf_counter()
+        chunks.extend(splitter(batch))
+        seconds += time.perf_counter() - started
+    record_span("split", seconds, items=len(chunks))
+    return chunks
+
+# Code files split on function/class boundaries, other files by words
+def prepare_splitter() -> CodeAwareSplitter:
+    return CodeAwareSplitter(config["text_splitter"], config["code_splitter"])
+
+# Exact/near-duplicate chunk filter, or None when deduplication is off
+def prepare_deduplicator() -> Optional[ChunkDeduplicator]:
+    dedup_config = dict(config["dedup"])
+    if not dedup_config.pop("enabled"):
+        return None
+    return ChunkDeduplicator(**dedup_config)
+
+# Prepare embedding transformer
+def prepare_embedder_transformer() -> ScheduledToEmbeddings:
+    embedder_config = config["embedder"]
+    scheduler = EmbeddingScheduler(
+        model_client=embedder_config["model_client"](),
+        model_kwargs=embedder_config["model_kwargs"],
+        batch_size=embedder_config["batch_size"],
+        max_in_flight=embedder_config["max_in_flight"],
+        requests_per_minute=embedder_config["requests_per_minute"],
+        tokens_per_minute=embedder_config["tokens_per_minute"],
+        max_retries=embedder_config["max_retries"],
     )
-    return adal.Sequential(splitter, embedder_transformer)
+    return ScheduledToEmbeddings(scheduler=scheduler)
 
-# Transform documents and save to db
-def transform_documents_and_save_to_db(documents: List[Document], db_path: str) -> LocalDB:
-    transformer = prepare_data_pipeline()
-    db = LocalDB()
-    db.register_transformer(transformer=transformer, key="split_and_embed")
-    db.load(documents)
-    db.transform(key="split_and_embed")
+# Prepare data pipeline for embedding
+def prepare_data_pipeline():
+    deduplicator = prepare_deduplicator()
+    stages = [prepare_splitter()] + ([deduplicator] if deduplicator else []) + [prepare_embedder_transformer()]
+    return adal.Sequential(*stages)
 
-    transformed_docs = db.get_transformed_data(key="split_and_embed")
+# Search indexes saved inside a store before it is published: symbols, BM25 and a trained ANN index
+def save_search_indexes(store: VectorStore, symbols: Optional[dict] = None):
+    if symbols is not None:
+        with span("index", kind="symbols", items=len(symbols)):
+            SymbolIndex.save_new(symbols, store)
+    if config["hybrid"]["enabled"]:
+        LexicalIndex.load_or_build(store)
+    if factory_string(config["index"]["kind"], len(store), store.dim, config["index"]) not in ("Flat", "Matrix"):
+        load_or_build_index(store, config["index"])
+
+# Transform documents and save to db, with the symbol index of the files read
+def transform_documents_and_save_to_db(documents: Iterable[Document], db_path: str) -> Optional[VectorStore]:
+    symbols = {}
+    if config["symbols"]["enabled"]:
+        documents = collect_symbols(documents, symbols)
+    chunks = split_documents(documents, prepare_splitter())
+    deduplicator = prepare_deduplicator()
+    if deduplicator and chunks:
+        chunks = deduplicator(chunks)
+    transformed_docs = prepare_embedder_transformer()(chunks) if chunks else []
     if not transformed_docs:
         printc("No embedded docs — skipping DB save.")
-        return db
+        return None
 
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    db.transformer_setups = {}
-    try:
-        LocalDB.save_state(db, filepath=db_path)
-    except Exception as e:
-        printc(f"Failed saving DB: {e}")
-    return db
+    with span("index", kind="store", items=len(transformed_docs)):
+        store = VectorStore.write(db_path, transformed_docs, dtype=config["vector_store"]["dtype"])
+    save_search_indexes(store, symbols if config["symbols"]["enabled"] else None)
+    return store
+
+# Convert a database pickled by earlier versions into a vector store
+def migrate_legacy_db(pkl_path: str, db_path: str) -> Optional[VectorStore]:
+    db = LocalDB.load_state(pkl_path)
+    docs = db.get_transformed_data(key="split_and_embed") if db else []
+    if not docs:
+        return None
+    printc(f"Migrating {pkl_path} to vector store format...")
+    store = VectorStore.write(db_path, docs, dtype=config["vector_store"]["dtype"])
+    save_search_indexes(store)
+    os.remove(pkl_path)
+    return store
+
+@dataclass
+class IndexUpdate:
+    """Result of an incremental re-index, enough to patch a search index in place."""
+    removed: List[int] = field(default_factory=list)  # positions in the previous chunk list, ascending
+    added: List[Document] = field(default_factory=list)  # new chunks, appended after the kept ones
+    commit: Optional[str] = None
+    # The store was replaced wholesale (full re-index, or another process's newer version): rebuild, don't patch
+    rebuilt: bool = False
 
 # Database manager
 class DatabaseManager:
     def __init__(self):
-        self.db = None
+        self.db: Optional[VectorStore] = None
+        self.version: Optional[int] = None  # published version of `db`, see app/index_versions.py
         self.repo_paths = None
+        self._lexical = None  # (store, LexicalIndex) for the store it was built from
+        self._symbols = None  # (store, SymbolIndex) likewise
 
     # Prepare database
-    def prepare_database(self, repo_url_or_path: str):
+    def prepare_database(self, repo_url_or_path: str, update: bool = False):
         self.db = None
         self.repo_paths = None
-        self._create_repo(repo_url_or_path)
-        return self.prepare_db_index()
+        self._create_repo(repo_url_or_path, fetch=False)
+        # One writer per repo across processes; the others wait here, then open what it published
+        with writer_lock(self.repo_paths["save_db_dir"]):
+            self._fetch()
+            docs = self.prepare_db_index()
+            if update and self.db is not None:
+                self._update_db_index()
+                docs = self.db.documents()
+        return docs
+
+    # Open the published index from disk without fetching or re-indexing; False if none exists
+    def load_database(self, repo_url_or_path: str) -> bool:
+        self.db = None
+        self._create_repo(repo_url_or_path, fetch=False)
+        manifest = self._load_meta()
+        path = store_dir(self.repo_paths["save_db_dir"], manifest)
+        if path is None or not VectorStore.exists(path):
+            return False
+        self.db = VectorStore.open(path)
+        self.version = manifest.get("version", 0)
+        if not self._embedder_matches():
+            self.db = None
+            return False
+        return True
 
-    # Create repo
-    def _create_repo(self, repo_url_or_path: str):
+    # Version of the repo's index most recently published by any process
+    def published_version(self) -> int:
+        return self._load_meta().get("version", 0)
+
+    # BM25 index over the current store's chunks, loaded from or built into the store directory
+    def lexical_index(self) -> Optional[LexicalIndex]:
+        if self.db is None or not config["hybrid"]["enabled"]:
+            return None
+        if self._lexical is None or self._lexical[0] is not self.db:
+            self._lexical = (self.db, LexicalIndex.load_or_build(self.db))
+        return self._lexical[1]
+
+    # Symbol graph over the current store's files; stores written without one are re-read from the checkout
+    def symbol_index(self) -> Optional[SymbolIndex]:
+        if self.db is None or not config["symbols"]["enabled"]:
+            return None
+        if self._symbols is None or self._symbols[0] is not self.db:
+            repo_dir = self.repo_paths["save_repo_dir"]
+            self._symbols = (self.db, SymbolIndex.load_or_build(self.db, lambda: read_all_documents(repo_dir)))
+        return self._symbols[1]
+
+    # Create repo; with fetch=False only the storage paths are resolved
+    def _create_repo(self, repo_url_or_path: str, fetch: bool = True):
         printc(f"Preparing repo storage for {repo_url_or_path}...")
         root_path = get_adalflow_default_root_path()
         os.makedirs(root_path, exist_ok=True)
 
         if repo_url_or_path.startswith("http"):
-            repo_name = repo_url_or_path.split("/")[-1].replace(".git", "")
+            # Key storage by host/owner/repo/ref so forks and branches never share a checkout
+            repo_name = parse_repo_url(repo_url_or_path).key
             save_repo_dir = os.path.join(root_path, "repos", repo_name)
-            download_github_repo(repo_url_or_path, save_repo_dir)
         else:
             repo_name = os.path.basename(repo_url_or_path)
             save_repo_dir = repo_url_or_path
 
-        save_db_file = os.path.join(root_path, "databases", f"{repo_name}.pkl")
+        # Versions of the store are published next to it as <repo>.store.v<N>
+        save_db_dir = os.path.join(root_path, "databases", f"{repo_name}.store")
         os.makedirs(save_repo_dir, exist_ok=True)
-        os.makedirs(os.path.dirname(save_db_file), exist_ok=True)
-        self.repo_paths = {"save_repo_dir": save_repo_dir, "save_db_file": save_db_file}
+        os.makedirs(os.path.dirname(save_db_dir), exist_ok=True)
+        self.repo_paths = {
+            "save_repo_dir": save_repo_dir,
+            "save_db_dir": save_db_dir,
+            "legacy_db_file": os.path.join(root_path, "databases", f"{repo_name}.pkl"),
+            "save_meta_file": os.path.join(root_path, "databases", f"{repo_name}.meta.json"),
+            "repo_url": repo_url_or_path if repo_url_or_path.startswith("http") else None,
+        }
         printc(f"Repo paths: {self.repo_paths}")
+        if fetch:
+            self._fetch()
+
+    # Clone a remote repo, or bring its clone up to date; local paths are used as they are
+    def _fetch(self):
+        if self.repo_paths["repo_url"]:
+            download_github_repo(self.repo_paths["repo_url"], self.repo_paths["save_repo_dir"], **config["repo_fetch"])
+
+    # Read the published manifest (version, store directory, indexed commit and embedder)
+    def _load_meta(self) -> dict:
+        return read_manifest(self.repo_paths["save_meta_file"])
+
+    # Directory for the next version's store; only written under the writer lock
+    def _next_store_dir(self) -> str:
+        return version_dir(self.repo_paths["save_db_dir"], self._load_meta().get("version", 0) + 1)
+
+    # Make the current store (with its search indexes already saved) the repo's published version
+    def _publish(self, commit: Optional[str]):
+        self.version = publish(
+            self.repo_paths["save_meta_file"],
+            self.repo_paths["save_db_dir"],
+            self.db.path if self.db is not None else None,
+            commit,
+            embedder_id(config["embedder"]),
+            keep=config["sharing"]["keep_versions"],
+        )
+
+    # Whether the store's vectors came from the configured embedder; stores predating the record are trusted
+    def _embedder_matches(self) -> bool:
+        recorded = self._load_meta().get("embedder")
+        current = embedder_id(config["embedder"])
+        if recorded is not None and recorded != current:
+            printc(f"Index was built with {recorded}, not {current}.", color="yellow")
+            return False
+        dimensions = config["embedder"]["dimensions"]
+        if self.db is not None and len(self.db) and self.db.dim != dimensions:
+            # e.g. Gemini stores from before output_dimensionality was requested hold 3072-d vectors
+            printc(f"Index holds {self.db.dim}-dimensional vectors, not {dimensions}.", color="yellow")
+            return False
+        return True
 
     # Prepare database index
     def prepare_db_index(self):
-        save_db = self.repo_paths["save_db_file"]
-        if os.path.exists(save_db) and os.path.getsize(save_db) > 0:
-            printc("Trying to load existing database...")
-            try:
-                self.db = LocalDB.load_state(save_db)
-                docs = self.db.get_transformed_data(key="split_and_embed")
-                if docs:
-                    return docs
-            except Exception:
-                printc("Failed load/empty — reindexing.")
+        manifest = self._load_meta()
+        save_db = store_dir(self.repo_paths["save_db_dir"], manifest)
+        legacy_db = self.repo_paths["legacy_db_file"]
+        try:
+            if save_db is not None and VectorStore.exists(save_db):
+                printc("Trying to load existing database...")
+                self.db = VectorStore.open(save_db)
+                self.version = manifest.get("version", 0)
+            elif os.path.exists(legacy_db) and os.path.getsize(legacy_db) > 0:
+                self.db = migrate_legacy_db(legacy_db, self._next_store_dir())
+                if self.db is not None:
+                    self._publish(None)
+            if self.db is not None and len(self.db) and self._embedder_matches():
+                return self.db.documents()
+        except Exception:
+            printc("Failed load/empty — reindexing.")
 
         printc("Creating new database...")
-        docs = read_all_documents(self.repo_paths["save_repo_dir"])
-        self.db = transform_documents_and_save_to_db(docs, save_db)
-        return self.db.get_transformed_data(key="split_and_embed")
+        repo_dir = self.repo_paths["save_repo_dir"]
+        commit = get_head_commit(repo_dir)
+        docs = read_all_documents(repo_dir)
+        self.db = transform_documents_and_save_to_db(docs, self._next_store_dir())
+        if self.db is None:
+            return []
+        self._publish(commit)
+        return self.db.documents()
+
+    # Bring a cloned repo up to date with its remote and return the new HEAD
+    def _pull_latest(self) -> Optional[str]:
+        repo_dir = self.repo_paths["save_repo_dir"]
+        if self.repo_paths["repo_url"]:
+            try:
+                return download_github_repo(self.repo_paths["repo_url"], repo_dir, **config["repo_fetch"])
+            except RuntimeError as e:
+                printc(f"Fetch failed, indexing local HEAD: {e}", color="yellow")
+        return get_head_commit(repo_dir)
+
+    # Re-index only the files that changed since the indexed commit, and publish the result
+    def update_db_index(self) -> IndexUpdate:
+        with writer_lock(self.repo_paths["save_db_dir"]):
+            return self._update_db_index()
+
+    def _update_db_index(self) -> IndexUpdate:
+        repo_dir = self.repo_paths["save_repo_dir"]
+        manifest = self._load_meta()
+        rebuilt = False
+        if manifest.get("version", 0) != self.version:
+            # Another process published since this one loaded: continue from its index
+            path = store_dir(self.repo_paths["save_db_dir"], manifest)
+            if path is not None and VectorStore.exists(path):
+                printc(f"Index version {manifest.get('version')} was published by another process; loading it.")
+                self.db = VectorStore.open(path)
+                self.version = manifest.get("version", 0)
+                rebuilt = True
+        old_commit = manifest.get("commit")
+        new_commit = self._pull_latest()
+
+        same_embedder = self._embedder_matches()
+        if same_embedder and (new_commit is None or old_commit == new_commit):
+            printc("Index is up to date.")
+            return IndexUpdate(commit=new_commit, rebuilt=rebuilt)
+        if old_commit is None or not same_embedder:
+            # No recorded commit, or vectors from another embedder: rebuild from scratch
+            printc("Reindexing everything.")
+            old_count = len(self.db)
+            self.db = transform_documents_and_save_to_db(read_all_documents(repo_dir), self._next_store_dir())
+            self._publish(new_commit)
+            return IndexUpdate(
+                removed=list(range(old_count)),
+                added=list(self.db.documents()) if self.db is not None else [],
+                commit=new_commit,
+                rebuilt=True,
+            )
+
+        changed, deleted = diff_commits(repo_dir, old_commit, new_commit)
+        stale = changed | deleted
+        chunk_paths = [chunk_file_paths(self.db.meta(i)["meta_data"]) for i in range(len(self.db))]
+        removed = [i for i, paths in enumerate(chunk_paths) if stale.intersection(paths)]
+        kept = [i for i, paths in enumerate(chunk_paths) if not stale.intersection(paths)]
+        # Unchanged files that shared a dropped chunk lose that content too, so they are re-read;
+        # their other chunks fold back into the kept ones and their vectors come from the embedding cache
+        co_owners = {rel for i in removed for rel in chunk_paths[i]} - stale
+        to_read = sorted(rel for rel in changed | co_owners if is_indexable(repo_dir, rel))
+        new_items = [doc for doc in (load_document(repo_dir, rel) for rel in to_read) if doc is not None]
+        kept_docs = [self.db.document(i) for i in kept]
+        new_chunks = split_documents(new_items, prepare_splitter())
+        deduplicator = prepare_deduplicator()
+        if deduplicator and new_chunks:
+            # Only exact matches are folded into kept chunks; near duplicates are found among the new ones
+            known = {doc.meta_data.get("content_hash") or content_hash(doc.text): doc for doc in kept_docs}
+            new_chunks = deduplicator(new_chunks, known=known)
+        added = list(prepare_embedder_transformer()(new_chunks)) if new_chunks else []
+        # Symbols of unchanged files carry over from the current version
+        symbols = SymbolIndex.load(self.db.path) if config["symbols"]["enabled"] else None
+        if symbols is not None:
+            new_symbols = {}
+            for _ in collect_symbols(new_items, new_symbols):
+                pass
+            symbols = symbols.update(new_symbols, stale)
+        printc(
+            f"Incremental update {old_commit[:8]}..{new_commit[:8]}: "
+            f"{len(to_read)} files re-read, {len(deleted)} deleted, {len(removed)} chunks dropped, {len(added)} added"
+        )
+
+        # Kept chunks are copied straight from the mapped matrix rather than rebuilt from Documents
+        docs = kept_docs + added
+        vectors = np.concatenate([
+            self.db.vector_rows(np.asarray(kept, dtype=np.int64)),
+            np.asarray([doc.vector for doc in added], dtype=np.float32).reshape(len(added), self.db.dim),
+        ])
+        with span("index", kind="store", items=len(docs)):
+            self.db = VectorStore.write(self._next_store_dir(), docs, dtype=config["vector_store"]["dtype"], vectors=vectors)
+        save_search_indexes(self.db, symbols)
+        self._publish(new_commit)
+        return IndexUpdate(removed=removed, added=added, commit=new_commit, rebuilt=rebuilt)
@@ -0,0 +1,169 @@
+import re
+import zlib
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from adalflow.core.component import DataComponent
+from adalflow.core.types import Document
+from adalflow.utils import printc
+
+from app.telemetry import span
+
+_TOKEN_RE = re.compile(r"\w+")
+# Mersenne prime for the MinHash permutations (a * h + b) mod p
+_PRIME = np.uint64((1 << 61) - 1)
+_MASK32 = np.uint64(0xFFFFFFFF)
+
+
+# Whitespace-insensitive content hash: re-indented or re-wrapped copies still match
+def content_hash(text: str) -> str:
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+# Every file a chunk appears in; stores written before deduplication only know one
+def chunk_file_paths(meta_data: Dict[str, Any]) -> List[str]:
+    return meta_data.get("file_paths") or [meta_data.get("file_path")]
+
+
+# Lines a chunk spans in one of its files (copies sit at other lines than the canonical one);
+# None for chunks without lines and for copies recorded before ranges were kept per file
+def chunk_line_range(meta_data: Dict[str, Any], path: str) -> Optional[Tuple[int, int]]:
+    ranges = meta_data.get("line_ranges") or {}
+    if path in ranges:
+        start, end = ranges[path]
+        return start, end
+    if path == meta_data.get("file_path") and "start_line" in meta_data:
+        return meta_data["start_line"], meta_data["end_line"]
+    return None
+
+
+# Canonical copy among duplicates: the shallowest path, so vendored and nested copies lose
+def _path_rank(doc: Document):
+    path = doc.meta_data.get("file_path") or ""
+    return path.count("/"), path, doc.order or 0
+
+
+class MinHasher:
+    """MinHash signatures over word shingles, with LSH banding to find candidate pairs."""
+
+    def __init__(self, num_perm: int = 64, bands: int = 8, shingle_size: int = 5, seed: int = 0):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        rng = np.random.default_rng(seed)
+        # 32-bit coefficients keep a * h (h < 2**32) inside uint64
+        self.a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature, or None for text too short to have a full shingle."""
+        tokens = _TOKEN_RE.findall(text.lower())
+        k = self.shingle_size
+        if len(tokens) < k:
+            return None
+        shingles = {" ".join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        permuted = (np.outer(hashes, self.a) + self.b) % _PRIME & _MASK32
+        return permuted.min(axis=0)
+
+    def band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [bytes([band]) + signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+
+def estimated_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
+class ChunkDeduplicator(DataComponent):
+    """Drop exact and near-duplicate chunks before they are embedded.
+
+    Exact duplicates share a whitespace-insensitive content hash; near
+    duplicates have an estimated Jaccard similarity of word shingles of at
+    least `threshold`. The canonical chunk (shallowest path) is kept and its
+    ``meta_data["file_paths"]`` lists every file the content appears in, and
+    for code chunks ``meta_data["line_ranges"]`` the lines it spans in each.
+    Every output chunk gets ``file_paths`` and ``content_hash``.
+    """
+
+    def __init__(self, near_duplicates: bool = True, threshold: float = 0.85, num_perm: int = 64,
+                 bands: int = 8, shingle_size: int = 5):
+        super().__init__()
+        self.near_duplicates = near_duplicates
+        self.threshold = threshold
+        self.minhasher = MinHasher(num_perm, bands, shingle_size) if near_duplicates else None
+
+    def call(self, documents: List[Document], known: Optional[Dict[str, Document]] = None) -> List[Document]:
+        """Deduplicate `documents`; those matching a `known` chunk by content hash are
+        folded into it (its file_paths and line_ranges are extended in place) and not returned."""
+        with span("dedup", items=len(documents)) as dedup_span:
+            kept = self._dedup(documents, known if known is not None else {})
+            dedup_span.set(kept=len(kept))
+        return kept
+
+    def _dedup(self, documents: List[Document], known: Dict[str, Document]) -> List[Document]:
+        groups: Dict[str, List[Document]] = {}
+        for doc in documents:
+            groups.setdefault(content_hash(doc.text), []).append(doc)
+
+        exact_dropped = 0
+        canonical: List[Document] = []
+        for digest, docs in groups.items():
+            docs.sort(key=_path_rank)
+            if digest in known:
+                _fold(known[digest], docs)
+                exact_dropped += len(docs)
+                continue
+            keep = docs[0]
+            _fold(keep, docs[1:])
+            keep.meta_data["content_hash"] = digest
+            canonical.append(keep)
+            exact_dropped += len(docs) - 1
+
+        kept = self._drop_near_duplicates(canonical) if self.near_duplicates else canonical
+        if exact_dropped or len(kept) < len(canonical):
+            printc(
+                f"Dedup: {len(documents)} chunks -> {len(kept)} "
+                f"({exact_dropped} exact, {len(canonical) - len(kept)} near duplicates)",
+                color="blue",
+            )
+        return kept
+
+    # Cluster with LSH buckets, confirm with the signature estimate, fold paths into the canonical chunk.
+    # Chunks are visited shallowest path first so the canonical copy is the first one kept.
+    def _drop_near_duplicates(self, documents: List[Document]) -> List[Document]:
+        signatures = [self.minhasher.signature(doc.text) for doc in documents]
+        buckets: Dict[bytes, List[int]] = {}
+        merged_into: Dict[int, int] = {}
+        for i in sorted(range(len(documents)), key=lambda i: _path_rank(documents[i])):
+            sig = signatures[i]
+            if sig is None:
+                continue
+            keys = self.minhasher.band_keys(sig)
+            candidates = {j for key in keys for j in buckets.get(key, ())}
+            match = next((j for j in candidates if estimated_jaccard(sig, signatures[j]) >= self.threshold), None)
+            if match is not None:
+                merged_into[i] = match
+                continue
+            for key in keys:
+                buckets.setdefault(key, []).append(i)
+
+        for i, j in merged_into.items():
+            _fold(documents[j], [documents[i]])
+        return [doc for i, doc in enumerate(documents) if i not in merged_into]
+
+
+# Record the files and lines of `duplicates` on the chunk that stands in for them; the first range seen for a path wins
+def _fold(canonical: Document, duplicates: List[Document]):
+    docs = [canonical, *duplicates]
+    canonical.meta_data["file_paths"] = list(dict.fromkeys(p for doc in docs for p in chunk_file_paths(doc.meta_data)))
+    ranges: Dict[str, List[int]] = {}
+    for doc in docs:
+        for path in chunk_file_paths(doc.meta_data):
+            line_range = chunk_line_range(doc.meta_data, path)
+            if line_range is not None:
+                ranges.setdefault(path, list(line_range))
+    if ranges:
+        canonical.meta_data["line_ranges"] = ranges
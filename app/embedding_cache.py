@@ -0,0 +1,218 @@
+import os
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from adalflow.core.model_client import ModelClient
+from adalflow.core.types import ModelType, Embedding, EmbedderOutput
+from adalflow.utils import get_adalflow_default_root_path
+
+from app.telemetry import record_cache
+
+log = logging.getLogger(__name__)
+
+
+# Content address of one embedding: everything that changes the vector, plus the text
+def embedding_cache_key(model: str, task_type: str, dimensions: Optional[int], text: str) -> str:
+    h = hashlib.sha256()
+    for part in (model, task_type, str(dimensions or "")):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent, size-bounded LRU cache of embedding vectors in SQLite.
+
+    Keys are content hashes, so identical chunks from any repo, branch or
+    re-index share one entry. Vectors are stored as float32 blobs.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 2 * 1024 ** 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings(last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        """Return cached vectors for the keys found, refreshing their recency."""
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # SQLite limits bound parameters per statement
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            now = time.time()
+            self._conn.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, k) for k in found])
+            self._conn.commit()
+            self.hits += sum(1 for k in keys if k in found)
+            self.misses += sum(1 for k in keys if k not in found)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, vector in items.items():
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((key, blob, len(blob), now))
+        with self._lock:
+            existing = 0
+            for start in range(0, len(rows), 500):
+                chunk = [r[0] for r in rows[start:start + 500]]
+                existing += self._conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchone()[0]
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._total_bytes += sum(r[2] for r in rows) - existing
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    # Drop least recently used entries until the cache is back under 90% of its budget
+    def _evict(self):
+        target = int(self.max_bytes * 0.9)
+        while self._total_bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM embeddings ORDER BY last_access LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            victims = []
+            for key, size in rows:
+                victims.append((key,))
+                self._total_bytes -= size
+                if self._total_bytes <= target:
+                    break
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+            self.evictions += len(victims)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_shared_caches: Dict[str, EmbeddingCache] = {}
+_shared_lock = threading.Lock()
+
+
+# One cache instance per file, shared by every client in the process
+def get_shared_cache(path: Optional[str] = None, max_bytes: int = 2 * 1024 ** 3) -> EmbeddingCache:
+    path = path or os.path.join(get_adalflow_default_root_path(), "embedding_cache.sqlite")
+    with _shared_lock:
+        if path not in _shared_caches:
+            _shared_caches[path] = EmbeddingCache(path, max_bytes=max_bytes)
+        return _shared_caches[path]
+
+
+class CachedEmbedderClient(ModelClient):
+    """A model client that serves embeddings from `EmbeddingCache` and forwards misses.
+
+    Wraps another embedder client (e.g. `GeminiEmbedderClient`); only texts
+    not already cached are sent to it, in a single call.
+    """
+
+    def __init__(self, client: ModelClient, cache: EmbeddingCache, dimensions: Optional[int] = None):
+        super().__init__()
+        self.client = client
+        self.cache = cache
+        self.dimensions = dimensions
+
+    def convert_inputs_to_api_kwargs(
+        self,
+        input: Optional[Any] = None,
+        model_kwargs: Dict = {},
+        model_type: ModelType = ModelType.UNDEFINED,
+    ) -> Dict:
+        return self.client.convert_inputs_to_api_kwargs(input=input, model_kwargs=model_kwargs, model_type=model_type)
+
+    def _dimensions(self, api_kwargs: Dict) -> Optional[int]:
+        return api_kwargs.get("output_dimensionality", self.dimensions)
+
+    def _keys(self, api_kwargs: Dict) -> List[str]:
+        model = api_kwargs.get("model", "")
+        task_type = api_kwargs.get("task_type", "RETRIEVAL_DOCUMENT")
+        dimensions = self._dimensions(api_kwargs)
+        return [embedding_cache_key(model, task_type, dimensions, text) for text in api_kwargs.get("input", [])]
+
+    # Split the request into cached vectors and the api_kwargs for the misses
+    def _lookup(self, api_kwargs: Dict):
+        keys = self._keys(api_kwargs)
+        cached = self.cache.get_many(keys)
+        dimensions = self._dimensions(api_kwargs)
+        if dimensions:
+            # Entries from before the size was sent to the provider may hold its default size
+            cached = {key: vector for key, vector in cached.items() if len(vector) == dimensions}
+        texts = list(api_kwargs.get("input", []))
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        record_cache("embedding", hits=len(keys) - len(missing), misses=len(missing))
+        miss_kwargs = {**api_kwargs, "input": [texts[i] for i in missing]}
+        return keys, cached, missing, miss_kwargs
+
+    def _merge(self, keys: List[str], cached: Dict[str, List[float]], missing: List[int], response: Any) -> List[Optional[List[float]]]:
+        vectors: List[Optional[List[float]]] = [cached.get(key) for key in keys]
+        if missing:
+            fresh: Dict[str, List[float]] = {}
+            for emb in self.client.parse_embedding_response(response).data or []:
+                i = missing[emb.index]
+                vectors[i] = emb.embedding
+                fresh[keys[i]] = emb.embedding
+            self.cache.put_many(fresh)
+        return vectors
+
+    def call(self, api_kwargs: Dict = {}, model_type: ModelType = ModelType.UNDEFINED):
+        keys, cached, missing, miss_kwargs = self._lookup(api_kwargs)
+        response = self.client.call(api_kwargs=miss_kwargs, model_type=model_type) if missing else None
+        return self._merge(keys, cached, missing, response)
+
+    # SQLite reads and commits run in a worker thread so they don't stall the event loop
+    async def acall(self, api_kwargs: Dict = {}, model_type: ModelType = ModelType.UNDEFINED):
+        keys, cached, missing, miss_kwargs = await asyncio.to_thread(self._lookup, api_kwargs)
+        response = await self.client.acall(api_kwargs=miss_kwargs, model_type=model_type) if missing else None
+        return await asyncio.to_thread(self._merge, keys, cached, missing, response)
+
+    def parse_embedding_response(self, response: Any) -> EmbedderOutput:
+        """`call` already returns vectors in input order; drop any the provider failed to return."""
+        embeddings = [
+            Embedding(index=i, embedding=vector) for i, vector in enumerate(response) if vector is not None
+        ]
+        return EmbedderOutput(data=embeddings)
+
+    def log_stats(self):
+        stats = self.cache.stats()
+        log.info(
+            f"EmbeddingCache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.1%}), {stats['size_bytes'] / 1024 ** 2:.1f} MB"
+        )
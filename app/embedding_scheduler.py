@@ -0,0 +1,202 @@
+import re
+import time
+import random
+import asyncio
+import logging
+from copy import deepcopy
+from typing import Any, Dict, List, Optional, Sequence
+
+from adalflow.core.component import DataComponent
+from adalflow.core.model_client import ModelClient
+from adalflow.core.types import Document, ModelType
+from adalflow.utils import printc
+
+from app.telemetry import span
+
+log = logging.getLogger(__name__)
+
+
+# Rough token estimate for budget accounting; ~4 characters per token
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+# Whether an exception from a model client means "slow down"
+def _is_rate_limited(e: Exception) -> bool:
+    code = getattr(e, "code", None) or getattr(e, "status_code", None)
+    return code == 429
+
+
+# Whether an exception is a transient server-side failure
+def _is_retryable(e: Exception) -> bool:
+    code = getattr(e, "code", None) or getattr(e, "status_code", None)
+    return _is_rate_limited(e) or (isinstance(code, int) and code >= 500)
+
+
+# Server-suggested wait in seconds (RetryInfo.retryDelay, e.g. "17s"), if any
+def _retry_delay_hint(e: Exception) -> Optional[float]:
+    match = re.search(r"retryDelay['\"]?\s*:\s*['\"]?(\d+(?:\.\d+)?)s", str(getattr(e, "details", "")) + str(e))
+    return float(match.group(1)) if match else None
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute token buckets with an adaptive scale.
+
+    Every 429 halves the effective rate and pauses all callers; each success
+    recovers a little of it, so the scheduler converges on what the quota allows.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, min_scale: float = 0.1):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.min_scale = min_scale
+        self.scale = 1.0
+        self._request_budget = float(requests_per_minute)
+        self._token_budget = float(tokens_per_minute)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self._request_budget = min(
+            self.requests_per_minute,
+            self._request_budget + elapsed * self.requests_per_minute * self.scale / 60,
+        )
+        self._token_budget = min(
+            self.tokens_per_minute,
+            self._token_budget + elapsed * self.tokens_per_minute * self.scale / 60,
+        )
+
+    async def acquire(self, tokens: int):
+        """Wait until one request carrying `tokens` tokens fits in both budgets."""
+        # A single request larger than the whole budget is let through once the bucket is full
+        tokens = min(tokens, self.tokens_per_minute)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill()
+                if self._request_budget >= 1 and self._token_budget >= tokens:
+                    self._request_budget -= 1
+                    self._token_budget -= tokens
+                    return
+                request_wait = (1 - self._request_budget) * 60 / (self.requests_per_minute * self.scale)
+                token_wait = (tokens - self._token_budget) * 60 / (self.tokens_per_minute * self.scale)
+                await asyncio.sleep(max(request_wait, token_wait, 0.01))
+
+    def on_success(self):
+        self.scale = min(1.0, self.scale + 0.05)
+
+    def on_rate_limited(self, delay: float):
+        self.scale = max(self.min_scale, self.scale / 2)
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+
+class EmbeddingScheduler:
+    """Keeps up to `max_in_flight` embedding batches in flight within rate limits.
+
+    Batches are sent through the model client's `acall`. Rate limited and
+    server-failed batches are retried with exponential backoff (or the
+    server's retry hint) while the shared `RateLimiter` throttles everyone.
+    """
+
+    def __init__(
+        self,
+        model_client: ModelClient,
+        model_kwargs: Dict[str, Any],
+        batch_size: int = 100,
+        max_in_flight: int = 4,
+        requests_per_minute: int = 1500,
+        tokens_per_minute: int = 1_000_000,
+        max_retries: int = 8,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        self.model_client = model_client
+        self.model_kwargs = model_kwargs
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    async def _embed_batch(self, texts: List[str], limiter: RateLimiter, semaphore: asyncio.Semaphore) -> List[List[float]]:
+        api_kwargs = self.model_client.convert_inputs_to_api_kwargs(
+            input=texts, model_kwargs=self.model_kwargs, model_type=ModelType.EMBEDDER
+        )
+        tokens = sum(estimate_tokens(t) for t in texts)
+        for attempt in range(self.max_retries + 1):
+            await limiter.acquire(tokens)
+            try:
+                async with semaphore:
+                    response = await self.model_client.acall(api_kwargs=api_kwargs, model_type=ModelType.EMBEDDER)
+            except Exception as e:
+                if not _is_retryable(e) or attempt == self.max_retries:
+                    raise
+                delay = _retry_delay_hint(e) or min(self.max_delay, self.base_delay * 2 ** attempt)
+                delay *= random.uniform(1.0, 1.25)
+                if _is_rate_limited(e):
+                    limiter.on_rate_limited(delay)
+                    printc(f"EmbeddingScheduler: Rate limited, pausing {delay:.1f}s at {limiter.scale:.2f}x rate", color="yellow")
+                else:
+                    printc(f"EmbeddingScheduler: Server error ({e}), retrying in {delay:.1f}s", color="yellow")
+                    await asyncio.sleep(delay)
+                continue
+            limiter.on_success()
+            output = self.model_client.parse_embedding_response(response)
+            vectors: List[Optional[List[float]]] = [None] * len(texts)
+            for emb in output.data or []:
+                vectors[emb.index] = emb.embedding
+            if any(v is None for v in vectors):
+                raise RuntimeError(f"Embedding batch returned {len(output.data or [])} of {len(texts)} vectors")
+            return vectors
+
+    async def aembed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embed all texts, returning vectors in input order."""
+        texts = list(texts)
+        if not texts:
+            return []
+        limiter = RateLimiter(self.requests_per_minute, self.tokens_per_minute)
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self._embed_batch(b, limiter, semaphore) for b in batches))
+        printc(
+            f"EmbeddingScheduler: Embedded {len(texts)} texts in {len(batches)} batches "
+            f"({time.perf_counter() - started:.1f}s)",
+            color="blue",
+        )
+        return [vector for batch in results for vector in batch]
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Synchronous entry point; must not be called from a running event loop."""
+        return asyncio.run(self.aembed(texts))
+
+
+class ScheduledToEmbeddings(DataComponent):
+    """Drop-in replacement for adalflow's `ToEmbeddings` backed by `EmbeddingScheduler`."""
+
+    def __init__(self, scheduler: EmbeddingScheduler) -> None:
+        super().__init__()
+        self.scheduler = scheduler
+
+    def __call__(self, input: Sequence[Document]) -> Sequence[Document]:
+        output = deepcopy(input)
+        texts = [chunk.text for chunk in output]
+        with span("embed", items=len(texts), embedding_tokens=sum(estimate_tokens(t) for t in texts)):
+            vectors = self.scheduler.embed(texts)
+        for chunk, vector in zip(output, vectors):
+            chunk.vector = vector
+        if hasattr(self.scheduler.model_client, "log_stats"):
+            self.scheduler.model_client.log_stats()
+        return output
+
+    def _extra_repr(self) -> str:
+        return f"batch_size={self.scheduler.batch_size}, max_in_flight={self.scheduler.max_in_flight}"
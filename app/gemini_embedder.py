@@ -3,24 +3,65 @@ import backoff
 import logging
 from typing import Dict, Sequence, Optional, Any, List
 
+import numpy as np
 from adalflow.core.model_client import ModelClient
 from adalflow.core.types import ModelType, Embedding, EmbedderOutput
 from google import genai
 from google.genai import types
-
-from google.api_core.exceptions import InternalServerError, BadRequest, GoogleAPICallError
+from google.genai.errors import ClientError, ServerError
 
 from adalflow.utils import printc
 log = logging.getLogger(__name__)
 
+# Maximum number of texts the Gemini API accepts in one embed_content request
+MAX_TEXTS_PER_REQUEST = 100
+
+
+# Rate limits and server errors are worth retrying; other client errors are not
+def _should_give_up(e: Exception) -> bool:
+    return isinstance(e, ClientError) and e.code != 429
+
+
+# Embeddings requested at a reduced output_dimensionality are not unit length; rescale so dot product is cosine
+def _unit(values: Sequence[float]) -> List[float]:
+    vector = np.asarray(values, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+# A batch response must hold one embedding per text, or later batches' indexes would point at the wrong texts
+def _check_batch(response: Any, texts: List[str]) -> Any:
+    count = len(getattr(response, "embeddings", None) or [])
+    if count != len(texts):
+        raise ValueError(f"GeminiEmbedder: batch of {len(texts)} texts returned {count} embeddings")
+    return response
+
+
+# Whether the API rejected a request because the batch was too large
+def _is_batch_too_large(e: ClientError) -> bool:
+    if e.code == 413:
+        return True
+    if e.code != 400:
+        return False
+    message = str(e).lower()
+    return any(hint in message for hint in ("batch", "too large", "too many", "payload", "size"))
+
+
 class GeminiEmbedderClient(ModelClient):
-    """A custom model client for Google Gemini embeddings."""
+    """A custom model client for Google Gemini embeddings.
+
+    `dimensions` is sent as the request's `output_dimensionality`: Gemini
+    embeddings are Matryoshka-trained, so the model returns a truncated
+    prefix of its full (3072-dimensional) vector, which is renormalized here.
+    None keeps the model's default size.
+    """
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, dimensions: Optional[int] = None):
         super().__init__()
         self._api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not self._api_key:
             raise ValueError("GEMINI_API_KEY must be set")
+        self.dimensions = dimensions
 
         self.sync_client = genai.Client(api_key=self._api_key)
 
@@ -30,27 +71,30 @@ class GeminiEmbedderClient(ModelClient):
         The google-genai SDK returns EmbedContentResponse objects with an
         `embeddings` attribute (plural) — a list of ContentEmbedding objects,
         each having a `values` attribute with the actual embedding vector.
+        `call()` returns one response per batch request, in input order, so the
+        index of each embedding is its batch offset plus its position in the batch.
+        A batch that can't be parsed raises, since its size is unknown.
         """
         embeddings: List[Embedding] = []
         
-        # Response is a list of EmbedContentResponse from call()
+        # Response is a list of EmbedContentResponse from call(), one per batch
         if isinstance(response, list):
-            for idx, result in enumerate(response):
-                parsed = False
-                
+            offset = 0
+            for result in response:
                 # google-genai SDK: result.embeddings is a list of ContentEmbedding
                 if hasattr(result, 'embeddings') and result.embeddings:
-                    for content_emb in result.embeddings:
+                    for pos, content_emb in enumerate(result.embeddings):
                         if hasattr(content_emb, 'values') and content_emb.values:
-                            embeddings.append(Embedding(index=idx, embedding=list(content_emb.values)))
-                            parsed = True
-                            break
-                    if parsed:
-                        continue
+                            embeddings.append(Embedding(index=offset + pos, embedding=_unit(content_emb.values)))
+                        else:
+                            printc(f"GeminiEmbedder: Empty embedding at index {offset + pos}", color="yellow")
+                    offset += len(result.embeddings)
+                    continue
 
                 # Fallback: older API style with result.embedding (singular)
                 if hasattr(result, 'embedding') and hasattr(result.embedding, 'values'):
-                    embeddings.append(Embedding(index=idx, embedding=list(result.embedding.values)))
+                    embeddings.append(Embedding(index=offset, embedding=_unit(result.embedding.values)))
+                    offset += 1
                     continue
                 
                 # Check for dict access
@@ -58,23 +102,25 @@ class GeminiEmbedderClient(ModelClient):
                     if 'embedding' in result:
                         emb = result['embedding']
                         if isinstance(emb, dict) and 'values' in emb:
-                            embeddings.append(Embedding(index=idx, embedding=emb['values']))
+                            embeddings.append(Embedding(index=offset, embedding=_unit(emb['values'])))
                         else:
-                            embeddings.append(Embedding(index=idx, embedding=emb))
+                            embeddings.append(Embedding(index=offset, embedding=_unit(emb)))
+                        offset += 1
                         continue
 
-                # If we get here, log the problem
-                printc(f"GeminiEmbedder: Failed to parse result {idx}. Type: {type(result)}. Contents: {str(result)[:200]}", color="yellow")
+                raise ValueError(
+                    f"GeminiEmbedder: Failed to parse result at index {offset}. Type: {type(result)}. Contents: {str(result)[:200]}"
+                )
 
         elif hasattr(response, 'embeddings') and response.embeddings:
             # Single EmbedContentResponse
-            content_emb = response.embeddings[0]
-            if hasattr(content_emb, 'values') and content_emb.values:
-                embeddings.append(Embedding(index=0, embedding=list(content_emb.values)))
+            for pos, content_emb in enumerate(response.embeddings):
+                if hasattr(content_emb, 'values') and content_emb.values:
+                    embeddings.append(Embedding(index=pos, embedding=_unit(content_emb.values)))
         elif hasattr(response, 'embedding') and hasattr(response.embedding, 'values'):
-            embeddings.append(Embedding(index=0, embedding=list(response.embedding.values)))
+            embeddings.append(Embedding(index=0, embedding=_unit(response.embedding.values)))
             
-        printc(f"GeminiEmbedder: Parsed {len(embeddings)} embeddings", color="blue")
+        log.debug(f"GeminiEmbedder: Parsed {len(embeddings)} embeddings")
         return EmbedderOutput(data=embeddings)
 
     def convert_inputs_to_api_kwargs(
@@ -97,34 +143,100 @@ class GeminiEmbedderClient(ModelClient):
 
     @backoff.on_exception(
         backoff.expo,
-        (InternalServerError, BadRequest, GoogleAPICallError),
+        (ClientError, ServerError),
+        max_time=5,
+        giveup=_should_give_up,
+    )
+    def _embed_batch(self, model: str, texts: List[str], config: types.EmbedContentConfig) -> Any:
+        """Embed one batch of texts in a single request."""
+        return _check_batch(self.sync_client.models.embed_content(model=model, contents=texts, config=config), texts)
+
+    @backoff.on_exception(
+        backoff.expo,
+        (ClientError, ServerError),
         max_time=5,
+        giveup=_should_give_up,
     )
+    async def _aembed_batch(self, model: str, texts: List[str], config: types.EmbedContentConfig) -> Any:
+        """Async counterpart of `_embed_batch`, with the same short retry."""
+        response = await self.sync_client.aio.models.embed_content(model=model, contents=texts, config=config)
+        return _check_batch(response, texts)
+
+    def _embed_with_split(self, model: str, texts: List[str], config: types.EmbedContentConfig) -> List[Any]:
+        """Embed a batch, halving it whenever the API rejects it for size.
+
+        Returns the responses in input order so embeddings can be mapped back by index.
+        """
+        try:
+            return [self._embed_batch(model, texts, config)]
+        except ClientError as e:
+            if len(texts) <= 1 or not _is_batch_too_large(e):
+                raise
+            mid = len(texts) // 2
+            printc(f"GeminiEmbedder: Batch of {len(texts)} rejected for size, splitting", color="yellow")
+            return self._embed_with_split(model, texts[:mid], config) + self._embed_with_split(model, texts[mid:], config)
+
+    async def _aembed_with_split(self, model: str, texts: List[str], config: types.EmbedContentConfig) -> List[Any]:
+        """Async counterpart of `_embed_with_split`."""
+        try:
+            return [await self._aembed_batch(model, texts, config)]
+        except ClientError as e:
+            if len(texts) <= 1 or not _is_batch_too_large(e):
+                raise
+            mid = len(texts) // 2
+            printc(f"GeminiEmbedder: Batch of {len(texts)} rejected for size, splitting", color="yellow")
+            head = await self._aembed_with_split(model, texts[:mid], config)
+            return head + await self._aembed_with_split(model, texts[mid:], config)
+
+    # Read model, texts and request config out of api_kwargs
+    def _prepare_request(self, api_kwargs: Dict):
+        # task_type: RETRIEVAL_DOCUMENT or RETRIEVAL_QUERY
+        task_type = api_kwargs.get("task_type", "RETRIEVAL_DOCUMENT")
+        # model = api_kwargs.get("model", "models/text-embedding-005")
+        model = api_kwargs.get("model", "gemini-embedding-001")
+        input_texts = list(api_kwargs.get("input", []))
+        dimensions = api_kwargs.get("output_dimensionality", self.dimensions)
+        config = types.EmbedContentConfig(task_type=task_type, output_dimensionality=dimensions)
+        return model, input_texts, config
+
     def call(self, api_kwargs: Dict = {}, model_type: ModelType = ModelType.UNDEFINED):
         """Call the Gemini embedding API."""
         if model_type == ModelType.EMBEDDER:
-            # task_type: RETRIEVAL_DOCUMENT or RETRIEVAL_QUERY
-            task_type = api_kwargs.get("task_type", "RETRIEVAL_DOCUMENT")
-            # model = api_kwargs.get("model", "models/text-embedding-005")
-            model = api_kwargs.get("model", "gemini-embedding-001")
-            input_texts = api_kwargs.get("input", [])
+            model, input_texts, config = self._prepare_request(api_kwargs)
             
             if not input_texts:
                 log.warning("No input texts provided for embedding")
                 return []
             
-            # Use embed_content for batch embedding
-            embeddings = []
-            printc(f"GeminiEmbedder: Embedding {len(input_texts)} texts with task_type={task_type}", color="blue")
-            for text in input_texts:
-                result = self.sync_client.models.embed_content(
-                    model=model,
-                    contents=text,
-                    config=types.EmbedContentConfig(
-                        task_type=task_type
-                    )
-                )
-                embeddings.append(result)
-            return embeddings
+            # Send up to MAX_TEXTS_PER_REQUEST texts per embed_content request
+            responses = []
+            log.debug(f"GeminiEmbedder: Embedding {len(input_texts)} texts with task_type={config.task_type}")
+            for start in range(0, len(input_texts), MAX_TEXTS_PER_REQUEST):
+                batch = input_texts[start:start + MAX_TEXTS_PER_REQUEST]
+                responses.extend(self._embed_with_split(model, batch, config))
+            return responses
+        else:
+            raise ValueError(f"model_type {model_type} is not supported. This client only supports EMBEDDER.")
+
+    async def acall(self, api_kwargs: Dict = {}, model_type: ModelType = ModelType.UNDEFINED):
+        """Call the Gemini embedding API asynchronously.
+
+        Like `call`, rate limit and server errors are retried for a few
+        seconds, which covers query embeddings sent straight from `RAG`.
+        Errors that outlast that reach the caller; `EmbeddingScheduler` then
+        backs off across all in-flight indexing batches.
+        """
+        if model_type == ModelType.EMBEDDER:
+            model, input_texts, config = self._prepare_request(api_kwargs)
+
+            if not input_texts:
+                log.warning("No input texts provided for embedding")
+                return []
+
+            responses = []
+            for start in range(0, len(input_texts), MAX_TEXTS_PER_REQUEST):
+                batch = input_texts[start:start + MAX_TEXTS_PER_REQUEST]
+                responses.extend(await self._aembed_with_split(model, batch, config))
+            return responses
         else:
             raise ValueError(f"model_type {model_type} is not supported. This client only supports EMBEDDER.")
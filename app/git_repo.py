@@ -0,0 +1,127 @@
+import os
+import re
+import shutil
+import subprocess
+from functools import lru_cache
+from dataclasses import dataclass
+from typing import List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from adalflow.utils import printc
+
+from app.repo_scanner import CODE_EXTS, DOC_EXTS
+from app.telemetry import span
+
+
+@dataclass(frozen=True)
+class RepoSpec:
+    """A remote repository and the ref to index, parsed from a URL."""
+    url: str  # clone URL, without any /tree/<ref> suffix
+    host: str
+    owner: str
+    name: str
+    ref: Optional[str] = None  # branch or tag; None means the default branch
+
+    @property
+    def key(self) -> str:
+        """Filesystem-safe identifier, unique per host/owner/repo/ref."""
+        ref = re.sub(r"[^A-Za-z0-9._-]", "_", self.ref) if self.ref else "_default"
+        return "__".join((self.host, self.owner, self.name, ref))
+
+
+# Parse https://host/owner/repo(.git)(/tree/<ref>) into a RepoSpec
+def parse_repo_url(repo_url: str) -> RepoSpec:
+    parsed = urlparse(repo_url.strip())
+    parts = [p for p in parsed.path.split("/") if p]
+    if len(parts) < 2:
+        raise ValueError(f"Cannot parse owner/repo from URL: {repo_url}")
+    owner, name = parts[0], parts[1].removesuffix(".git")
+    ref = "/".join(parts[3:]) if len(parts) > 3 and parts[2] == "tree" else None
+    url = f"{parsed.scheme}://{parsed.netloc}/{owner}/{name}.git"
+    return RepoSpec(url=url, host=parsed.netloc, owner=owner, name=name, ref=ref)
+
+
+# Run a git command in a repo and return its stdout
+def run_git(repo_dir: str, *args: str) -> str:
+    result = subprocess.run(["git", "-C", repo_dir, *args], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return result.stdout.decode("utf-8").strip()
+
+
+# Verify git is installed, once per process
+@lru_cache(maxsize=1)
+def ensure_git_available():
+    try:
+        subprocess.run(["git", "--version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        raise RuntimeError("git is required to index remote repositories") from e
+
+
+# Commit SHA checked out in repo_dir, or None if it is not a git repo
+def get_head_commit(repo_dir: str) -> Optional[str]:
+    try:
+        return run_git(repo_dir, "rev-parse", "HEAD")
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+# Files changed and deleted between two commits, as repo-relative paths
+def diff_commits(repo_dir: str, old: str, new: str) -> Tuple[Set[str], Set[str]]:
+    changed: Set[str] = set()
+    deleted: Set[str] = set()
+    output = run_git(repo_dir, "diff", "--name-status", "--no-renames", old, new)
+    for line in output.splitlines():
+        status, _, rel = line.partition("\t")
+        if status.startswith("D"):
+            deleted.add(rel)
+        else:
+            changed.add(rel)
+    return changed, deleted
+
+
+# Sparse-checkout patterns: only files the scanner indexes, plus .gitignore files it honours
+def _sparse_patterns() -> List[str]:
+    return [f"*{ext}" for ext in CODE_EXTS + DOC_EXTS] + [".gitignore"]
+
+
+def _clone(spec: RepoSpec, local_path: str, depth: int, sparse: bool):
+    # Partial clone: fetch trees now, and only the blobs the sparse checkout needs
+    args = ["clone", "--quiet", "--no-tags", "--depth", str(depth), "--no-checkout"]
+    if sparse:
+        args += ["--filter=blob:none"]
+    if spec.ref:
+        args += ["--branch", spec.ref]
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    run_git(os.path.dirname(local_path), *args, spec.url, local_path)
+    if sparse:
+        run_git(local_path, "sparse-checkout", "set", "--no-cone", *_sparse_patterns())
+    run_git(local_path, "checkout", "--quiet")
+
+
+def _fetch_and_reset(spec: RepoSpec, local_path: str, depth: int):
+    ref = spec.ref or "HEAD"
+    run_git(local_path, "fetch", "--quiet", "--no-tags", "--depth", str(depth), "origin", ref)
+    run_git(local_path, "reset", "--quiet", "--hard", "FETCH_HEAD")
+
+
+def download_github_repo(repo_url: str, local_path: str, depth: int = 1, sparse: bool = True) -> str:
+    """Clone `repo_url` into `local_path`, or bring an existing clone up to date.
+
+    Clones are shallow and, with `sparse`, partial: only blobs of indexable
+    files are downloaded. Returns the checked-out commit SHA; raises
+    RuntimeError if git fails.
+    """
+    ensure_git_available()
+    spec = parse_repo_url(repo_url)
+    with span("clone") as clone_span:
+        try:
+            if os.path.isdir(os.path.join(local_path, ".git")):
+                clone_span.set(fetch=True)
+                printc(f"Updating existing clone at {local_path}...")
+                _fetch_and_reset(spec, local_path, depth)
+            else:
+                shutil.rmtree(local_path, ignore_errors=True)
+                printc(f"Cloning {spec.url} (ref={spec.ref or 'default'}, depth={depth})...")
+                _clone(spec, local_path, depth, sparse)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"Error syncing {repo_url}: {e.stderr.decode('utf-8').strip()}") from e
+        return get_head_commit(local_path)
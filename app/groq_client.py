@@ -2,7 +2,7 @@
 import os
 import re
 import logging
-from typing import Dict, Sequence, Optional, Any, TypeVar
+from typing import AsyncIterator, Dict, Sequence, Optional, Any, TypeVar
 
 import backoff
 from adalflow.core.model_client import ModelClient
@@ -153,6 +153,13 @@ class CustomGroqClient(ModelClient):
         else:
             raise ValueError(f"model_type {model_type} is not supported")
 
+    async def astream(self, api_kwargs: Dict = {}) -> AsyncIterator[str]:
+        """Stream a chat completion, yielding content deltas as Groq sends them."""
+        stream = await self.acall(api_kwargs={**api_kwargs, "stream": True}, model_type=ModelType.LLM)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
     @classmethod
     def from_dict(cls: type[T], data: Dict[str, Any]) -> T:
         obj = super().from_dict(data)
@@ -0,0 +1,102 @@
+"""Versioned repo indexes, published atomically so several processes can share them.
+
+A repo's index lives in ``<repo>.store.v<N>``: the vector store plus its
+lexical, symbol and ANN indexes, complete before anyone is told about it
+and never modified afterwards. Publishing a version atomically replaces the
+repo's manifest, ``<repo>.meta.json``, which names the current directory
+along with its version, commit and embedder. Query processes (uvicorn
+workers) memory-map the directory the manifest names, so the pages are
+shared through the OS page cache, and reload when its version changes.
+
+Writers (an ``/init`` or ``/update`` job in any worker, or ``app.indexer``)
+hold ``<repo>.lock`` while fetching, indexing and publishing, so a repo is
+indexed once; a second writer waits and then finds the published index.
+Stores written before versioning sit at ``<repo>.store`` and count as version 0.
+"""
+import os
+import re
+import json
+import time
+import shutil
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within one process
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    """The published manifest at `path`, or {} when the repo has never been published."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_manifest(path: str, manifest: Dict[str, Any]):
+    """Replace the manifest in one rename, so readers see the old one or the new one."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def version_dir(base: str, version: int) -> str:
+    """Store directory of `version` for the repo whose unversioned store path is `base`."""
+    return f"{base}.v{version}"
+
+
+def store_dir(base: str, manifest: Dict[str, Any]) -> Optional[str]:
+    """Store directory the manifest publishes (None if it published no chunks); `base` from before versioning."""
+    if "store" not in manifest:
+        return base
+    return os.path.join(os.path.dirname(base), manifest["store"]) if manifest["store"] else None
+
+
+def publish(manifest_path: str, base: str, store_path: Optional[str], commit: Optional[str], embedder: str,
+            keep: int = 2) -> int:
+    """Point the manifest at `store_path` as the next version and drop all but the `keep` newest versions.
+
+    Call with the writer lock held. Returns the new version.
+    """
+    version = read_manifest(manifest_path).get("version", 0) + 1
+    write_manifest(manifest_path, {
+        "version": version,
+        "store": os.path.basename(store_path) if store_path else None,
+        "commit": commit,
+        "embedder": embedder,
+        "published_at": time.time(),
+    })
+    remove_old_versions(base, version, keep)
+    return version
+
+
+# Versions a reader may still be loading are kept; open maps of removed ones stay readable
+def remove_old_versions(base: str, current: int, keep: int):
+    parent, name = os.path.split(base)
+    pattern = re.compile(rf"{re.escape(name)}(?:\.v(\d+))?$")
+    for entry in os.listdir(parent):
+        match = pattern.match(entry)
+        if match and int(match.group(1) or 0) <= current - keep:
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+            log.info(f"Removed index version {entry}")
+
+
+@contextmanager
+def writer_lock(base: str) -> Iterator[None]:
+    """Exclusive, cross-process lock on a repo's index for the duration of a fetch/index/publish."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{base}.lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
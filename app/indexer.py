@@ -0,0 +1,48 @@
+"""Build and publish repo indexes from a process of their own.
+
+API workers then only query: they memory-map the version this process
+publishes and swap it in on their next request after it appears (see
+app/index_versions.py). Repos are indexed in turn; with ``--watch`` they
+are brought up to date again every so many seconds::
+
+    python -m app.indexer https://github.com/owner/repo /path/to/checkout
+    python -m app.indexer https://github.com/owner/repo --watch 300
+"""
+import time
+import argparse
+from typing import List
+
+from adalflow.utils import printc
+
+from app.data_pipeline import DatabaseManager
+
+
+# Index every repo once (reusing a published index), then optionally keep them current
+def run(repos: List[str], watch: float = 0):
+    managers = {}
+    for repo in repos:
+        managers[repo] = DatabaseManager()
+        docs = managers[repo].prepare_database(repo)
+        printc(f"{repo}: version {managers[repo].version}, {len(docs)} chunks", color="green")
+    while watch > 0:
+        time.sleep(watch)
+        for repo, db_manager in managers.items():
+            try:
+                update = db_manager.update_db_index()
+            except Exception as e:
+                printc(f"{repo}: update failed, will retry: {e}", color="red")
+                continue
+            if update.removed or update.added or update.rebuilt:
+                printc(f"{repo}: published version {db_manager.version} at {update.commit}", color="green")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("repos", nargs="+", help="GitHub URLs or local checkouts")
+    parser.add_argument("--watch", type=float, default=0, help="seconds between updates; 0 indexes once and exits")
+    args = parser.parse_args()
+    run(args.repos, args.watch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import os
+import re
+import json
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from adalflow.utils import printc
+
+from app.telemetry import span
+from app.vector_store import VectorStore
+
+LEXICAL_META_FILE = "lexical.json"
+
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+# Pieces of an identifier: "HTTPServerError" -> HTTP, Server, Error; "prepare_db_index" -> prepare, db, index
+_PART_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+# Query words that look like code: snake_case, camelCase, calls or `backticked`
+_IDENTIFIER_RE = re.compile(r"`([^`]+)`|\b([A-Za-z_][A-Za-z0-9_]*)(\()?")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it its of on or that the this to "
+    "was what when where which who why will with".split()
+)
+
+
+def tokenize_code(text: str) -> List[str]:
+    """Lowercased search terms: compound identifiers whole, plus their camelCase/snake_case parts."""
+    tokens: List[str] = []
+    for word in _WORD_RE.findall(text):
+        parts = [p.lower() for p in _PART_RE.findall(word)]
+        if len(parts) > 1:
+            tokens.append(word.lower())
+        tokens.extend(p for p in parts if len(p) > 1 and p not in STOPWORDS)
+    return tokens
+
+
+# Identifiers a query names explicitly, lowercased
+def query_identifiers(query: str) -> List[str]:
+    found = []
+    for backticked, word, call in _IDENTIFIER_RE.findall(query):
+        for name in _WORD_RE.findall(backticked) if backticked else [word]:
+            if backticked or call or "_" in name or len(_PART_RE.findall(name)) > 1:
+                found.append(name.lower())
+    return found
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """Fuse ranked id lists: each id scores sum(1 / (k + rank)) over the lists it appears in."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class LexicalIndex:
+    """BM25 inverted index over the chunks of a `VectorStore`, saved inside the store directory.
+
+    Postings are stored as flat arrays (``lexical_docs.npy`` / ``lexical_tfs.npy``
+    sliced by ``lexical_offsets.npy``) and memory-mapped on load.
+    """
+
+    def __init__(self, vocab: Dict[str, int], offsets: np.ndarray, docs: np.ndarray, tfs: np.ndarray,
+                 doc_lens: np.ndarray, k1: float = 1.2, b: float = 0.75):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.docs = docs
+        self.tfs = tfs
+        self.doc_lens = doc_lens
+        self.k1 = k1
+        self.b = b
+        self.count = len(doc_lens)
+        self.avg_len = max(1.0, float(doc_lens.mean())) if self.count else 1.0
+        df = np.diff(offsets).astype(np.float32)
+        self.idf = np.log1p((self.count - df + 0.5) / (df + 0.5))
+
+    @classmethod
+    def build(cls, texts: Sequence[str]) -> "LexicalIndex":
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lens = np.zeros(len(texts), dtype=np.int32)
+        for i, text in enumerate(texts):
+            counts = Counter(tokenize_code(text))
+            doc_lens[i] = sum(counts.values())
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((i, tf))
+        vocab = {term: n for n, term in enumerate(postings)}
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum([len(p) for p in postings.values()], out=offsets[1:])
+        flat = [pair for plist in postings.values() for pair in plist]
+        docs = np.fromiter((d for d, _ in flat), dtype=np.int32, count=len(flat))
+        tfs = np.fromiter((tf for _, tf in flat), dtype=np.float32, count=len(flat))
+        return cls(vocab, offsets, docs, tfs, doc_lens)
+
+    def save(self, path: str):
+        for name, array in (("offsets", self.offsets), ("docs", self.docs), ("tfs", self.tfs), ("doc_lens", self.doc_lens)):
+            np.save(os.path.join(path, f"lexical_{name}.npy"), array)
+        with open(os.path.join(path, LEXICAL_META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"count": self.count, "vocab": self.vocab}, f)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["LexicalIndex"]:
+        try:
+            with open(os.path.join(path, LEXICAL_META_FILE), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            arrays = {
+                name: np.load(os.path.join(path, f"lexical_{name}.npy"), mmap_mode="r")
+                for name in ("offsets", "docs", "tfs", "doc_lens")
+            }
+        except (OSError, ValueError):
+            return None
+        return cls(meta["vocab"], **arrays)
+
+    @classmethod
+    def load_or_build(cls, store: VectorStore) -> "LexicalIndex":
+        """The index saved with `store`, or a new one built from its texts and saved there."""
+        with span("index", kind="lexical", items=len(store)) as index_span:
+            index = cls.load(store.path)
+            if index is not None and index.count == len(store):
+                index_span.set(loaded=True)
+                return index
+            started = time.perf_counter()
+            index = cls.build([store.text(i) for i in range(len(store))])
+            index.save(store.path)
+            printc(f"Built lexical index: {len(index.vocab)} terms over {index.count} chunks "
+                   f"in {time.perf_counter() - started:.2f}s", color="blue")
+            return index
+
+    def document_frequency(self, term: str) -> int:
+        idx = self.vocab.get(term)
+        return 0 if idx is None else int(self.offsets[idx + 1] - self.offsets[idx])
+
+    def search(self, query: str, k: int = 20) -> List[Tuple[int, float]]:
+        """Top `k` chunks by BM25 score as (chunk index, score), best first."""
+        if not self.count:
+            return []
+        scores = np.zeros(self.count, dtype=np.float32)
+        for term in set(tokenize_code(query)):
+            idx = self.vocab.get(term)
+            if idx is None:
+                continue
+            start, end = self.offsets[idx], self.offsets[idx + 1]
+            docs, tfs = self.docs[start:end], self.tfs[start:end]
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lens[docs] / self.avg_len)
+            scores[docs] += self.idf[idx] * tfs * (self.k1 + 1) / (tfs + norm)
+        k = min(k, self.count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+    def confident(self, query: str, hits: Sequence[Tuple[int, float]], max_df: int, margin: float = 0.2) -> bool:
+        """Whether lexical hits alone answer the query: it names identifiers that are all
+        indexed, the rarest occurs in at most `max_df` chunks, and the top hit scores at
+        least `margin` (relative) above the runner-up."""
+        identifiers = query_identifiers(query)
+        if not identifiers or not hits:
+            return False
+        frequencies = [self.document_frequency(term) for term in identifiers]
+        if 0 in frequencies or min(frequencies) > max_df:
+            return False
+        return len(hits) == 1 or hits[0][1] >= (1 + margin) * hits[1][1]
@@ -0,0 +1,142 @@
+import time
+import zlib
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from adalflow.core.model_client import ModelClient
+from adalflow.core.types import ModelType, Embedding, EmbedderOutput
+
+from app.lexical_index import tokenize_code
+
+log = logging.getLogger(__name__)
+
+HASHING_MODEL = "hashing"
+
+
+# Input texts of an EMBEDDER request, shared by the local clients
+def _embedder_kwargs(input: Optional[Any], model_kwargs: Dict, model_type: ModelType) -> Dict:
+    if model_type != ModelType.EMBEDDER:
+        raise ValueError(f"model_type {model_type} is not supported. This client only supports EMBEDDER.")
+    if isinstance(input, str):
+        input = [input]
+    if not isinstance(input, Sequence):
+        raise TypeError("input must be a sequence of text")
+    return {**model_kwargs, "input": list(input)}
+
+
+# adalflow's Embedder tests the raw response for truthiness, which a numpy array refuses
+def _as_response(vectors: np.ndarray) -> List[np.ndarray]:
+    return list(vectors)
+
+
+def _parse_vectors(response: Any) -> EmbedderOutput:
+    return EmbedderOutput(data=[Embedding(index=i, embedding=list(map(float, v))) for i, v in enumerate(response)])
+
+
+class HashingEmbedderClient(ModelClient):
+    """Deterministic CPU embedder: signed feature hashing of code-aware tokens and token bigrams.
+
+    Needs no model download or network, so indexing and queries run
+    air-gapped and benchmarks are reproducible. Retrieval quality is
+    lexical, well below a trained model. `latency_ms` adds a fixed delay
+    per call to stand in for a remote embedding API.
+    """
+
+    def __init__(self, dimensions: int = 768, latency_ms: float = 0.0):
+        super().__init__()
+        self.dimensions = dimensions
+        self.latency_ms = latency_ms
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize_code(text)
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.int64, count=len(features))
+            # The top hash bit picks the sign, so bucket collisions cancel out on average
+            np.add.at(vectors[row], hashes % self.dimensions, np.where(hashes >> 31, -1.0, 1.0))
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def convert_inputs_to_api_kwargs(
+        self,
+        input: Optional[Any] = None,
+        model_kwargs: Dict = {},
+        model_type: ModelType = ModelType.UNDEFINED,
+    ) -> Dict:
+        return _embedder_kwargs(input, model_kwargs, model_type)
+
+    def call(self, api_kwargs: Dict = {}, model_type: ModelType = ModelType.UNDEFINED):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return _as_response(self.embed(api_kwargs.get("input", [])))
+
+    async def acall(self, api_kwargs: Dict = {}, model_type: ModelType = ModelType.UNDEFINED):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return _as_response(self.embed(api_kwargs.get("input", [])))
+
+    def parse_embedding_response(self, response: Any) -> EmbedderOutput:
+        return _parse_vectors(response)
+
+
+class SentenceTransformerEmbedderClient(ModelClient):
+    """Embeddings from a local sentence-transformers model (e.g. ``all-MiniLM-L6-v2``), on CPU by default.
+
+    `sentence-transformers` is an optional dependency; without it the
+    ``local`` provider defaults to `HashingEmbedderClient`. A `dimensions`
+    below the model's own keeps that many leading dimensions, renormalized,
+    which only preserves quality for Matryoshka-trained models.
+    """
+
+    def __init__(self, model: str = "all-MiniLM-L6-v2", device: str = "cpu", batch_size: int = 32,
+                 dimensions: Optional[int] = None):
+        super().__init__()
+        from sentence_transformers import SentenceTransformer  # optional dependency
+
+        self.model_name = model
+        self.batch_size = batch_size
+        self.model = SentenceTransformer(model, device=device)
+        native = self.model.get_sentence_embedding_dimension()
+        if dimensions and dimensions > native:
+            raise ValueError(f"{model} produces {native}-dimensional embeddings, fewer than the {dimensions} configured")
+        self.dimensions = dimensions or native
+        self.truncate = self.dimensions < native
+        if self.truncate:
+            log.warning(f"Truncating {model} embeddings from {native} to {self.dimensions} dimensions")
+
+    def convert_inputs_to_api_kwargs(
+        self,
+        input: Optional[Any] = None,
+        model_kwargs: Dict = {},
+        model_type: ModelType = ModelType.UNDEFINED,
+    ) -> Dict:
+        return _embedder_kwargs(input, model_kwargs, model_type)
+
+    def call(self, api_kwargs: Dict = {}, model_type: ModelType = ModelType.UNDEFINED):
+        texts: List[str] = api_kwargs.get("input", [])
+        vectors = self.model.encode(
+            texts, batch_size=self.batch_size, normalize_embeddings=not self.truncate, convert_to_numpy=True
+        )
+        if self.truncate:
+            vectors = vectors[:, :self.dimensions]
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        return _as_response(vectors)
+
+    async def acall(self, api_kwargs: Dict = {}, model_type: ModelType = ModelType.UNDEFINED):
+        # Encoding is CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(self.call, api_kwargs, model_type)
+
+    def parse_embedding_response(self, response: Any) -> EmbedderOutput:
+        return _parse_vectors(response)
+
+
+def create_local_embedder(model: str = HASHING_MODEL, dimensions: int = 768, latency_ms: float = 0.0) -> ModelClient:
+    """The hashing embedder for ``"hashing"``, otherwise a sentence-transformers model by name."""
+    if model == HASHING_MODEL:
+        return HashingEmbedderClient(dimensions=dimensions, latency_ms=latency_ms)
+    return SentenceTransformerEmbedderClient(model, dimensions=dimensions)
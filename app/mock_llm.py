@@ -0,0 +1,95 @@
+import re
+import json
+import time
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from adalflow.core.model_client import ModelClient
+from adalflow.core.types import ModelType, CompletionUsage, GeneratorOutput
+
+_FILE_PATH_RE = re.compile(r"^File Path: (.+)$", re.MULTILINE)
+
+
+@dataclass
+class MockCompletion:
+    text: str
+    usage: CompletionUsage
+
+
+# Rough token count; the mock only needs plausible usage numbers
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class MockLLMClient(ModelClient):
+    """Deterministic chat model stand-in for offline runs and load tests.
+
+    The reply is the JSON answer format `RAG` expects, derived only from the
+    prompt (the question and the context file paths), so the same prompt
+    always gets the same answer. Latency is `latency_ms` to the first token
+    plus, when `tokens_per_second` is set, generation time for the reply.
+    """
+
+    def __init__(self, latency_ms: float = 200.0, tokens_per_second: float = 0.0):
+        super().__init__()
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+
+    def convert_inputs_to_api_kwargs(
+        self,
+        input: Optional[Any] = None,
+        model_kwargs: Dict = {},
+        model_type: ModelType = ModelType.UNDEFINED,
+    ) -> Dict:
+        if model_type != ModelType.LLM:
+            raise ValueError(f"model_type {model_type} is not supported")
+        return {**model_kwargs, "messages": [{"role": "user", "content": input or ""}]}
+
+    def _complete(self, api_kwargs: Dict) -> MockCompletion:
+        messages: List[Dict[str, str]] = api_kwargs.get("messages", [])
+        prompt = "\n".join(m.get("content", "") for m in messages)
+        question = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "").strip()
+        files = list(dict.fromkeys(_FILE_PATH_RE.findall(prompt)))
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        answer = f"Mock answer to: {question}"
+        if files:
+            answer += "\n\nRelevant files:\n" + "\n".join(f"- `{path}`" for path in files)
+        text = json.dumps({
+            "rationale": f"Mock response {digest} from {len(files)} context files.",
+            "answer": answer,
+        })
+        prompt_tokens, completion_tokens = _approx_tokens(prompt), _approx_tokens(text)
+        usage = CompletionUsage(
+            completion_tokens=completion_tokens, prompt_tokens=prompt_tokens, total_tokens=prompt_tokens + completion_tokens
+        )
+        return MockCompletion(text=text, usage=usage)
+
+    def _generation_seconds(self, completion: MockCompletion) -> float:
+        if not self.tokens_per_second:
+            return 0.0
+        return completion.usage.completion_tokens / self.tokens_per_second
+
+    def call(self, api_kwargs: Dict = {}, model_type: ModelType = ModelType.UNDEFINED):
+        completion = self._complete(api_kwargs)
+        time.sleep(self.latency_ms / 1000 + self._generation_seconds(completion))
+        return completion
+
+    async def acall(self, api_kwargs: Dict = {}, model_type: ModelType = ModelType.UNDEFINED):
+        completion = self._complete(api_kwargs)
+        await asyncio.sleep(self.latency_ms / 1000 + self._generation_seconds(completion))
+        return completion
+
+    async def astream(self, api_kwargs: Dict = {}) -> AsyncIterator[str]:
+        """Yield the reply a few characters (about one token) at a time, paced by `tokens_per_second`."""
+        completion = self._complete(api_kwargs)
+        await asyncio.sleep(self.latency_ms / 1000)
+        delay = 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+        for start in range(0, len(completion.text), 4):
+            if delay:
+                await asyncio.sleep(delay)
+            yield completion.text[start:start + 4]
+
+    def parse_chat_completion(self, completion: MockCompletion) -> GeneratorOutput:
+        return GeneratorOutput(data=None, usage=completion.usage, raw_response=completion.text)
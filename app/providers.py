@@ -0,0 +1,95 @@
+"""Embedding and generation backends, selected by name in `app.config`.
+
+Built in:
+
+- embedders: ``gemini`` (Gemini API) and ``local`` (sentence-transformers on
+  CPU, or the dependency-free hashing embedder)
+- generators: ``groq`` (Groq API) and ``mock`` (deterministic, configurable latency)
+
+Every backend is an adalflow `ModelClient`, so the pipeline does not care
+which one it talks to. Imports happen inside the factories, so a backend's
+SDK is only needed when it is used. Register more with `register_embedder`
+and `register_generator`.
+"""
+import os
+import importlib.util
+from typing import Any, Callable, Dict, Tuple
+
+from adalflow.core.model_client import ModelClient
+
+# A factory gets the "embedder" or "generator" section of the config
+Factory = Callable[[Dict[str, Any]], ModelClient]
+
+_EMBEDDERS: Dict[str, Factory] = {}
+_GENERATORS: Dict[str, Factory] = {}
+
+
+def register_embedder(name: str, factory: Factory):
+    _EMBEDDERS[name] = factory
+
+
+def register_generator(name: str, factory: Factory):
+    _GENERATORS[name] = factory
+
+
+def _create(kind: str, registry: Dict[str, Factory], cfg: Dict[str, Any]) -> ModelClient:
+    name = cfg["provider"]
+    if name not in registry:
+        raise ValueError(f"Unknown {kind} provider {name!r}; expected one of {sorted(registry)}")
+    return registry[name](cfg)
+
+
+def create_embedder(cfg: Dict[str, Any]) -> ModelClient:
+    return _create("embedder", _EMBEDDERS, cfg)
+
+
+def create_generator(cfg: Dict[str, Any]) -> ModelClient:
+    return _create("generator", _GENERATORS, cfg)
+
+
+# Default (model, dimensions) per embedder provider; the local one depends on what is installed
+def embedder_defaults(provider: str) -> Tuple[str, int]:
+    if provider == "local":
+        if importlib.util.find_spec("sentence_transformers") is not None:
+            return "all-MiniLM-L6-v2", 384
+        return "hashing", 768
+    return "gemini-embedding-001", 768
+
+
+def generator_default_model(provider: str) -> str:
+    return "mock" if provider == "mock" else "groq/compound"
+
+
+# Identity of the vectors a config produces; indexes built by another embedder can't be searched with it
+def embedder_id(cfg: Dict[str, Any]) -> str:
+    return f"{cfg['provider']}:{cfg['model_kwargs']['model']}:{cfg['dimensions']}"
+
+
+def _gemini(cfg: Dict[str, Any]) -> ModelClient:
+    from app.gemini_embedder import GeminiEmbedderClient
+
+    return GeminiEmbedderClient(api_key=os.getenv("GEMINI_API_KEY"), dimensions=cfg["dimensions"])
+
+
+def _local(cfg: Dict[str, Any]) -> ModelClient:
+    from app.local_embedder import create_local_embedder
+
+    return create_local_embedder(cfg["model_kwargs"]["model"], cfg["dimensions"], cfg.get("latency_ms", 0.0))
+
+
+def _groq(cfg: Dict[str, Any]) -> ModelClient:
+    from app.groq_client import CustomGroqClient
+
+    return CustomGroqClient(api_key=os.getenv("GROQ_API_KEY"))
+
+
+def _mock(cfg: Dict[str, Any]) -> ModelClient:
+    from app.mock_llm import MockLLMClient
+
+    return MockLLMClient(latency_ms=cfg.get("latency_ms", 200.0), tokens_per_second=cfg.get("tokens_per_second", 0.0))
+
+
+register_embedder("gemini", _gemini)
+register_embedder("local", _local)
+register_generator("groq", _groq)
+register_generator("mock", _mock)
@@ -0,0 +1,137 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Generic, Hashable, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+V = TypeVar("V")
+
+
+# Canonical form of a question: case, whitespace and trailing punctuation don't change its meaning
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().rstrip("?!. ").lower()
+
+
+class TTLCache(Generic[V]):
+    """Thread-safe in-memory LRU cache whose entries also expire after `ttl_seconds`."""
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, count: bool = True) -> Optional[V]:
+        """Cached value or None; `count=False` leaves the hit-rate counters alone."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += count
+                return None
+            self._entries.move_to_end(key)
+            self.hits += count
+            return entry[1]
+
+    def put(self, key: Hashable, value: V):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self), **_rates(self.hits, self.misses)}
+
+
+def _rates(hits: int, misses: int) -> Dict[str, Any]:
+    lookups = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": hits / lookups if lookups else 0.0}
+
+
+@dataclass
+class CachedAnswer:
+    query_vector: np.ndarray  # unit-normalized
+    answer: Any
+
+
+class AnswerCache:
+    """Generated answers keyed by index version, retrieved chunks and query-embedding neighborhood.
+
+    A lookup hits when a cached question retrieved exactly the same chunks
+    from the same index version and its embedding has cosine similarity of
+    at least `similarity_threshold` with the new one, so paraphrases of an
+    FAQ share one answer. Bumping the index version drops everything.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600, similarity_threshold: float = 0.95):
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.misses = 0
+        self._buckets: TTLCache[List[CachedAnswer]] = TTLCache(max_entries, ttl_seconds)
+        self._version: Optional[Hashable] = None
+        self._lock = threading.Lock()
+
+    def _key(self, version: Hashable, chunk_ids: Sequence[int]) -> Tuple:
+        if version != self._version:
+            self._buckets.clear()
+            self._version = version
+        return (version, tuple(int(i) for i in chunk_ids))
+
+    def get(self, version: Hashable, query_vector: Sequence[float], chunk_ids: Sequence[int]) -> Optional[Any]:
+        with self._lock:
+            bucket = self._buckets.get(self._key(version, chunk_ids), count=False) or []
+            q = _unit(query_vector)
+            best = max(bucket, key=lambda entry: float(entry.query_vector @ q), default=None)
+            if best is None or float(best.query_vector @ q) < self.similarity_threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return best.answer
+
+    def put(self, version: Hashable, query_vector: Sequence[float], chunk_ids: Sequence[int], answer: Any):
+        with self._lock:
+            key = self._key(version, chunk_ids)
+            bucket = self._buckets.get(key, count=False) or []
+            # A few phrasings per set of chunks is plenty
+            self._buckets.put(key, bucket[-7:] + [CachedAnswer(_unit(query_vector), answer)])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._buckets),
+            **_rates(self.hits, self.misses),
+            "similarity_threshold": self.similarity_threshold,
+        }
+
+
+def _unit(vector: Sequence[float]) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
+
+
+_query_embeddings: Optional[TTLCache[List[float]]] = None
+_query_embeddings_lock = threading.Lock()
+
+
+# One query-embedding cache per process: embeddings depend on the question, not the repo
+def get_query_embedding_cache(max_entries: int = 10_000, ttl_seconds: float = 3600) -> TTLCache[List[float]]:
+    global _query_embeddings
+    with _query_embeddings_lock:
+        if _query_embeddings is None:
+            _query_embeddings = TTLCache(max_entries, ttl_seconds)
+        return _query_embeddings
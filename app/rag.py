@@ -1,19 +1,34 @@
 import re
 import json
-from typing import Any
+import asyncio
+import time
+import logging
+import threading
+from typing import Any, AsyncIterator, List, Optional, Tuple
 from uuid import uuid4
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 
 import numpy as np
 import adalflow as adal
-from adalflow.core.types import ModelType
+from adalflow.core.types import ModelType, GeneratorOutput, RetrieverOutput
 from adalflow.core.types import Conversation, DialogTurn, UserQuery, AssistantResponse
 from adalflow.components.retriever.faiss_retriever import FAISSRetriever
 from adalflow.utils import printc
 
+from app.ann_index import attach_index, index_nbytes, is_flat, load_or_build_index, normalized
 from app.config import config
+from app.context_budget import ContextBudgeter, count_tokens
 from app.data_pipeline import DatabaseManager
+from app.lexical_index import reciprocal_rank_fusion
+from app.providers import embedder_id
+from app.reranker import create_reranker
+from app.query_cache import AnswerCache, get_query_embedding_cache, normalize_query
+from app.stream_parser import JSONFieldStreamParser
+from app.symbol_index import SymbolHits
 from app.system_prompt import SYSTEM_PROMPT, RAG_TEMPLATE
+from app.telemetry import span, current_span, record_cache
+
+log = logging.getLogger(__name__)
 
 # Memory component
 class Memory(adal.DataComponent):
@@ -32,8 +47,26 @@ class Memory(adal.DataComponent):
 class RAGAnswer(adal.DataClass):
     rationale: str = field(default="", metadata={"desc":"Rationale."})
     answer: str = field(default="", metadata={"desc":"Answer."})
+    # Prompt token accounting for the request that produced this answer; not part of the model output
+    usage: Optional[dict] = field(default=None, repr=False, compare=False, metadata={"desc":"Prompt token usage."})
     __output_fields__ = ["rationale","answer"]
 
+# Attach prompt accounting to an answer; failed generations may not produce a RAGAnswer
+def _with_usage(answer, usage):
+    return replace(answer, usage=usage.to_dict()) if isinstance(answer, RAGAnswer) else answer
+
+# Tag the span of the stage in progress, if one is being traced
+def _annotate(**attributes):
+    current = current_span()
+    if current is not None:
+        current.set(**attributes)
+
+# Token counts the provider reported for a generation, if any
+def _record_completion(generate_span, response: GeneratorOutput):
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        generate_span.set(prompt_tokens=usage.prompt_tokens or 0, completion_tokens=usage.completion_tokens or 0)
+
 # RAG component
 class RAG(adal.Component):
     def __init__(self):
@@ -45,14 +78,32 @@ class RAG(adal.Component):
         )
         self.db_manager = DatabaseManager()
         self.transformed_docs = []
+        self.retriever = None
+        self.lexical_index = None
+        self.symbol_index = None
+        self.reranker = create_reranker(config["reranker"])
+        self.budgeter = ContextBudgeter(**config["context_budget"])
+        self._template_tokens = None
+        self.index_version = 0  # bumped whenever the index changes, invalidating cached answers
+        self._index_lock = threading.Lock()
+
+        cache_config = config["query_cache"]
+        self.query_embeddings = self.answer_cache = None
+        if cache_config["enabled"]:
+            self.query_embeddings = get_query_embedding_cache(
+                cache_config["embedding_max_entries"], cache_config["ttl_seconds"]
+            )
+            self.answer_cache = AnswerCache(
+                cache_config["answer_max_entries"], cache_config["ttl_seconds"], cache_config["similarity_threshold"]
+            )
 
         data_parser = adal.DataClassParser(data_class=RAGAnswer, return_data_class=True)
-        
+
         # Create the model client
         model_client = config["generator"]["model_client"]()
-        
+
         self._configure_message_parser(model_client)
-        
+
         self.generator = adal.Generator(
             template=RAG_TEMPLATE,
             prompt_kwargs={
@@ -69,9 +120,9 @@ class RAG(adal.Component):
     # Configure the model client to parse template tags into chat messages
     def _configure_message_parser(self, model_client):
         """Configure the model client to parse template tags into chat messages."""
-        
+
         original_convert = model_client.convert_inputs_to_api_kwargs
-        
+
         def patched_convert(input=None, model_kwargs={}, model_type=ModelType.UNDEFINED):
             final_model_kwargs = model_kwargs.copy()
             if model_type == ModelType.LLM and input:
@@ -105,47 +156,284 @@ class RAG(adal.Component):
                 return final_model_kwargs
             else:
                 return original_convert(input, model_kwargs, model_type)
-        
+
         model_client.convert_inputs_to_api_kwargs = patched_convert
 
-    def prepare_retriever(self, repo_url_or_path):
-        self.transformed_docs = self.db_manager.prepare_database(repo_url_or_path)
-        self.retriever = FAISSRetriever(
-            **config["retriever"],
-            embedder=self.embedder,
-            documents=self.transformed_docs,
-            document_map_func=lambda doc: doc.vector,
-        )
+    def prepare_retriever(self, repo_url_or_path, update: bool = False):
+        db_manager = DatabaseManager()
+        transformed_docs = db_manager.prepare_database(repo_url_or_path, update=update)
+        self._install(db_manager, transformed_docs)
+
+    # Open an already indexed repo from disk without fetching or embedding; False if there is none
+    def load_retriever(self, repo_url_or_path) -> bool:
+        db_manager = DatabaseManager()
+        if not db_manager.load_database(repo_url_or_path):
+            return False
+        self._install(db_manager, db_manager.db.documents())
+        return True
+
+    def _install(self, db_manager: DatabaseManager, transformed_docs):
+        retriever = FAISSRetriever(**config["retriever"], embedder=self.embedder)
+        if db_manager.db is not None and len(db_manager.db):
+            # Built from the memory-mapped matrix, or loaded when a trained index was saved with the store
+            attach_index(retriever, load_or_build_index(db_manager.db, config["index"]))
+        lexical_index = db_manager.lexical_index()
+        symbol_index = db_manager.symbol_index()
+        # Swap everything at once so concurrent queries never see a half-built index
+        with self._index_lock:
+            self.db_manager, self.transformed_docs, self.retriever = db_manager, transformed_docs, retriever
+            self.lexical_index = lexical_index
+            self.symbol_index = symbol_index
+            self.index_version += 1
+
+    # Pull the loaded repo and patch the FAISS index with only the changed chunks
+    def update_retriever(self):
+        update = self.db_manager.update_db_index()
+        store = self.db_manager.db
+        index = self.retriever.index if self.retriever.indexed else None
+        if update.rebuilt or ((update.removed or update.added) and (index is None or not is_flat(index))):
+            # IVF and HNSW ids don't follow row positions, and a replaced store matches nothing loaded:
+            # rebuild over the new store (outside the lock)
+            index = load_or_build_index(store, config["index"]) if store is not None and len(store) else None
+        lexical_index = self.db_manager.lexical_index()
+        symbol_index = self.db_manager.symbol_index()
+        with self._index_lock:
+            if index is not None and index is self.retriever.index:
+                if update.removed:
+                    # Flat indexes compact on removal, matching the order of the kept chunk list
+                    index.remove_ids(np.asarray(update.removed, dtype="int64"))
+                if update.added:
+                    index.add(normalized(np.asarray([doc.vector for doc in update.added], dtype="float32")))
+            elif index is not None:
+                attach_index(self.retriever, index)
+            else:
+                self.retriever.reset_index()
+            self.transformed_docs = store.documents() if store is not None else []
+            self.lexical_index = lexical_index
+            self.symbol_index = symbol_index
+            self.retriever.total_documents = self.retriever.index.ntotal if self.retriever.indexed else 0
+            if update.removed or update.added or update.rebuilt:
+                self.index_version += 1
+        printc(f"Retriever updated to {update.commit}: {self.retriever.total_documents} chunks", color="green")
+        return update
 
-    def call(self, query: str) -> Any:
-        printc(f"RAG: Processing query: '{query}'", color="green")
-        # Embed query and extract vectors using RETRIEVAL_QUERY task type
-        embed_output = self.embedder(query, model_kwargs={"task_type": "RETRIEVAL_QUERY"})
+    # Resident size of the search index, for the registry's memory budget
+    def index_bytes(self) -> int:
+        if self.retriever is None or not self.retriever.indexed:
+            return 0
+        return index_nbytes(self.retriever.index)
+
+    # The cache is shared by every repo: keyed by provider, model and dimensions, as vectors differ in each
+    def _query_key(self, query: str):
+        return (embedder_id(config["embedder"]), normalize_query(query))
+
+    # Query embedding from a recent identical question, or None
+    def _cached_query_vector(self, query: str) -> Optional[List[float]]:
+        if self.query_embeddings is None:
+            return None
+        vector = self.query_embeddings.get(self._query_key(query))
+        record_cache("query_embedding", hits=vector is not None, misses=vector is None)
+        return vector
+
+    def _remember_query_vector(self, query: str, embed_output) -> Optional[List[float]]:
         if not embed_output.data:
-            return RAGAnswer(rationale="", answer=""), []
-        vectors = [emb.embedding for emb in embed_output.data]
-        query_vec = np.asarray(vectors, dtype="float32")
+            return None
+        vector = embed_output.data[0].embedding
+        if self.query_embeddings is not None:
+            self.query_embeddings.put(self._query_key(query), vector)
+        return vector
 
-        # Search (Semantic Search)
-        retrieved = self.retriever(query_vec)
-        retrieved[0].documents = [self.transformed_docs[i] for i in retrieved[0].doc_indices]
-        
-        printc(f"Retrieved {len(retrieved[0].documents)} documents", color="green")
+    # Embed a query using RETRIEVAL_QUERY task type; None if embedding failed
+    def _embed_query(self, query: str) -> Optional[List[float]]:
+        with span("query_embed"):
+            vector = self._cached_query_vector(query)
+            if vector is None:
+                embed_output = self.embedder(query, model_kwargs={"task_type": "RETRIEVAL_QUERY"})
+                vector = self._remember_query_vector(query, embed_output)
+            return vector
 
-        # Generate
+    async def _aembed_query(self, query: str) -> Optional[List[float]]:
+        with span("query_embed"):
+            vector = self._cached_query_vector(query)
+            if vector is None:
+                embed_output = await self.embedder.acall(query, model_kwargs={"task_type": "RETRIEVAL_QUERY"})
+                vector = self._remember_query_vector(query, embed_output)
+            return vector
+
+    # BM25 candidates and symbol lookup hits for a query, with the index version they were found in
+    def _lexical_search(self, query: str):
+        with self._index_lock:
+            return self._lexical_hits(query), self._symbol_hits(query), self.index_version
+
+    # Number of candidates each first-stage ranking contributes
+    def _fetch_size(self, ranked: bool) -> int:
+        if self.reranker is not None:
+            return self.reranker.candidates
+        return config["hybrid"]["candidates"] if ranked else config["retriever"]["top_k"]
+
+    def _lexical_hits(self, query: str):
+        if self.lexical_index is None:
+            return []
+        return self.lexical_index.search(query, self._fetch_size(ranked=True))
+
+    def _symbol_hits(self, query: str) -> SymbolHits:
+        if self.symbol_index is None:
+            return SymbolHits()
+        return self.symbol_index.lookup(query, config["symbols"]["max_hits"])
+
+    # Queries that don't need to be embedded: structural questions the symbol index answers
+    # ("symbols") and identifier lookups that BM25 answers confidently ("lexical"); None otherwise
+    def _fast_path(self, query: str, lexical) -> Optional[str]:
+        hits, symbol_hits, _ = lexical
+        if config["symbols"]["fast_path"] and symbol_hits.structural:
+            return "symbols"
+        hybrid = config["hybrid"]
+        lexical_index = self.lexical_index
+        if hybrid["fast_path"] and lexical_index is not None and lexical_index.confident(
+                query, hits, hybrid["fast_path_max_df"], hybrid["fast_path_margin"]):
+            return "lexical"
+        return None
+
+    # Lexical and symbol hits for a query plus the fast path they allow, see `_fast_path`
+    def _lexical_fast_path(self, query: str):
+        lexical = self._lexical_search(query)
+        return lexical, self._fast_path(query, lexical)
+
+    # Symbol lookup hits ahead of the ranked chunks, then the definitions of what they call
+    def _with_symbols(self, output: RetrieverOutput, symbol_hits: SymbolHits) -> RetrieverOutput:
+        if self.symbol_index is None:
+            return output
+        scores = dict(zip(output.doc_indices, output.doc_scores or []))
+        indices = list(dict.fromkeys(symbol_hits.chunks + [int(i) for i in output.doc_indices]))
+        symbols = config["symbols"]
+        indices += self.symbol_index.expand(indices, symbols["expand"], symbols["max_definitions"])
+        return RetrieverOutput(
+            doc_indices=indices,
+            doc_scores=[scores.get(i, 0.0) for i in indices],
+            query=output.query,
+            documents=[self.transformed_docs[i] for i in indices],
+        )
+
+    # Search the index with an embedded query (None on a fast path), fuse with BM25 hits, rerank
+    # the candidates, add symbol lookup hits and attach the matching chunks; also returns the index version searched
+    def _retrieve(self, query: str, vector: Optional[List[float]], lexical):
+        hits, symbol_hits, version = lexical
+        top_k = config["retriever"]["top_k"]
+        with span("search", dense=vector is not None, lexical_hits=len(hits)) as search_span, self._index_lock:
+            if version != self.index_version:
+                hits, symbol_hits = self._lexical_hits(query), self._symbol_hits(query)
+            # Over-fetch for the reranker, or for fusion when there is a second ranking
+            fetch = self._fetch_size(ranked=bool(hits))
+            if vector is not None:
+                dense = self.retriever(np.asarray([vector], dtype="float32"), top_k=fetch)
+            if vector is not None and not hits:
+                retrieved = dense
+            else:
+                rankings = ([dense[0].doc_indices] if vector is not None else []) + [[i for i, _ in hits]]
+                keep = fetch if self.reranker is not None else top_k
+                fused = reciprocal_rank_fusion(rankings, config["hybrid"]["rrf_k"])[:keep]
+                retrieved = [RetrieverOutput(
+                    doc_indices=[i for i, _ in fused], doc_scores=[score for _, score in fused], query=query
+                )]
+            retrieved[0].documents = [self.transformed_docs[i] for i in retrieved[0].doc_indices]
+            version, lexical_index = self.index_version, self.lexical_index
+            search_span.set(items=len(retrieved[0].documents), symbol_hits=len(symbol_hits.chunks))
+
+        # Scored outside the lock, so a slow cross-encoder doesn't hold up index updates and other searches
+        if self.reranker is not None:
+            retrieved[0] = self.reranker(query, retrieved[0], top_k, lexical_index)
+        with self._index_lock:
+            # Skipped if the index changed meanwhile: the chunk indexes would point into the new one
+            if version == self.index_version:
+                retrieved[0] = self._with_symbols(retrieved[0], symbol_hits)
+
+        log.debug(f"Retrieved {len(retrieved[0].documents)} documents")
+        return retrieved, version
+
+    # Retrieve for a query, embedding it unless a fast path applies.
+    # Returns (query vector or None, retrieved, index version), or None if embedding failed
+    def _search(self, query: str):
+        lexical, fast_path = self._lexical_fast_path(query)
+        vector = None
+        if fast_path:
+            log.debug(f"{fast_path.capitalize()} fast path for {query!r}")
+            _annotate(fast_path=fast_path)
+        else:
+            vector = self._embed_query(query)
+            if vector is None:
+                return None
+        return (vector, *self._retrieve(query, vector, lexical))
+
+    # Searching, reranking and waiting for the index lock run in a worker thread, off the event loop
+    async def _asearch(self, query: str):
+        lexical, fast_path = await asyncio.to_thread(self._lexical_fast_path, query)
+        vector = None
+        if fast_path:
+            log.debug(f"{fast_path.capitalize()} fast path for {query!r}")
+            _annotate(fast_path=fast_path)
+        else:
+            vector = await self._aembed_query(query)
+            if vector is None:
+                return None
+        return (vector, *await asyncio.to_thread(self._retrieve, query, vector, lexical))
+
+    # Answers are only shared for questions asked without prior conversation, which would change them
+    def _answer_cacheable(self, vector, memory: Memory) -> bool:
+        return self.answer_cache is not None and vector is not None and not memory()
+
+    def _cached_answer(self, query: str, vector, retrieved, version, memory: Memory) -> Optional[RAGAnswer]:
+        answer = self.answer_cache.get(version, vector, retrieved[0].doc_indices)
+        record_cache("answer", hits=answer is not None, misses=answer is None)
+        if answer is not None:
+            log.debug(f"Answer cache hit for {query!r}")
+            memory.add_dialog_turn(uq=query, ar=answer.answer)
+            answer = replace(answer, usage=None)  # no prompt was sent
+        return answer
+
+    def _remember_answer(self, vector, retrieved, version, answer: RAGAnswer):
+        if answer.answer:
+            self.answer_cache.put(version, vector, retrieved[0].doc_indices, answer)
+
+    def cache_stats(self) -> dict:
+        return {
+            "query_embeddings": self.query_embeddings.stats() if self.query_embeddings is not None else None,
+            "answers": self.answer_cache.stats() if self.answer_cache is not None else None,
+        }
+
+    # Tokens of the prompt with no query, history or context: system prompt and format instructions
+    def _template_token_count(self) -> int:
+        if self._template_tokens is None:
+            self._template_tokens = count_tokens(self.generator.get_prompt(input_str="", contexts=None, conversation_history=None))
+        return self._template_tokens
+
+    # Prompt inputs trimmed to the context budget, and the token accounting for them
+    def _prompt_kwargs(self, query: str, retrieved, memory: Memory):
+        with span("prompt_build") as prompt_span:
+            history, contexts, usage = self.budgeter.fit(
+                self._template_token_count(), query, memory(), retrieved[0].documents
+            )
+            prompt_span.set(prompt_tokens=usage.total, items=usage.context_chunks)
+        log.debug(f"Prompt ~{usage.total}/{usage.budget} tokens: {usage.to_dict()}")
         prompt_kwargs = {
             "input_str": query,
-            "contexts": retrieved[0].documents,
-            "conversation_history": self.memory(),
+            "contexts": contexts,
+            "conversation_history": history,
         }
-        
-        response = self.generator(prompt_kwargs=prompt_kwargs)
-        printc(f"Raw response: {response.raw_response}", color="yellow")
-        printc(f"Parsed data: {response.data}", color="yellow")
-        printc(f"Error: {response.error}", color="red")
-        
+        return prompt_kwargs, usage
+
+    # Turn a generator response into a RAGAnswer and record the dialog turn
+    def _finalize(self, query: str, response, memory: Memory) -> RAGAnswer:
+        with span("parse"):
+            return self._parse_response(query, response, memory)
+
+    def _parse_response(self, query: str, response, memory: Memory) -> RAGAnswer:
+        log.debug(f"Raw response: {response.raw_response}")
+        log.debug(f"Parsed data: {response.data}")
+        if response.error:
+            log.warning(f"Generator error: {response.error}")
+
         final = response.data
-        
+
         # Fallback: if parsing failed (empty fields), try to extract from raw response
         if final and hasattr(final, 'rationale') and hasattr(final, 'answer'):
             if not final.rationale and not final.answer:
@@ -164,6 +452,114 @@ class RAG(adal.Component):
                 except (json.JSONDecodeError, AttributeError) as e:
                     # Use raw response as answer if all else fails
                     final = RAGAnswer(rationale="", answer=response.raw_response)
-        
-        self.memory.add_dialog_turn(uq=query, ar=str(final))
+
+        # Only the answer is carried into later prompts; the rationale would just cost tokens
+        memory.add_dialog_turn(uq=query, ar=final.answer if isinstance(final, RAGAnswer) else str(final))
+        return final
+
+    # `memory` holds the caller's conversation; defaults to this instance's own
+    def call(self, query: str, memory: Optional[Memory] = None) -> Any:
+        log.info(f"Processing query: {query!r}")
+        with span("query", mode="call"):
+            return self._call(query, memory or self.memory)
+
+    def _call(self, query: str, memory: Memory):
+        found = self._search(query)
+        if found is None:
+            return RAGAnswer(rationale="", answer=""), []
+        vector, retrieved, version = found
+        cacheable = self._answer_cacheable(vector, memory)
+        if cacheable and (cached := self._cached_answer(query, vector, retrieved, version, memory)):
+            return cached, retrieved
+
+        # Generate
+        prompt_kwargs, usage = self._prompt_kwargs(query, retrieved, memory)
+        with span("generate") as generate_span:
+            response = self.generator(prompt_kwargs=prompt_kwargs)
+            _record_completion(generate_span, response)
+        final = _with_usage(self._finalize(query, response, memory), usage)
+        if cacheable:
+            self._remember_answer(vector, retrieved, version, final)
         return final, retrieved
+
+    async def acall(self, query: str, memory: Optional[Memory] = None) -> Any:
+        """Async counterpart of `call`: the embedding and LLM round trips never block the event loop."""
+        log.info(f"Processing query: {query!r}")
+        with span("query", mode="acall"):
+            return await self._acall(query, memory or self.memory)
+
+    async def _acall(self, query: str, memory: Memory):
+        found = await self._asearch(query)
+        if found is None:
+            return RAGAnswer(rationale="", answer=""), []
+        vector, retrieved, version = found
+        cacheable = self._answer_cacheable(vector, memory)
+        if cacheable and (cached := self._cached_answer(query, vector, retrieved, version, memory)):
+            return cached, retrieved
+
+        prompt_kwargs, usage = self._prompt_kwargs(query, retrieved, memory)
+        with span("generate") as generate_span:
+            response = await self.generator.acall(prompt_kwargs=prompt_kwargs)
+            _record_completion(generate_span, response)
+        final = _with_usage(self._finalize(query, response, memory), usage)
+        if cacheable:
+            self._remember_answer(vector, retrieved, version, final)
+        return final, retrieved
+
+    async def astream(self, query: str, memory: Optional[Memory] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """Streaming counterpart of `acall`, yielding `(event, data)` pairs.
+
+        Emits ``("sources", documents)`` as soon as retrieval finishes, then
+        ``("rationale", text)`` / ``("answer", text)`` deltas parsed from the
+        model's JSON while it is generated, and finally ``("done", RAGAnswer)``.
+        """
+        log.info(f"Streaming query: {query!r}")
+        with span("query", mode="stream"):
+            async for event in self._astream(query, memory or self.memory):
+                yield event
+
+    async def _astream(self, query: str, memory: Memory) -> AsyncIterator[Tuple[str, Any]]:
+        found = await self._asearch(query)
+        if found is None:
+            yield "sources", []
+            yield "done", RAGAnswer(rationale="", answer="")
+            return
+        vector, retrieved, version = found
+        yield "sources", retrieved[0].documents
+        cacheable = self._answer_cacheable(vector, memory)
+        if cacheable and (cached := self._cached_answer(query, vector, retrieved, version, memory)):
+            yield "rationale", cached.rationale
+            yield "answer", cached.answer
+            yield "done", cached
+            return
+
+        prompt_kwargs, usage = self._prompt_kwargs(query, retrieved, memory)
+        # Rendered and converted the way Generator does it, but streamed straight from the client
+        api_kwargs = self.generator.model_client.convert_inputs_to_api_kwargs(
+            input=self.generator.get_prompt(**prompt_kwargs),
+            model_kwargs={**self.generator.model_kwargs},
+            model_type=ModelType.LLM,
+        )
+        parser = JSONFieldStreamParser(RAGAnswer.__output_fields__)
+        chunks = []
+        with span("generate") as generate_span:
+            async for text in self.generator.model_client.astream(api_kwargs):
+                if not chunks:
+                    generate_span.set(first_token_ms=round((time.perf_counter() - generate_span.started) * 1000, 2))
+                chunks.append(text)
+                for event in parser.feed(text):
+                    yield event
+
+        raw = "".join(chunks)
+        try:
+            data = self.generator.output_processors(raw)
+        except Exception as e:
+            data = RAGAnswer()
+            log.warning(f"Error parsing streamed response: {e}")
+        final = _with_usage(self._finalize(query, GeneratorOutput(data=data, raw_response=raw), memory), usage)
+        # Models that answer in plain text never open the JSON fields
+        if not any(parser.values.values()) and final.answer:
+            yield "answer", final.answer
+        if cacheable:
+            self._remember_answer(vector, retrieved, version, final)
+        yield "done", final
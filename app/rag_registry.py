@@ -0,0 +1,180 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from adalflow.utils import printc
+
+from app.git_repo import parse_repo_url
+from app.query_cache import get_query_embedding_cache
+from app.rag import RAG, Memory
+
+
+# Registry key for a repo: the same host/owner/repo/ref key its storage uses, or an absolute local path
+def repo_key(repo_url_or_path: str) -> str:
+    if repo_url_or_path.startswith("http"):
+        return parse_repo_url(repo_url_or_path).key
+    return os.path.abspath(repo_url_or_path)
+
+
+class RAGRegistry:
+    """Loaded repo indexes keyed by repo, evicted least-recently-used over a memory budget.
+
+    Repos indexed earlier are loaded lazily from their on-disk store on first
+    use, so an evicted repo costs a reload rather than a re-index. Loading
+    and indexing the same repo are serialized; different repos proceed in
+    parallel. Every `refresh_seconds` a loaded repo checks whether another
+    process (a worker or `app.indexer`) published a newer version, and
+    swaps it in while queries keep using the old one until it is ready.
+    """
+
+    def __init__(self, max_bytes: int, factory: Callable[[], RAG] = RAG, refresh_seconds: float = 2.0):
+        self.max_bytes = max_bytes
+        self.factory = factory
+        self.refresh_seconds = refresh_seconds
+        self._entries: "OrderedDict[str, RAG]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._checked: Dict[str, float] = {}  # when each repo last looked for a newer version
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _lookup(self, key: str) -> Optional[RAG]:
+        with self._lock:
+            rag = self._entries.get(key)
+            if rag is not None:
+                self._entries.move_to_end(key)
+            return rag
+
+    # Insert or re-account a repo, then evict the oldest others until under budget
+    def _put(self, key: str, rag: RAG):
+        with self._lock:
+            self._entries[key] = rag
+            self._entries.move_to_end(key)
+            self._sizes[key] = rag.index_bytes()
+            while sum(self._sizes.values()) > self.max_bytes and len(self._entries) > 1:
+                evicted, _ = self._entries.popitem(last=False)
+                freed = self._sizes.pop(evicted)
+                self._checked.pop(evicted, None)
+                printc(f"Registry: evicted {evicted} ({freed / 1024 ** 2:.1f} MB)", color="yellow")
+
+    def get(self, repo_url_or_path: str) -> Optional[RAG]:
+        """Loaded RAG for a repo, opening its stored index if needed; None if it was never indexed."""
+        key = repo_key(repo_url_or_path)
+        rag = self._lookup(key)
+        if rag is not None:
+            self._refresh(key, repo_url_or_path, rag)
+            return rag
+        with self._key_lock(key):
+            rag = self._lookup(key)
+            if rag is None:
+                rag = self.factory()
+                if not rag.load_retriever(repo_url_or_path):
+                    return None
+                self._put(key, rag)
+                printc(f"Registry: loaded {key} from disk", color="green")
+        return rag
+
+    # Hot-swap a newer published version into a loaded repo; one caller checks per interval
+    def _refresh(self, key: str, repo_url_or_path: str, rag: RAG):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked.get(key, 0.0) < self.refresh_seconds:
+                return
+            self._checked[key] = now
+        db_manager = rag.db_manager
+        if db_manager is None or db_manager.published_version() == db_manager.version:
+            return
+        with self._key_lock(key):
+            # A local update may have published it (and installed it) while this caller waited
+            if rag.db_manager.published_version() == rag.db_manager.version:
+                return
+            try:
+                loaded = rag.load_retriever(repo_url_or_path)
+            except Exception as e:
+                printc(f"Registry: could not load new version of {key}, keeping the old one: {e}", color="yellow")
+                return
+            if loaded:
+                self._put(key, rag)
+                printc(f"Registry: {key} now at index version {rag.db_manager.version}", color="green")
+
+    def prepare(self, repo_url_or_path: str, update: bool = False) -> RAG:
+        """Clone/fetch and index a repo (reusing its stored index when present) and register it."""
+        key = repo_key(repo_url_or_path)
+        with self._key_lock(key):
+            rag = self._lookup(key) or self.factory()
+            rag.prepare_retriever(repo_url_or_path, update=update)
+            self._put(key, rag)
+        return rag
+
+    def update(self, repo_url_or_path: str):
+        """Incrementally re-index a registered repo; returns the `IndexUpdate`, or None if unknown."""
+        rag = self.get(repo_url_or_path)
+        if rag is None:
+            return None
+        key = repo_key(repo_url_or_path)
+        with self._key_lock(key):
+            update = rag.update_retriever()
+            self._put(key, rag)
+        return update
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "repos": list(self._entries),
+                "versions": {key: getattr(rag.db_manager, "version", None) for key, rag in self._entries.items()},
+                "index_bytes": sum(self._sizes.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+    # Hit rates of the shared query-embedding cache and each loaded repo's answer cache
+    def cache_stats(self) -> dict:
+        with self._lock:
+            entries = list(self._entries.items())
+        return {
+            "query_embeddings": get_query_embedding_cache().stats(),
+            "answers": {key: rag.cache_stats()["answers"] for key, rag in entries},
+        }
+
+
+class SessionStore:
+    """Conversation memory per session ID, dropped when idle past `ttl_seconds` or over `max_sessions`."""
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 6 * 3600):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, Memory]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Memory:
+        now = time.monotonic()
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is None:
+                memory = self._sessions[session_id] = Memory()
+            self._sessions.move_to_end(session_id)
+            self._last_used[session_id] = now
+            self._prune(now)
+            return memory
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._last_used.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    # Oldest sessions sit at the front of the ordered dict
+    def _prune(self, now: float):
+        while self._sessions:
+            oldest = next(iter(self._sessions))
+            if len(self._sessions) <= self.max_sessions and now - self._last_used[oldest] <= self.ttl_seconds:
+                break
+            del self._sessions[oldest]
+            del self._last_used[oldest]
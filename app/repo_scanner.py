@@ -0,0 +1,277 @@
+import os
+import re
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from adalflow.core.types import Document
+from adalflow.utils import printc
+
+from app.telemetry import record_span
+
+CODE_EXTS = [".py", ".js", ".ts", ".java", ".cpp", ".c", ".go", ".rs"]
+DOC_EXTS = [".md", ".txt", ".rst", ".json", ".yaml", ".yml"]
+
+# Directories never worth descending into
+IGNORED_DIRS = {
+    ".git", ".venv", "venv", "node_modules", "__pycache__", ".tox", ".nox",
+    ".mypy_cache", ".pytest_cache", ".ruff_cache", ".idea", "dist", "site-packages",
+}
+
+# File names that are build output or lockfiles rather than source
+GENERATED_NAME_RE = re.compile(
+    r"(\.min\.(js|css)|\.bundle\.js|_pb2\.py|_pb2_grpc\.py|\.pb\.go|\.generated\.\w+)$"
+    r"|^(package-lock\.json|pnpm-lock\.yaml|composer\.lock)$"
+)
+# Markers that tools put in the first lines of generated files
+GENERATED_MARKERS = (b"@generated", b"DO NOT EDIT", b"Code generated by", b"auto-generated")
+
+
+# Translate one .gitignore pattern into a regex over paths relative to the .gitignore's directory
+def _gitignore_regex(pattern: str) -> str:
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    out, i = [], 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 1:]:
+            end = pattern.index("]", i + 1)
+            out.append("[" + pattern[i + 1:end].replace("!", "^", 1) + "]")
+            i = end + 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    prefix = "" if anchored else "(?:.*/)?"
+    return prefix + "".join(out)
+
+
+class GitIgnore:
+    """Rules of a single .gitignore file, matched relative to the directory holding it."""
+
+    def __init__(self, base: str, lines: List[str]):
+        self.base = base
+        self.rules: List[Tuple[re.Pattern, bool, bool]] = []
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate or line.startswith("\\"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if line:
+                self.rules.append((re.compile(_gitignore_regex(line)), negate, dir_only))
+
+    @classmethod
+    def load(cls, abs_dir: str, base: str) -> Optional["GitIgnore"]:
+        try:
+            with open(os.path.join(abs_dir, ".gitignore"), "r", encoding="utf-8", errors="ignore") as f:
+                ignore = cls(base, f.readlines())
+        except OSError:
+            return None
+        return ignore if ignore.rules else None
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """True if ignored, False if re-included, None if no rule applies."""
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return None
+            rel_path = rel_path[len(self.base) + 1:]
+        result = None
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.fullmatch(rel_path):
+                result = not negate
+        return result
+
+
+# Later (deeper) .gitignore files override earlier ones
+def _is_ignored(ignores: List[GitIgnore], rel_path: str, is_dir: bool) -> bool:
+    ignored = False
+    for ignore in ignores:
+        result = ignore.match(rel_path, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
+
+
+def is_indexable_name(name: str) -> bool:
+    return os.path.splitext(name)[1] in CODE_EXTS + DOC_EXTS and not GENERATED_NAME_RE.search(name)
+
+
+# Whether a repo-relative path is excluded by ignored directories or .gitignore files
+def is_path_ignored(root: str, rel_path: str) -> bool:
+    parts = rel_path.split("/")
+    if any(p in IGNORED_DIRS or p.startswith(".") for p in parts):
+        return True
+    ignores: List[GitIgnore] = []
+    for depth in range(len(parts)):
+        base = "/".join(parts[:depth])
+        ignore = GitIgnore.load(os.path.join(root, base), base)
+        if ignore:
+            ignores.append(ignore)
+        if _is_ignored(ignores, "/".join(parts[:depth + 1]), is_dir=depth < len(parts) - 1):
+            return True
+    return False
+
+
+@dataclass
+class ScanStats:
+    files_seen: int = 0
+    files_indexed: int = 0
+    skipped_ignored: int = 0
+    skipped_large: int = 0
+    skipped_binary: int = 0
+    skipped_generated: int = 0
+    bytes_read: int = 0
+    walk_seconds: float = 0.0
+    read_seconds: float = 0.0  # summed across reader threads
+    total_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def log(self):
+        printc(
+            f"Scan: {self.files_indexed}/{self.files_seen} files, {self.bytes_read / 1024 ** 2:.1f} MB "
+            f"(skipped {self.skipped_ignored} ignored, {self.skipped_large} large, "
+            f"{self.skipped_binary} binary, {self.skipped_generated} generated) — "
+            f"walk {self.walk_seconds:.2f}s, read {self.read_seconds:.2f}s, total {self.total_seconds:.2f}s",
+            color="blue",
+        )
+
+
+# Single os.scandir pass yielding (rel_path, size) of candidate files, pruning ignored directories
+def walk_repository(root: str, max_file_bytes: int, stats: ScanStats) -> Iterator[Tuple[str, int]]:
+    root_ignore = GitIgnore.load(root, "")
+    stack: List[Tuple[str, List[GitIgnore]]] = [("", [root_ignore] if root_ignore else [])]
+    while stack:
+        started = time.perf_counter()
+        rel_dir, ignores = stack.pop()
+        found: List[Tuple[str, int]] = []
+        try:
+            entries = sorted(os.scandir(os.path.join(root, rel_dir)), key=lambda e: e.name, reverse=True)
+        except OSError:
+            entries = []
+        for entry in entries:
+            if entry.name.startswith(".") or entry.is_symlink():
+                continue
+            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            if entry.is_dir():
+                if entry.name in IGNORED_DIRS or _is_ignored(ignores, rel, is_dir=True):
+                    continue
+                child = GitIgnore.load(entry.path, rel)
+                stack.append((rel, ignores + [child] if child else ignores))
+            elif entry.is_file() and os.path.splitext(entry.name)[1] in CODE_EXTS + DOC_EXTS:
+                stats.files_seen += 1
+                if _is_ignored(ignores, rel, is_dir=False):
+                    stats.skipped_ignored += 1
+                elif GENERATED_NAME_RE.search(entry.name):
+                    stats.skipped_generated += 1
+                else:
+                    size = entry.stat().st_size
+                    if size > max_file_bytes:
+                        stats.skipped_large += 1
+                    else:
+                        found.append((rel, size))
+        stats.walk_seconds += time.perf_counter() - started
+        yield from reversed(found)
+
+
+# Read one file into a Document, or None if it is binary, generated or unreadable
+def load_document(root: str, rel: str, stats: Optional[ScanStats] = None) -> Optional[Document]:
+    stats = stats or ScanStats()
+    started = time.perf_counter()
+    try:
+        with open(os.path.join(root, rel), "rb") as f:
+            raw = f.read()
+    except OSError as e:
+        print(f"Error reading {rel}: {e}")
+        return None
+    finally:
+        stats.add(read_seconds=time.perf_counter() - started)
+    head = raw[:8192]
+    if b"\0" in head:
+        stats.add(skipped_binary=1)
+        return None
+    first_lines = b"\n".join(head.split(b"\n", 5)[:5])
+    if any(marker in first_lines for marker in GENERATED_MARKERS):
+        stats.add(skipped_generated=1)
+        return None
+    try:
+        content = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        stats.add(skipped_binary=1)
+        return None
+    stats.add(files_indexed=1, bytes_read=len(raw))
+    ext = os.path.splitext(rel)[1]
+    is_code = ext in CODE_EXTS
+    return Document(
+        text=content,
+        meta_data={
+            "file_path": rel,
+            "type": ext[1:],
+            "is_code": is_code,
+            "is_implementation": is_code,
+            "title": rel,
+        },
+    )
+
+
+def scan_repository(
+    root: str,
+    max_workers: int = 8,
+    max_file_bytes: int = 1_000_000,
+    stats: Optional[ScanStats] = None,
+) -> Iterator[Document]:
+    """Yield a Document per indexable file under `root`.
+
+    Files are read by a thread pool while the walk continues; at most a few
+    reads per worker are outstanding, so memory stays flat on huge repos.
+    """
+    stats = stats if stats is not None else ScanStats()
+    started = resumed = time.perf_counter()
+    busy = 0.0  # time spent scanning, excluding time the consumer holds each document
+    window = max_workers * 4
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for rel, _ in walk_repository(root, max_file_bytes, stats):
+            pending.append(pool.submit(load_document, root, rel, stats))
+            while len(pending) >= window or (pending and pending[0].done()):
+                doc = pending.popleft().result()
+                if doc is not None:
+                    busy += time.perf_counter() - resumed
+                    yield doc
+                    resumed = time.perf_counter()
+        while pending:
+            doc = pending.popleft().result()
+            if doc is not None:
+                busy += time.perf_counter() - resumed
+                yield doc
+                resumed = time.perf_counter()
+    busy += time.perf_counter() - resumed
+    stats.total_seconds = time.perf_counter() - started
+    stats.log()
+    record_span("scan", busy, items=stats.files_indexed, bytes=stats.bytes_read)
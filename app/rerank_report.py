@@ -0,0 +1,154 @@
+"""Retrieval quality vs latency of the rerankers in `app.reranker`.
+
+Labelled queries come from the indexed chunks: for every Python function
+or class with a docstring, its first docstring line (with the name itself
+removed) should retrieve the chunk that defines it. Every setting answers
+the same queries, with the symbol index and lexical fast paths off so the
+first-stage ranking is always used::
+
+    python -m app.rerank_report --synthetic 500
+    python -m app.rerank_report --repo . --candidates 20,50,100 --json rerank.json
+
+Reported per setting: recall@k (a defining chunk is among the `top_k`
+kept), MRR@k, retrieval latency per query, and the recall gained per
+millisecond added over no reranking (in percentage points).
+"""
+import os
+import re
+import json
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import importlib.util
+from typing import Any, Dict, List, Set, Tuple
+
+import numpy as np
+
+from app.benchmark import make_synthetic_repo
+
+# A Python definition followed by its docstring's first line
+_DOCUMENTED_RE = re.compile(r"^[ \t]*(?:async[ \t]+)?(?:def|class)[ \t]+(\w+)[^\n]*:[ \t]*\n[ \t]*[rb]?(?:\"\"\"|''')[ \t]*([^\n]+)", re.M)
+
+
+def labelled_queries(documents, count: int, seed: int = 0) -> List[Tuple[str, Set[int]]]:
+    """(question, chunks defining the symbol it describes) pairs, at most `count`."""
+    found: Dict[str, str] = {}
+    texts = [doc.text for doc in documents]
+    for text in texts:
+        for name, line in _DOCUMENTED_RE.findall(text):
+            question = re.sub(rf"\b{re.escape(name)}\b", " ", line.strip().strip("\"'")).strip(" .")
+            if len(question.split()) >= 3:
+                found.setdefault(name, " ".join(question.split()))
+    names = sorted(found)
+    random.Random(seed).shuffle(names)
+    labelled = []
+    for name in names[:count]:
+        defines = re.compile(rf"\b(?:def|class)\s+{re.escape(name)}\b")
+        labelled.append((found[name], {i for i, text in enumerate(texts) if defines.search(text)}))
+    return labelled
+
+
+def _settings(candidates: List[int], cross_encoder: bool) -> List[Dict[str, Any]]:
+    settings = [{"reranker": "none", "candidates": 0}]
+    settings += [{"reranker": "lexical", "candidates": c} for c in candidates]
+    if cross_encoder:
+        settings += [{"reranker": "cross-encoder", "candidates": c} for c in candidates]
+    return settings
+
+
+def run_report(repo: str, queries: int, candidates: List[int], cross_encoder: bool, seed: int = 0) -> Dict[str, Any]:
+    from app.config import config
+    from app.rag import RAG
+    from app.reranker import create_reranker
+
+    # Every query is retrieved from scratch, by the same first stage in every setting
+    config["query_cache"]["enabled"] = False
+    config["embedding_cache"]["enabled"] = False
+    config["symbols"]["enabled"] = False
+    config["hybrid"]["fast_path"] = False
+    config["reranker"]["provider"] = "none"
+    rag = RAG()
+    rag.prepare_retriever(repo)
+    labelled = labelled_queries(rag.transformed_docs, queries, seed)
+    if not labelled:
+        raise ValueError(f"No documented Python functions or classes found in {repo}")
+    top_k = config["retriever"]["top_k"]
+
+    rows = []
+    for setting in _settings(candidates, cross_encoder):
+        rag.reranker = create_reranker({
+            **config["reranker"], "provider": setting["reranker"], "candidates": setting["candidates"]
+        })
+        rag._search(labelled[0][0])  # warm up, e.g. load the cross-encoder
+        hits, reciprocal_ranks, latencies = [], [], []
+        for question, relevant in labelled:
+            started = time.perf_counter()
+            _, retrieved, _ = rag._search(question)
+            latencies.append((time.perf_counter() - started) * 1000)
+            ranked = [int(i) for i in retrieved[0].doc_indices[:top_k]]
+            rank = next((r for r, i in enumerate(ranked) if i in relevant), None)
+            hits.append(rank is not None)
+            reciprocal_ranks.append(0.0 if rank is None else 1.0 / (rank + 1))
+        rows.append({
+            **setting,
+            f"recall@{top_k}": round(float(np.mean(hits)), 4),
+            f"mrr@{top_k}": round(float(np.mean(reciprocal_ranks)), 4),
+            "mean_ms": round(float(np.mean(latencies)), 3),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        })
+
+    base = rows[0]
+    for row in rows:
+        added_ms = row["mean_ms"] - base["mean_ms"]
+        gained = (row[f"recall@{top_k}"] - base[f"recall@{top_k}"]) * 100
+        row["added_ms"] = round(added_ms, 3)
+        row["recall_pts_per_ms"] = round(gained / added_ms, 2) if added_ms > 0.01 else None
+    return {"queries": len(labelled), "chunks": len(rag.transformed_docs), "top_k": top_k, "rows": rows}
+
+
+def _print_table(rows: List[Dict[str, Any]]):
+    headers = list(rows[0])
+    widths = [max(len(h), *(len(str(r[h])) for r in rows)) for h in headers]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(row[h]).ljust(w) for h, w in zip(headers, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--repo", help="local checkout to index")
+    source.add_argument("--synthetic", type=int, help="files in a generated repo, as in app.benchmark")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--candidates", default="10,20,50,100", help="comma-separated over-fetch sizes")
+    parser.add_argument("--cross-encoder", action="store_true", default=None,
+                        help="include the cross-encoder; default when sentence-transformers is installed")
+    parser.add_argument("--embedder-model", default="hashing", help="local embedder: hashing or a sentence-transformers model")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    # Stores and caches go to a temporary adalflow root, as in app.benchmark
+    root = tempfile.mkdtemp(prefix="githubchat-rerank-")
+    os.environ["HOME"] = root
+    os.environ.update(EMBEDDER_PROVIDER="local", EMBEDDER_MODEL=args.embedder_model, GENERATOR_PROVIDER="mock")
+    try:
+        repo = os.path.abspath(args.repo) if args.repo else make_synthetic_repo(os.path.join(root, "synthetic"), args.synthetic, args.seed)
+        cross_encoder = args.cross_encoder
+        if cross_encoder is None:
+            cross_encoder = importlib.util.find_spec("sentence_transformers") is not None
+        candidates = [int(c) for c in args.candidates.split(",") if c]
+        report = run_report(repo, args.queries, candidates, cross_encoder, args.seed)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    print(f"{report['queries']} queries over {report['chunks']} chunks, top_k={report['top_k']}")
+    _print_table(report["rows"])
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Second-stage ranking of over-fetched retrieval candidates.
+
+First-stage retrieval (vector search fused with BM25) fetches `candidates`
+chunks, far more than belong in a prompt; a reranker scores each of them
+against the query and only the best `top_k` are kept. Both rerankers run on CPU:
+
+- ``lexical``: coverage of the query's terms (weighted by IDF), query
+  terms in the names a chunk defines, named identifiers and their
+  definitions, path priors (implementation over tests, docs and vendored
+  copies) and the first-stage rank. No dependencies, about a millisecond
+  for 50 candidates.
+- ``cross-encoder``: a sentence-transformers cross-encoder such as
+  ``cross-encoder/ms-marco-MiniLM-L-6-v2`` reading query and chunk
+  together; better on prose questions, but tens of milliseconds or more.
+
+``python -m app.rerank_report`` measures the recall each setting buys per added millisecond.
+"""
+import re
+import math
+import logging
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from adalflow.core.types import Document, RetrieverOutput
+
+from app.lexical_index import LexicalIndex, query_identifiers, tokenize_code
+from app.telemetry import span
+
+log = logging.getLogger(__name__)
+
+_TEST_PATH_RE = re.compile(r"(^|/)(tests?|spec|__tests__)/|(^|/)test_[^/]*$|_test\.\w+$|\.(spec|test)\.\w+$")
+_VENDOR_PATH_RE = re.compile(r"(^|/)(vendor|third_party|node_modules|external)/")
+# Names a chunk defines: functions, classes, methods and types
+_DEFINED_NAME_RE = re.compile(r"\b(?:def|class|function|func|fn|struct|interface|type)\s+([A-Za-z_$][\w$]*)")
+_TEST_TERMS = frozenset({"test", "tests", "testing", "spec", "fixture", "fixtures"})
+_DOC_TERMS = frozenset({"readme", "docs", "documentation", "install", "installation", "setup", "usage", "guide"})
+
+
+# Search terms of the names a chunk defines; popular chunks come up for many queries
+@lru_cache(maxsize=8192)
+def _defined_terms(text: str) -> Tuple[frozenset, frozenset]:
+    names = _DEFINED_NAME_RE.findall(text)
+    return frozenset(name.lower() for name in names), frozenset(tokenize_code(" ".join(names)))
+
+
+class Reranker(ABC):
+    """Reorders candidates by `scores`; subclasses implement the scorer."""
+
+    def __init__(self, candidates: int = 50):
+        self.candidates = candidates
+
+    @abstractmethod
+    def scores(self, query: str, documents: Sequence[Document], doc_indices: Sequence[int],
+               lexical_index: Optional[LexicalIndex] = None) -> np.ndarray:
+        """One score per candidate, higher is better."""
+
+    def __call__(self, query: str, output: RetrieverOutput, k: int,
+                 lexical_index: Optional[LexicalIndex] = None) -> RetrieverOutput:
+        """The best `k` of `output`'s candidates (with documents attached), best first."""
+        documents = output.documents or []
+        with span("rerank", items=len(documents)):
+            scores = self.scores(query, documents, output.doc_indices, lexical_index) if documents else np.zeros(0)
+            order = np.argsort(-scores, kind="stable")[:k]
+        return RetrieverOutput(
+            doc_indices=[output.doc_indices[i] for i in order],
+            doc_scores=[float(scores[i]) for i in order],
+            query=output.query,
+            documents=[documents[i] for i in order],
+        )
+
+
+class LexicalReranker(Reranker):
+    """Cheap scorer over query terms, definition names, identifiers and file paths.
+
+    Term presence is read from the BM25 postings when a `LexicalIndex` is
+    given, so chunk texts are only scanned for their definition lines.
+    """
+
+    def __init__(
+        self,
+        candidates: int = 50,
+        rank_weight: float = 1.0,
+        coverage_weight: float = 1.0,
+        name_weight: float = 2.0,
+        identifier_weight: float = 1.0,
+        definition_weight: float = 1.0,
+        path_weight: float = 0.5,
+        implementation_weight: float = 0.3,
+        test_penalty: float = 0.5,
+        docs_penalty: float = 0.3,
+        vendor_penalty: float = 0.5,
+        max_chars: int = 4000,
+    ):
+        super().__init__(candidates)
+        self.rank_weight = rank_weight
+        self.coverage_weight = coverage_weight
+        self.name_weight = name_weight
+        self.identifier_weight = identifier_weight
+        self.definition_weight = definition_weight
+        self.path_weight = path_weight
+        self.implementation_weight = implementation_weight
+        self.test_penalty = test_penalty
+        self.docs_penalty = docs_penalty
+        self.vendor_penalty = vendor_penalty
+        self.max_chars = max_chars
+
+    # Per query term: its weight, and which candidates contain it
+    def _term_presence(self, terms: Set[str], documents: Sequence[Document], doc_indices: Sequence[int],
+                       lexical_index: Optional[LexicalIndex]) -> Dict[str, Tuple[float, np.ndarray]]:
+        if lexical_index is not None:
+            ids = np.asarray(doc_indices, dtype=np.int64)
+            presence = {}
+            for term in terms:
+                idx = lexical_index.vocab.get(term)
+                if idx is None:
+                    continue
+                # Postings are in ascending chunk order
+                postings = lexical_index.docs[lexical_index.offsets[idx]:lexical_index.offsets[idx + 1]]
+                pos = np.minimum(np.searchsorted(postings, ids), len(postings) - 1)
+                presence[term] = (float(lexical_index.idf[idx]), np.asarray(postings[pos] == ids))
+            return presence
+        # No BM25 index: tokenize the candidates and weigh terms by rarity among them
+        found = [set(tokenize_code(doc.text[:self.max_chars])) for doc in documents]
+        presence = {}
+        for term in terms:
+            present = np.fromiter((term in f for f in found), dtype=bool, count=len(found))
+            presence[term] = (math.log1p(len(documents) / (1 + present.sum())), present)
+        return presence
+
+    def scores(self, query: str, documents: Sequence[Document], doc_indices: Sequence[int],
+               lexical_index: Optional[LexicalIndex] = None) -> np.ndarray:
+        terms = set(tokenize_code(query))
+        identifiers = set(query_identifiers(query))
+        presence = self._term_presence(terms, documents, doc_indices, lexical_index)
+        weights = {term: weight for term, (weight, _) in presence.items()}
+        total_weight = sum(weights.values()) or 1.0
+        asks_tests, asks_docs = bool(terms & _TEST_TERMS), bool(terms & _DOC_TERMS)
+
+        scores = np.zeros(len(documents), dtype=np.float32)
+        for weight, present in presence.values():
+            scores += self.coverage_weight * weight / total_weight * present
+        for rank, doc in enumerate(documents):
+            meta_data: Dict[str, Any] = doc.meta_data or {}
+            path = meta_data.get("file_path") or ""
+            text = doc.text[:self.max_chars]
+            score = self.rank_weight / math.log2(rank + 2)
+            # Query terms in the names the chunk defines, like a title match for code
+            names, name_terms = _defined_terms(text)
+            if name_terms and weights:
+                score += self.name_weight * sum(w for term, w in weights.items() if term in name_terms) / total_weight
+            if identifiers:
+                lowered = text.lower()
+                score += self.identifier_weight * sum(name in lowered for name in identifiers) / len(identifiers)
+                if names & identifiers:
+                    score += self.definition_weight
+            if terms:
+                score += self.path_weight * len(terms & set(tokenize_code(path))) / len(terms)
+            if meta_data.get("is_implementation"):
+                score += self.implementation_weight
+            elif not meta_data.get("is_code") and not asks_docs:
+                score -= self.docs_penalty
+            if _TEST_PATH_RE.search(path) and not asks_tests:
+                score -= self.test_penalty
+            if _VENDOR_PATH_RE.search(path):
+                score -= self.vendor_penalty
+            scores[rank] += score
+        return scores
+
+
+class CrossEncoderReranker(Reranker):
+    """Scores (query, chunk) pairs with a sentence-transformers cross-encoder on CPU."""
+
+    def __init__(self, model: str, candidates: int = 50, max_chars: int = 2000, batch_size: int = 32):
+        from sentence_transformers import CrossEncoder
+
+        super().__init__(candidates)
+        self.model = CrossEncoder(model, device="cpu")
+        self.max_chars = max_chars
+        self.batch_size = batch_size
+
+    def scores(self, query: str, documents: Sequence[Document], doc_indices: Sequence[int],
+               lexical_index: Optional[LexicalIndex] = None) -> np.ndarray:
+        pairs = [(query, doc.text[:self.max_chars]) for doc in documents]
+        return np.asarray(self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False), dtype=np.float32)
+
+
+RERANKERS: List[str] = ["none", "lexical", "cross-encoder"]
+
+
+def create_reranker(cfg: Dict[str, Any]) -> Optional[Reranker]:
+    """The reranker the "reranker" config section selects, or None when reranking is off.
+
+    Without sentence-transformers installed, "cross-encoder" falls back to the lexical reranker.
+    """
+    provider = cfg["provider"]
+    if provider == "none":
+        return None
+    if provider == "lexical":
+        return LexicalReranker(cfg["candidates"])
+    if provider == "cross-encoder":
+        try:
+            return CrossEncoderReranker(cfg["model"], cfg["candidates"])
+        except ImportError as e:
+            log.warning(f"Cross-encoder reranker unavailable ({e}); using the lexical reranker")
+            return LexicalReranker(cfg["candidates"])
+    raise ValueError(f"Unknown reranker {provider!r}; expected one of {RERANKERS}")
@@ -0,0 +1,97 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JSONFieldStreamParser:
+    """Incrementally extracts top-level string fields from a streamed JSON object.
+
+    Feed raw model output as it arrives; each `feed` returns the
+    `(field, text)` deltas decoded so far for the watched fields, e.g.
+    ``("answer", "The index is")``. Anything around the object (markdown
+    fences, preamble) is skipped, and escapes split across chunks are
+    handled. Fields are only recognised at nesting depth 1.
+    """
+
+    def __init__(self, fields: Sequence[str] = ("rationale", "answer")):
+        self.fields = set(fields)
+        self.values: Dict[str, str] = {name: "" for name in fields}
+        self._depth = 0
+        self._in_string = False
+        self._is_key = False  # whether the open string is an object key
+        self._escape = ""  # pending backslash escape, e.g. "\\" or "\\u00"
+        self._surrogate: Optional[int] = None  # high half of a \uXXXX surrogate pair
+        self._buffer: List[str] = []  # text of the open string
+        self._key: Optional[str] = None  # last key seen at depth 1
+        self._expect_key = False
+        self._field: Optional[str] = None  # watched field whose value is being read
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        deltas: List[Tuple[str, str]] = []
+        for ch in chunk:
+            if self._in_string:
+                decoded = self._read_string_char(ch)
+                if decoded and self._field:
+                    if deltas and deltas[-1][0] == self._field:
+                        deltas[-1] = (self._field, deltas[-1][1] + decoded)
+                    else:
+                        deltas.append((self._field, decoded))
+                continue
+            if ch == '"':
+                self._in_string, self._buffer = True, []
+                self._is_key = self._depth == 1 and self._expect_key
+                if self._depth == 1 and not self._is_key and self._key in self.fields:
+                    self._field = self._key
+            elif ch in "{[":
+                self._depth += 1
+                self._expect_key = ch == "{" and self._depth == 1
+            elif ch in "}]":
+                self._depth = max(0, self._depth - 1)
+            elif ch == "," and self._depth == 1:
+                self._expect_key = True
+            elif ch == ":" and self._depth == 1:
+                self._expect_key = False
+        for field, text in deltas:
+            self.values[field] += text
+        return deltas
+
+    # Consume one character inside a string; returns the decoded text it contributes
+    def _read_string_char(self, ch: str) -> str:
+        if self._escape:
+            self._escape += ch
+            if self._escape[1] == "u":
+                if len(self._escape) < 6:
+                    return ""
+                try:
+                    code = int(self._escape[2:], 16)
+                except ValueError:
+                    code, decoded = None, self._escape
+                if code is not None:
+                    if 0xD800 <= code < 0xDC00:
+                        # High surrogate: hold it until its pair arrives
+                        self._escape, self._surrogate = "", code
+                        return ""
+                    if 0xDC00 <= code < 0xE000 and self._surrogate:
+                        code = 0x10000 + ((self._surrogate - 0xD800) << 10) + (code - 0xDC00)
+                    decoded = chr(code)
+                self._surrogate = None
+            else:
+                decoded = _ESCAPES.get(ch, ch)
+            self._escape = ""
+            return self._append(decoded)
+        if ch == "\\":
+            self._escape = ch
+            return ""
+        if ch == '"':
+            self._in_string = False
+            if self._is_key:
+                self._key = "".join(self._buffer)
+            self._field = None
+            return ""
+        return self._append(ch)
+
+    def _append(self, text: str) -> str:
+        if self._is_key:
+            self._buffer.append(text)
+            return ""
+        return text
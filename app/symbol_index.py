@@ -0,0 +1,396 @@
+"""Symbol graph of a repository: definitions, imports and call/reference edges.
+
+Facts are extracted from each source file while it is read for indexing
+(Python with `ast`, other languages with per-language patterns) and saved
+as ``symbols.json`` inside the vector store directory, together with the
+line range of every code chunk. "Who calls X" and "where is Y defined"
+then become dictionary lookups that return chunk indexes, and retrieved
+chunks can be expanded with the definitions of the symbols they call.
+"""
+import os
+import re
+import ast
+import json
+import time
+import builtins
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from adalflow.core.types import Document
+from adalflow.utils import printc
+
+from app.dedup import chunk_file_paths, chunk_line_range
+from app.lexical_index import STOPWORDS, query_identifiers
+from app.telemetry import span, record_span
+from app.vector_store import VectorStore
+
+SYMBOLS_FILE = "symbols.json"
+SYMBOLS_FORMAT_VERSION = 2
+
+# Per file: {"defs": [[name, qualname, kind, line]], "imports": [module], "refs": [[name, line, kind]]}
+FileSymbols = Dict[str, list]
+
+# Reference kinds, strongest first; a name used several ways on one line keeps the strongest
+REF_KINDS = ("call", "import", "ref")
+
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_CALL_RE = re.compile(r"\b([A-Za-z_$][\w$]*)\s*\(")
+_COMMENT_PREFIXES = ("#", "//", "/*", "*")
+_KEYWORDS = frozenset(
+    "if else elif for while do switch case return new delete throw throws try catch finally with match "
+    "loop fn func function def class struct enum union interface trait impl type typeof sizeof instanceof "
+    "await async yield import from export package use mod pub static const let var void public private "
+    "protected super this self cls print assert defer go select range map chan where as in is not and or "
+    "lambda template typename operator".split()
+)
+_PYTHON_IGNORED = frozenset(dir(builtins)) | {"self", "cls"}
+
+# Structural questions: who calls/uses a symbol, or where it is defined
+_CALLERS_RE = re.compile(
+    r"\b(?:who|what|which)\b.*\b(?:calls?|uses?|invokes?|references?|imports?)\b"
+    r"|\bcall(?:ers?|ed|ing|s)?\b|\busages?\b|\bused\b|\breferenc\w*|\binvok\w*",
+    re.IGNORECASE,
+)
+_DEFINITION_RE = re.compile(r"\bdefin\w*|\bdeclar\w*|\bwhere\s+is\b|\bwhere's\b|\blocated\b", re.IGNORECASE)
+
+_JS_DEFS = [
+    (re.compile(r"\bclass\s+([A-Za-z_$][\w$]*)"), "class"),
+    (re.compile(r"\bfunction\s*\*?\s*([A-Za-z_$][\w$]*)"), "function"),
+    (re.compile(r"\b(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*=>|[A-Za-z_$][\w$]*\s*=>)"), "function"),
+    (re.compile(r"^\s+(?:(?:public|private|protected|static|async|get|set|readonly)\s+)*([A-Za-z_$][\w$]*)\s*\([^)]*\)\s*(?::\s*[^{;]+)?\{"), "method"),
+    (re.compile(r"\b(?:interface|type|enum)\s+([A-Za-z_$][\w$]*)"), "type"),
+]
+_DEF_PATTERNS = {
+    ".js": _JS_DEFS,
+    ".ts": _JS_DEFS,
+    ".java": [
+        (re.compile(r"\b(?:class|interface|enum|record)\s+([A-Za-z_]\w*)"), "class"),
+        (re.compile(r"^\s*(?:(?:public|private|protected|static|final|abstract|synchronized|native|default)\s+)*"
+                    r"[\w<>\[\],.?]+\s+([A-Za-z_]\w*)\s*\([^;]*$"), "method"),
+    ],
+    ".go": [
+        (re.compile(r"^func\s+(?:\([^)]*\)\s*)?([A-Za-z_]\w*)"), "function"),
+        (re.compile(r"^type\s+([A-Za-z_]\w*)"), "type"),
+    ],
+    ".rs": [
+        (re.compile(r"\bfn\s+([A-Za-z_]\w*)"), "function"),
+        (re.compile(r"\b(?:struct|enum|trait|union)\s+([A-Za-z_]\w*)"), "class"),
+        (re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:type|mod)\s+([A-Za-z_]\w*)"), "type"),
+    ],
+    ".c": [
+        (re.compile(r"^\s*(?:typedef\s+)?(?:struct|union|enum)\s+([A-Za-z_]\w*)\s*\{?\s*$"), "class"),
+        (re.compile(r"^[A-Za-z_][\w\s*&]*?\b([A-Za-z_]\w*)\s*\([^;]*$"), "function"),
+    ],
+    ".cpp": [
+        (re.compile(r"^\s*(?:class|struct|union|enum(?:\s+class)?)\s+([A-Za-z_]\w*)\s*(?:[:{]|$)"), "class"),
+        (re.compile(r"^[A-Za-z_][\w\s*&:<>,]*?\b((?:[A-Za-z_]\w*::)*~?[A-Za-z_]\w*)\s*\([^;]*$"), "function"),
+    ],
+}
+_IMPORT_PATTERNS = {
+    ".js": [re.compile(r"\bfrom\s+['\"]([^'\"]+)['\"]"), re.compile(r"\brequire\(\s*['\"]([^'\"]+)['\"]\s*\)"),
+            re.compile(r"^\s*import\s+['\"]([^'\"]+)['\"]")],
+    ".java": [re.compile(r"^\s*import\s+(?:static\s+)?([\w.*]+)")],
+    ".go": [re.compile(r"^\s*import\s+(?:[\w.]+\s+)?\"([^\"]+)\"")],
+    ".rs": [re.compile(r"^\s*(?:pub\s+)?use\s+([\w:]+)")],
+    ".c": [re.compile(r"^\s*#\s*include\s*[<\"]([^>\"]+)[>\"]")],
+}
+_IMPORT_PATTERNS[".ts"] = _IMPORT_PATTERNS[".js"]
+_IMPORT_PATTERNS[".cpp"] = _IMPORT_PATTERNS[".c"]
+# Lines of a Go `import ( ... )` block
+_GO_IMPORT_LINE_RE = re.compile(r"^\s*(?:[\w.]+\s+)?\"([^\"]+)\"\s*$")
+
+
+# Keep one reference per (name, line), of the strongest kind
+def _dedup_refs(refs: Iterable[Tuple[str, int, str]]) -> List[list]:
+    best: Dict[Tuple[str, int], str] = {}
+    for name, line, kind in refs:
+        key = (name, line)
+        if key not in best or REF_KINDS.index(kind) < REF_KINDS.index(best[key]):
+            best[key] = kind
+    return [[name, line, kind] for (name, line), kind in sorted(best.items(), key=lambda item: item[0][1])]
+
+
+# Name a call targets: `f(...)` -> f, `obj.method(...)` -> method
+def _call_name(func: ast.expr) -> Optional[str]:
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    return None
+
+
+def _python_symbols(text: str) -> Optional[FileSymbols]:
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return None
+    defs, imports, refs = [], [], []
+
+    def visit(node: ast.AST, scope: List[str]):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                kind = "class" if isinstance(child, ast.ClassDef) else "function"
+                defs.append([child.name, ".".join(scope + [child.name]), kind, child.lineno])
+                visit(child, scope + [child.name])
+                continue
+            if isinstance(child, ast.Import):
+                imports.extend(alias.name for alias in child.names)
+            elif isinstance(child, ast.ImportFrom):
+                imports.append("." * child.level + (child.module or ""))
+                refs.extend((alias.name, child.lineno, "import") for alias in child.names)
+            elif isinstance(child, ast.Call):
+                name = _call_name(child.func)
+                if name:
+                    refs.append((name, child.lineno, "call"))
+            elif isinstance(child, ast.Name) and isinstance(child.ctx, ast.Load):
+                refs.append((child.id, child.lineno, "ref"))
+            elif isinstance(child, ast.Attribute) and isinstance(child.ctx, ast.Load):
+                refs.append((child.attr, child.lineno, "ref"))
+            visit(child, scope)
+
+    visit(tree, [])
+    refs = [ref for ref in refs if ref[0] not in _PYTHON_IGNORED]
+    return {"defs": defs, "imports": imports, "refs": _dedup_refs(refs)}
+
+
+# Line-based extraction for bracket languages; misses some forms but never fails
+def _pattern_symbols(text: str, ext: str) -> FileSymbols:
+    def_patterns, import_patterns = _DEF_PATTERNS[ext], _IMPORT_PATTERNS[ext]
+    defs, imports, refs = [], [], []
+    in_go_imports = False
+    for lineno, line in enumerate(text.splitlines(), start=1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith(_COMMENT_PREFIXES):
+            continue
+        if ext == ".go" and (in_go_imports or stripped.startswith("import (")):
+            in_go_imports = not stripped.startswith(")")
+            match = _GO_IMPORT_LINE_RE.match(line)
+            if match:
+                imports.append(match.group(1))
+            continue
+        defined = set()
+        for pattern, kind in def_patterns:
+            for qualname in pattern.findall(line):
+                name = qualname.split("::")[-1].lstrip("~")
+                if name not in _KEYWORDS and name not in defined:
+                    defined.add(name)
+                    defs.append([name, qualname, kind, lineno])
+        for pattern in import_patterns:
+            imports.extend(pattern.findall(line))
+        refs.extend(
+            (name, lineno, "call") for name in _CALL_RE.findall(line) if name not in _KEYWORDS and name not in defined
+        )
+    return {"defs": defs, "imports": imports, "refs": _dedup_refs(refs)}
+
+
+def extract_symbols(text: str, ext: str) -> Optional[FileSymbols]:
+    """Definitions, imports and references of one source file; None for unsupported or unparseable files."""
+    if ext == ".py":
+        return _python_symbols(text)
+    if ext in _DEF_PATTERNS:
+        return _pattern_symbols(text, ext)
+    return None
+
+
+def collect_symbols(documents: Iterable[Document], files: Dict[str, FileSymbols]) -> Iterator[Document]:
+    """Pass `documents` through unchanged, recording the symbols of each source file in `files`."""
+    seconds = 0.0
+    for doc in documents:
+        started = time.perf_counter()
+        path = (doc.meta_data or {}).get("file_path", "")
+        symbols = extract_symbols(doc.text, os.path.splitext(path)[1])
+        if symbols is not None:
+            files[path] = symbols
+        seconds += time.perf_counter() - started
+        yield doc
+    record_span("symbols", seconds, items=len(files))
+
+
+@dataclass
+class SymbolHits:
+    """Chunks found by a symbol lookup; `structural` when the query asked where something is defined or used."""
+    chunks: List[int] = field(default_factory=list)
+    structural: bool = False
+
+
+class SymbolIndex:
+    """Definitions and references by symbol name, resolved to the chunks that contain them.
+
+    `files` holds the extracted facts per file (kept so incremental updates
+    only re-extract changed files) and `chunks` the line range of every code
+    chunk per file, as ``[start_line, end_line, chunk index]`` sorted by start.
+    """
+
+    def __init__(self, files: Dict[str, FileSymbols], chunks: Dict[str, List[List[int]]], count: int):
+        self.files = files
+        self.chunks = chunks
+        self.count = count
+        # Lowercased name or qualified name -> [(path, line, kind, qualname)]
+        self.definitions: Dict[str, List[Tuple[str, int, str, str]]] = {}
+        # Lowercased name -> [(path, line, kind)]
+        self.references: Dict[str, List[Tuple[str, int, str]]] = {}
+        # Exact-case defined names, to recognize plain words in questions
+        self.names = set()
+        for path, symbols in files.items():
+            for name, qualname, kind, line in symbols["defs"]:
+                self.names.add(name)
+                for key in {name.lower(), qualname.lower()}:
+                    self.definitions.setdefault(key, []).append((path, line, kind, qualname))
+            for name, line, kind in symbols["refs"]:
+                self.references.setdefault(name.lower(), []).append((path, line, kind))
+        self._starts = {path: [start for start, _, _ in spans] for path, spans in chunks.items()}
+        self._chunk_spans = {i: (path, start, end) for path, spans in chunks.items() for start, end, i in spans}
+
+    @classmethod
+    def build(cls, files: Dict[str, FileSymbols], store: VectorStore) -> "SymbolIndex":
+        """Resolve `files` against the chunk line ranges recorded in `store`, per file for deduplicated chunks."""
+        chunks: Dict[str, List[List[int]]] = {}
+        for i in range(len(store)):
+            meta_data = store.meta(i)["meta_data"]
+            for path in chunk_file_paths(meta_data):
+                line_range = chunk_line_range(meta_data, path) if path in files else None
+                if line_range is not None:
+                    chunks.setdefault(path, []).append([*line_range, i])
+        for spans in chunks.values():
+            spans.sort()
+        return cls(files, chunks, len(store))
+
+    def save(self, path: str):
+        with open(os.path.join(path, SYMBOLS_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": SYMBOLS_FORMAT_VERSION, "count": self.count, "files": self.files, "chunks": self.chunks},
+                f,
+                separators=(",", ":"),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> Optional["SymbolIndex"]:
+        try:
+            with open(os.path.join(path, SYMBOLS_FILE), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != SYMBOLS_FORMAT_VERSION:
+            return None
+        return cls(data["files"], data["chunks"], data["count"])
+
+    @classmethod
+    def load_or_build(cls, store: VectorStore, read_files: Callable[[], Iterable[Document]]) -> "SymbolIndex":
+        """The index saved with `store`, or a new one extracted from `read_files()` and saved there."""
+        with span("index", kind="symbols", items=len(store)) as index_span:
+            index = cls.load(store.path)
+            if index is not None and index.count == len(store):
+                index_span.set(loaded=True)
+                return index
+            files: Dict[str, FileSymbols] = {}
+            for _ in collect_symbols(read_files(), files):
+                pass
+            return cls.save_new(files, store)
+
+    @classmethod
+    def save_new(cls, files: Dict[str, FileSymbols], store: VectorStore) -> "SymbolIndex":
+        """Build the index for a freshly written `store` and save it there."""
+        started = time.perf_counter()
+        index = cls.build(files, store)
+        index.save(store.path)
+        printc(f"Built symbol index: {len(index.definitions)} names in {len(files)} files "
+               f"in {time.perf_counter() - started:.2f}s", color="blue")
+        return index
+
+    # Chunk holding a line of a file, or None when that part of the file wasn't indexed
+    def chunk_at(self, path: str, line: int) -> Optional[int]:
+        starts = self._starts.get(path)
+        if not starts:
+            return None
+        pos = bisect_right(starts, line) - 1
+        if pos < 0:
+            return None
+        start, end, chunk = self.chunks[path][pos]
+        return chunk if line <= end else None
+
+    def _unique_chunks(self, locations: Iterable[Tuple[str, int]]) -> List[int]:
+        found: Dict[int, None] = {}
+        for path, line in locations:
+            chunk = self.chunk_at(path, line)
+            if chunk is not None:
+                found.setdefault(chunk)
+        return list(found)
+
+    def definition_chunks(self, name: str) -> List[int]:
+        return self._unique_chunks((path, line) for path, line, _, _ in self.definitions.get(name.lower(), []))
+
+    def reference_chunks(self, name: str, kinds: Tuple[str, ...] = REF_KINDS) -> List[int]:
+        """Chunks that use `name`, calls first; a definition's own chunk counts only if it also uses the name."""
+        refs = sorted(
+            (ref for ref in self.references.get(name.lower(), []) if ref[2] in kinds),
+            key=lambda ref: REF_KINDS.index(ref[2]),
+        )
+        return self._unique_chunks((path, line) for path, line, _ in refs)
+
+    # Defined symbols a question names: code-like identifiers, or plain words matching a definition exactly
+    def mentioned(self, query: str) -> List[str]:
+        identifiers = set(query_identifiers(query))
+        found: Dict[str, None] = {}
+        for word in _WORD_RE.findall(query.replace("`", " ")):
+            key = word.lower()
+            if key in self.definitions and (key in identifiers or (word in self.names and key not in STOPWORDS)):
+                found.setdefault(key)
+        return list(found)
+
+    def lookup(self, query: str, limit: int) -> SymbolHits:
+        """Up to `limit` chunks answering a structural question about the symbols the query names.
+
+        Callers (for "who calls X", "where is X used") or definitions (for
+        "where is X defined") come first; other queries naming a defined
+        identifier get its definition.
+        """
+        names = self.mentioned(query)
+        if not names:
+            return SymbolHits()
+        callers = bool(_CALLERS_RE.search(query))
+        structural = callers or bool(_DEFINITION_RE.search(query))
+        found: Dict[int, None] = {}
+        for name in names:
+            for chunk in (self.reference_chunks(name) if callers else []) + self.definition_chunks(name):
+                found.setdefault(chunk)
+        return SymbolHits(chunks=list(found)[:limit], structural=structural and bool(found))
+
+    def callees(self, chunk: int) -> List[str]:
+        """Names called from a chunk, in order of first call."""
+        if chunk not in self._chunk_spans:
+            return []
+        path, start, end = self._chunk_spans[chunk]
+        names: Dict[str, None] = {}
+        for name, line, kind in self.files[path]["refs"]:
+            if kind == "call" and start <= line <= end:
+                names.setdefault(name.lower())
+        return list(names)
+
+    def expand(self, chunks: List[int], limit: int, max_definitions: int = 3) -> List[int]:
+        """Up to `limit` chunks defining what `chunks` call, one hop along the call graph.
+
+        Names defined in more than `max_definitions` places (``get``, ``run``)
+        are too ambiguous to follow.
+        """
+        seen = set(chunks)
+        added: List[int] = []
+        for chunk in chunks:
+            for name in self.callees(chunk):
+                definitions = self.definitions.get(name, [])
+                if not definitions or len(definitions) > max_definitions:
+                    continue
+                for target in self.definition_chunks(name):
+                    if target not in seen:
+                        seen.add(target)
+                        added.append(target)
+                        if len(added) >= limit:
+                            return added
+        return added
+
+    def update(self, files: Dict[str, FileSymbols], stale: Iterable[str]) -> Dict[str, FileSymbols]:
+        """Facts for the next version of the repo: these minus `stale` paths, plus the re-read `files`."""
+        stale = set(stale)
+        merged = {path: symbols for path, symbols in self.files.items() if path not in stale}
+        merged.update(files)
+        return merged
@@ -0,0 +1,251 @@
+"""Per-stage tracing spans and Prometheus metrics for indexing and queries.
+
+A span times one pipeline stage (clone, scan, split, embed, index,
+query_embed, search, prompt_build, generate, parse) and carries attributes
+such as token counts and cache hits. Spans opened inside another span become
+its children, so a query is one tree. Every finished span updates the
+metrics in `REGISTRY`, which `render_metrics` exposes in the Prometheus text
+format. Root spans are logged as one JSON line on the ``githubchat.trace``
+logger at DEBUG level.
+
+Metrics are kept in process with no client library; counters and
+histograms only ever grow, as Prometheus expects.
+"""
+import json
+import time
+import logging
+import threading
+import contextvars
+from uuid import uuid4
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+trace_logger = logging.getLogger("githubchat.trace")
+
+# Upper bounds in seconds, from cached lookups to full-repo indexing
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800)
+
+
+def _label_str(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + ([extra] if extra else [])
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[n]) for n in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_str(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.buckets = tuple(buckets)
+        # Per label set: count per bucket (non-cumulative, last one is +Inf), sum, count
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            counts, totals = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0, 0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, (total, count)) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(list(self.buckets) + ["+Inf"], counts):
+                    cumulative += n
+                    le = f'le="{bound:g}"' if bound != "+Inf" else 'le="+Inf"'
+                    lines.append(f"{self.name}_bucket{_label_str(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {total:g}")
+                lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {count}")
+        return lines
+
+
+class Gauge:
+    """A value read when metrics are scraped, e.g. the number of loaded indexes."""
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name, self.help, self.read = name, help, read
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.read():g}"]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]) -> Gauge:
+        """Register (or replace) a gauge read at scrape time."""
+        gauge = Gauge(name, help, read)
+        with self._lock:
+            self._metrics[name] = gauge
+        return gauge
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:  # a failing gauge must not break the scrape
+                trace_logger.warning("Metric %s failed to render: %s", metric.name, e)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "githubchat_stage_duration_seconds", "Time spent in each pipeline stage.", ("stage",)
+)
+STAGE_ERRORS = REGISTRY.counter("githubchat_stage_errors_total", "Pipeline stages that raised.", ("stage",))
+STAGE_ITEMS = REGISTRY.counter(
+    "githubchat_stage_items_total", "Files, chunks or texts processed by each pipeline stage.", ("stage",)
+)
+TOKENS = REGISTRY.counter(
+    "githubchat_tokens_total", "Tokens processed, by stage and kind (prompt, completion, embedding).", ("stage", "kind")
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "githubchat_cache_lookups_total", "Cache lookups by cache and result (hit or miss).", ("cache", "result")
+)
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    started: float = field(default_factory=time.perf_counter)
+    seconds: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    children: List["Span"] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def add(self, **amounts: float):
+        """Add to numeric attributes, e.g. ``span.add(cache_hits=3)``."""
+        for name, amount in amounts.items():
+            self.attributes[name] = self.attributes.get(name, 0) + amount
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {"name": self.name, "ms": round(self.seconds * 1000, 2), **self.attributes}
+        if self.error:
+            out["error"] = self.error
+        if self.children:
+            out["children"] = [child.to_dict() for child in self.children]
+        return out
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("githubchat_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+# Feed a finished span into the metrics; attach it to its parent, or log it when it is a root
+def _finish(span: Span, parent: Optional[Span]):
+    STAGE_SECONDS.observe(span.seconds, stage=span.name)
+    if span.error:
+        STAGE_ERRORS.inc(stage=span.name)
+    if "items" in span.attributes:
+        STAGE_ITEMS.inc(span.attributes["items"], stage=span.name)
+    for name, value in span.attributes.items():
+        if name.endswith("_tokens") and isinstance(value, (int, float)):
+            TOKENS.inc(value, stage=span.name, kind=name[:-len("_tokens")])
+    if parent is not None:
+        parent.children.append(span)
+    elif trace_logger.isEnabledFor(logging.DEBUG):
+        trace_logger.debug(json.dumps({"trace_id": span.trace_id, **span.to_dict()}, default=str))
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Time a pipeline stage; nested spans become children of the enclosing one."""
+    parent = _current_span.get()
+    current = Span(name=name, trace_id=parent.trace_id if parent else uuid4().hex, attributes=attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.seconds = time.perf_counter() - current.started
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # An async generator resumed in another context; restore the parent by hand
+            _current_span.set(parent)
+        _finish(current, parent)
+
+
+def record_span(name: str, seconds: float, **attributes: Any):
+    """Record a stage timed elsewhere, e.g. file reads interleaved with splitting."""
+    parent = _current_span.get()
+    done = Span(name=name, trace_id=parent.trace_id if parent else uuid4().hex, seconds=seconds, attributes=attributes)
+    _finish(done, parent)
+
+
+def record_cache(cache: str, hits: int = 0, misses: int = 0):
+    """Count cache lookups, and add them to the current span as ``<cache>_cache_hits``/``_misses``."""
+    if hits:
+        CACHE_LOOKUPS.inc(hits, cache=cache, result="hit")
+    if misses:
+        CACHE_LOOKUPS.inc(misses, cache=cache, result="miss")
+    current = _current_span.get()
+    if current is not None:
+        current.add(**{f"{cache}_cache_hits": hits, f"{cache}_cache_misses": misses})
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+def configure_logging(level: str = "INFO"):
+    """Log level for the app's loggers; DEBUG adds raw model responses and per-request traces."""
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logging.getLogger("githubchat").setLevel(level.upper())
+    logging.getLogger("app").setLevel(level.upper())
+    logging.getLogger("backend").setLevel(level.upper())
@@ -0,0 +1,226 @@
+import os
+import json
+import shutil
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from adalflow.core.types import Document
+
+from app.config import config
+
+STORE_FORMAT_VERSION = 1
+VECTOR_DTYPES = ("float32", "float16", "int8")
+
+
+# Concatenate UTF-8 encoded records and return (blob, offsets) with len(records) + 1 offsets
+def _pack(records: List[bytes]):
+    offsets = np.zeros(len(records) + 1, dtype=np.int64)
+    np.cumsum([len(r) for r in records], out=offsets[1:])
+    return b"".join(records), offsets
+
+
+# Unit-length rows scaled to int8, with the per-row factor that restores them
+def _quantize_int8(vectors: np.ndarray):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.where(norms == 0, 1, norms)
+    scales = np.abs(unit).max(axis=1, keepdims=True) / 127
+    scales[scales == 0] = 1
+    return np.rint(unit / scales).astype(np.int8), scales[:, 0].astype(np.float32)
+
+
+# Memory-map a file of raw bytes; empty files cannot be mapped
+def _map_bytes(path: str) -> np.ndarray:
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r")
+
+
+class StoredDocuments(Sequence):
+    """Read-only list view over a `VectorStore`; Documents are built on access."""
+
+    def __init__(self, store: "VectorStore"):
+        self.store = store
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.store.document(j) for j in range(*i.indices(len(self)))]
+        return self.store.document(i)
+
+    def __iter__(self) -> Iterator[Document]:
+        for i in range(len(self)):
+            yield self.store.document(i)
+
+
+class VectorStore:
+    """Columnar on-disk chunk store opened with memory maps.
+
+    A store is a directory holding:
+
+    - ``vectors.bin``: contiguous ``count x dim`` matrix (float32, float16 or int8)
+    - ``scales.npy``: for int8, the per-row factor that turns a row back into
+      its unit-length float vector (int8 stores keep directions only)
+    - ``texts.bin`` / ``text_offsets.npy``: chunk texts, UTF-8, back to back
+    - ``meta.bin`` / ``meta_offsets.npy``: per-chunk JSON (ids, token count, meta_data)
+    - ``manifest.json``: format version, count, dim and dtype
+
+    Opening a store only maps these files, so it is near-instant and every
+    process that opens the same store shares one copy in the OS page cache.
+    """
+
+    def __init__(self, path: str, manifest: Dict[str, Any]):
+        self.path = path
+        self.manifest = manifest
+        count, dim = manifest["count"], manifest["dim"]
+        vectors_path = os.path.join(path, "vectors.bin")
+        if count and dim:
+            self.vectors = np.memmap(vectors_path, dtype=manifest["dtype"], mode="r", shape=(count, dim))
+        else:
+            self.vectors = np.zeros((count, dim), dtype=manifest["dtype"])
+        self.scales = None
+        if manifest["dtype"] == "int8":
+            self.scales = np.load(os.path.join(path, "scales.npy"), mmap_mode="r") if count else np.ones(0, np.float32)
+        self._texts = _map_bytes(os.path.join(path, "texts.bin"))
+        self._text_offsets = np.load(os.path.join(path, "text_offsets.npy"), mmap_mode="r")
+        self._meta = _map_bytes(os.path.join(path, "meta.bin"))
+        self._meta_offsets = np.load(os.path.join(path, "meta_offsets.npy"), mmap_mode="r")
+
+    def __len__(self) -> int:
+        return self.manifest["count"]
+
+    @property
+    def dim(self) -> int:
+        return self.manifest["dim"]
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return os.path.isfile(os.path.join(path, "manifest.json"))
+
+    @classmethod
+    def open(cls, path: str) -> "VectorStore":
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector store version {manifest.get('version')} at {path}")
+        return cls(path, manifest)
+
+    @classmethod
+    def write(
+        cls,
+        path: str,
+        documents: Sequence[Document],
+        dtype: str = "float32",
+        vectors: Optional[np.ndarray] = None,
+    ) -> "VectorStore":
+        """Write documents to a new store at `path`, replacing any existing one.
+
+        The store is built in a sibling directory and swapped in with renames,
+        so readers never observe a half-written store. Pass `vectors` to reuse
+        an already assembled float matrix instead of reading `doc.vector`.
+        """
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"dtype must be one of {VECTOR_DTYPES}, got {dtype}")
+        if vectors is None:
+            vectors = np.asarray([doc.vector for doc in documents], dtype=np.float32)
+        vectors = np.asarray(vectors)
+        if not len(documents) and vectors.ndim != 2:
+            # Nothing to infer the width from: an empty store takes the configured embedder's
+            vectors = vectors.reshape(0, config["embedder"]["dimensions"])
+        elif vectors.ndim != 2:
+            vectors = vectors.reshape(len(documents), -1)
+        scales = None
+        if dtype == "int8":
+            vectors, scales = _quantize_int8(vectors)
+        vectors = np.ascontiguousarray(vectors, dtype=dtype)
+
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        vectors.tofile(os.path.join(tmp_path, "vectors.bin"))
+        if scales is not None:
+            np.save(os.path.join(tmp_path, "scales.npy"), scales)
+
+        texts, text_offsets = _pack([doc.text.encode("utf-8") for doc in documents])
+        metas, meta_offsets = _pack([
+            json.dumps(
+                {
+                    "id": doc.id,
+                    "parent_doc_id": doc.parent_doc_id,
+                    "order": doc.order,
+                    "tokens": doc.estimated_num_tokens,
+                    "meta_data": doc.meta_data,
+                },
+                separators=(",", ":"),
+                default=str,
+            ).encode("utf-8")
+            for doc in documents
+        ])
+        with open(os.path.join(tmp_path, "texts.bin"), "wb") as f:
+            f.write(texts)
+        with open(os.path.join(tmp_path, "meta.bin"), "wb") as f:
+            f.write(metas)
+        np.save(os.path.join(tmp_path, "text_offsets.npy"), text_offsets)
+        np.save(os.path.join(tmp_path, "meta_offsets.npy"), meta_offsets)
+
+        manifest = {
+            "version": STORE_FORMAT_VERSION,
+            "count": len(documents),
+            "dim": int(vectors.shape[1]),
+            "dtype": dtype,
+        }
+        with open(os.path.join(tmp_path, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        # Open maps keep reading the old files after they are unlinked
+        old_path = f"{path}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return cls.open(path)
+
+    def text(self, i: int) -> str:
+        start, end = self._text_offsets[i], self._text_offsets[i + 1]
+        return self._texts[start:end].tobytes().decode("utf-8")
+
+    def meta(self, i: int) -> Dict[str, Any]:
+        start, end = self._meta_offsets[i], self._meta_offsets[i + 1]
+        return json.loads(self._meta[start:end].tobytes())
+
+    def document(self, i: int) -> Document:
+        """Chunk `i` without its vector, which stays in the matrix; see `vector_rows`."""
+        if i < 0:
+            i += len(self)
+        record = self.meta(i)
+        return Document(
+            id=record["id"],
+            text=self.text(i),
+            meta_data=record["meta_data"],
+            parent_doc_id=record["parent_doc_id"],
+            order=record["order"],
+            # Passing the stored count skips re-tokenizing the text
+            estimated_num_tokens=record.get("tokens") or 0,
+        )
+
+    def documents(self) -> StoredDocuments:
+        return StoredDocuments(self)
+
+    def file_paths(self) -> List[str]:
+        return [self.meta(i)["meta_data"].get("file_path") for i in range(len(self))]
+
+    def vector_matrix(self) -> np.ndarray:
+        """Vectors as float32; a zero-copy view when the store is float32."""
+        if self.vectors.dtype == np.float32:
+            return self.vectors
+        return self.vector_rows(slice(None))
+
+    def vector_rows(self, rows) -> np.ndarray:
+        """Float32 copies of the selected rows (an index array or slice), int8 rows dequantized."""
+        vectors = np.asarray(self.vectors[rows], dtype=np.float32).reshape(-1, self.dim)
+        if self.scales is not None:
+            vectors *= np.asarray(self.scales[rows], dtype=np.float32).reshape(-1, 1)
+        return vectors
@@ -0,0 +1,93 @@
+import math
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+from app.telemetry import REGISTRY
+
+ADMISSION_REJECTED = REGISTRY.counter(
+    "githubchat_admission_rejected_total", "Requests shed by admission control, by pool and reason.", ("pool", "reason")
+)
+
+
+class Overloaded(Exception):
+    """Raised when a pool can't take more work; the API answers with `status_code` and a Retry-After header."""
+
+    def __init__(self, pool: str, status_code: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.pool = pool
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class AdmissionPool:
+    """At most `max_concurrent` holders at once, and at most `max_queue` more waiting in line.
+
+    Arrivals beyond the queue are rejected immediately (429), and a queued
+    caller that doesn't get a slot within `queue_timeout` seconds gives up
+    (503), so overload turns into fast, retryable errors instead of
+    unbounded latency and memory. Retry-After is estimated from how long
+    slots have recently been held. Use from the event loop only.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._hold_seconds = 1.0  # moving average of how long a slot is held
+        REGISTRY.gauge(f"githubchat_{name}_pool_active", f"Slots in use in the {name} pool.", lambda: self.active)
+        REGISTRY.gauge(f"githubchat_{name}_pool_waiting", f"Callers queued for the {name} pool.", lambda: self.waiting)
+
+    # Seconds until a slot is likely free for a caller arriving now
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self._hold_seconds * (self.waiting + 1) / self.max_concurrent))
+
+    def _reject(self, status_code: int, reason: str, detail: str) -> Overloaded:
+        ADMISSION_REJECTED.inc(pool=self.name, reason=reason)
+        return Overloaded(self.name, status_code, self.retry_after(), detail)
+
+    def admit(self):
+        """Take a place in line, or raise `Overloaded` (429) when the queue is full; follow with `enter`."""
+        if self.active + self.waiting >= self.max_concurrent + self.max_queue:
+            raise self._reject(429, "queue_full", f"Too many {self.name} requests in progress; retry later")
+        self.waiting += 1
+
+    async def enter(self):
+        """Wait for a slot after `admit`; raises `Overloaded` (503) after `queue_timeout`."""
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject(
+                503, "timeout", f"No {self.name} capacity within {self.queue_timeout:g}s; retry later"
+            ) from None
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return time.monotonic()
+
+    def release(self, entered: float):
+        self.active -= 1
+        self._slots.release()
+        self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * (time.monotonic() - entered)
+
+    @asynccontextmanager
+    async def slot(self):
+        self.admit()
+        entered = await self.enter()
+        try:
+            yield
+        finally:
+            self.release(entered)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+        }
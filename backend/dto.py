@@ -1,9 +1,10 @@
-from typing import List
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 class QueryRequest(BaseModel):
     repo_url: str
     query: str
+    session_id: str = "default"  # conversation memory is kept per session
 
 class InitRequest(BaseModel):
     repo_url: str
@@ -22,4 +23,5 @@ class Document(BaseModel):
 class QueryResponse(BaseModel):
     rationale: str
     answer: str
-    contexts: List[Document]
\ No newline at end of file
+    contexts: List[Document]
+    usage: Optional[Dict[str, int]] = None  # estimated prompt tokens per component; None for cached answers
\ No newline at end of file
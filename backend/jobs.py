@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from uuid import uuid4
+from datetime import datetime, timezone
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from backend.admission import AdmissionPool
+
+log = logging.getLogger(__name__)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    repo_url: str
+    status: str = "queued"  # queued | running | succeeded | failed
+    created_at: str = field(default_factory=_now)
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class JobManager:
+    """Runs blocking work (cloning, indexing) in worker threads and tracks its status.
+
+    With a `pool`, jobs wait in the `queued` state until it has a free slot,
+    and `submit` raises `Overloaded` when its queue is full.
+    """
+
+    def __init__(self, max_jobs: int = 1000, pool: Optional[AdmissionPool] = None):
+        self.max_jobs = max_jobs
+        self.pool = pool
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._by_key: Dict[Tuple[str, str], str] = {}  # (kind, key) -> latest job ID
+
+    def submit(self, kind: str, repo_url: str, fn: Callable[..., Optional[Dict[str, Any]]], *args, key: Optional[str] = None) -> Job:
+        """Schedule `fn(*args)` on a worker thread; must be called from the event loop.
+
+        `key` identifies the work (e.g. the repo) so `find_active` can hand out the same job.
+        """
+        if self.pool is not None:
+            self.pool.admit()
+        job = Job(id=str(uuid4()), kind=kind, repo_url=repo_url)
+        self.jobs[job.id] = job
+        self._by_key[(kind, key or repo_url)] = job.id
+        self._tasks[job.id] = asyncio.create_task(self._run(job, fn, *args))
+        self._prune()
+        return job
+
+    def find_active(self, kind: str, key: str, statuses=("queued", "running")) -> Optional[Job]:
+        """The latest `kind` job for `key` if it is still in one of `statuses`, so duplicates can join it."""
+        job = self.jobs.get(self._by_key.get((kind, key), ""))
+        return job if job is not None and job.status in statuses else None
+
+    async def _run(self, job: Job, fn: Callable, *args):
+        entered = None
+        try:
+            if self.pool is not None:
+                entered = await self.pool.enter()
+            job.status, job.started_at = "running", _now()
+            job.result = await asyncio.to_thread(fn, *args)
+            job.status = "succeeded"
+        except asyncio.CancelledError:
+            job.error, job.status = "cancelled", "failed"
+            raise
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            log.exception(f"Job {job.id} ({job.kind} {job.repo_url}) failed: {e}")
+        finally:
+            if entered is not None:
+                self.pool.release(entered)
+            job.finished_at = _now()
+            self._tasks.pop(job.id, None)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    # Forget the oldest finished jobs once over the limit
+    def _prune(self):
+        finished = [j for j in self.jobs.values() if j.status in ("succeeded", "failed")]
+        for job in finished[: max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job.id]
+        live = set(self.jobs)
+        self._by_key = {k: job_id for k, job_id in self._by_key.items() if job_id in live}
@@ -1,20 +1,32 @@
 import os
 import sys
+import json
+import time
+import asyncio
+import logging
 from datetime import datetime, timezone
 
 import uvicorn
 import adalflow as adal
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from dotenv import load_dotenv
 
 # Add project root to Python path so 'app' module can be found
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.rag import RAG
+from app.config import config
+from app.rag_registry import RAGRegistry, SessionStore, repo_key
+from app.telemetry import REGISTRY, configure_logging, render_metrics, span
 from backend.dto import QueryRequest, InitRequest, DocumentMetadata, Document, QueryResponse
+from backend.admission import AdmissionPool, Overloaded
+from backend.jobs import JobManager
 
 load_dotenv(verbose=True)
+configure_logging(config["observability"]["log_level"])
+log = logging.getLogger(__name__)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -32,16 +44,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize RAG component
-try:
-    # Set up adalflow environment
-    gemini_api_key = os.getenv("GEMINI_API_KEY")
-    groq_api_key = os.getenv("GROQ_API_KEY")
-    rag = RAG()
-    print("Successfully initialized RAG component")
-except Exception as e:
-    print(f"Error initializing RAG component: {e}")
-    raise RuntimeError(f"Failed to initialize RAG component: {e}")
+# Loaded repo indexes (one RAG per repo) and conversation memory per session
+registry = RAGRegistry(
+    max_bytes=config["registry"]["max_index_mb"] * 1024 ** 2,
+    refresh_seconds=config["sharing"]["refresh_seconds"],
+)
+sessions = SessionStore(
+    max_sessions=config["registry"]["max_sessions"],
+    ttl_seconds=config["registry"]["session_ttl_seconds"],
+)
+
+# Separate admission pools, so a burst of indexing can't starve queries and vice versa
+admission = config["admission"]
+query_pool = AdmissionPool(
+    "query", admission["query_concurrency"], admission["query_queue"], admission["query_queue_timeout"]
+)
+index_pool = AdmissionPool(
+    "index", admission["index_concurrency"], admission["index_queue"], admission["index_queue_timeout"]
+)
+
+# Background indexing jobs, so cloning and embedding never block the event loop
+jobs = JobManager(pool=index_pool)
+
+# HTTP request metrics, labelled by route template so path parameters don't explode cardinality
+HTTP_REQUESTS = REGISTRY.counter("githubchat_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+HTTP_SECONDS = REGISTRY.histogram("githubchat_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"))
+REGISTRY.gauge("githubchat_loaded_indexes", "Repository indexes held in memory.", lambda: len(registry.stats()["repos"]))
+REGISTRY.gauge("githubchat_index_bytes", "Resident size of the loaded search indexes.", lambda: registry.stats()["index_bytes"])
+REGISTRY.gauge("githubchat_sessions", "Conversation sessions held in memory.", lambda: len(sessions))
+REGISTRY.gauge("githubchat_jobs_running", "Background indexing jobs running.", lambda: sum(j.status == "running" for j in jobs.jobs.values()))
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=status)
+        # Streaming responses are timed to their headers; their body time shows in the query spans
+        HTTP_SECONDS.observe(time.perf_counter() - started, method=request.method, route=route)
+
+# Shed load with a retryable status instead of queueing without bound
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=exc.status_code, content={"detail": exc.detail}, headers={"Retry-After": str(exc.retry_after)}
+    )
 
 # Root endpoint with API information
 @app.get("/")
@@ -62,28 +114,30 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now(timezone.utc).isoformat(),
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "load": {"query": query_pool.stats(), "index": index_pool.stats()},
     }
 
 # Clear memory endpoint for new chat sessions
 @app.post("/clear-memory")
-async def clear_memory():
-    """Clear the RAG conversation memory for a new chat session"""
+async def clear_memory(session_id: str = "default"):
+    """Clear the RAG conversation memory for a chat session"""
     try:
-        rag.memory.current_conversation.dialog_turns.clear()
-        print("Memory cleared for new chat session")
+        sessions.clear(session_id)
+        log.info(f"Memory cleared for session {session_id}")
         return {"status": "success", "message": "Memory cleared"}
     except Exception as e:
-        print(f"Error clearing memory: {e}")
+        log.exception(f"Error clearing memory: {e}")
         return {"status": "error", "message": str(e)}
 
 # Set conversation context when switching between chats
 @app.post("/set-context")
-async def set_context(messages: list[dict]):
+async def set_context(messages: list[dict], session_id: str = "default"):
     """Restore conversation context when switching to a different chat"""
     try:
         # Clear existing memory first
-        rag.memory.current_conversation.dialog_turns.clear()
+        memory = sessions.get(session_id)
+        memory.current_conversation.dialog_turns.clear()
         
         # Rebuild memory from provided messages
         for i in range(0, len(messages) - 1, 2):
@@ -91,62 +145,186 @@ async def set_context(messages: list[dict]):
                 user_msg = messages[i]
                 assistant_msg = messages[i + 1]
                 if user_msg.get("role") == "user" and assistant_msg.get("role") == "assistant":
-                    rag.memory.add_dialog_turn(
+                    memory.add_dialog_turn(
                         uq=user_msg.get("content", ""),
                         ar=assistant_msg.get("content", "")
                     )
         
-        print(f"Context restored with {len(rag.memory.current_conversation.dialog_turns)} turns")
-        return {"status": "success", "turns": len(rag.memory.current_conversation.dialog_turns)}
+        log.info(f"Context restored for session {session_id} with {len(memory.current_conversation.dialog_turns)} turns")
+        return {"status": "success", "turns": len(memory.current_conversation.dialog_turns)}
     except Exception as e:
-        print(f"Error setting context: {e}")
+        log.exception(f"Error setting context: {e}")
         return {"status": "error", "message": str(e)}
 
-# Initialize repository endpoint - prepare embeddings
-@app.post("/init")
+# Prometheus scrape endpoint: pipeline stage timings, tokens, cache hits, HTTP and resource gauges
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics in the text exposition format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# Query cache hit rates
+@app.get("/cache-stats")
+async def cache_stats():
+    """Hit rates of the query-embedding cache and of each loaded repository's answer cache."""
+    return registry.cache_stats()
+
+# Registered RAG for a repo, loading its stored index off the event loop; 400 if never indexed
+async def _get_rag(repo_url: str):
+    rag = await asyncio.to_thread(registry.get, repo_url)
+    if rag is None:
+        raise HTTPException(status_code=400, detail="Repository not initialized; call /init first")
+    return rag
+
+# Index a repository; runs on a worker thread inside a background job
+def _init_repository(repo_url: str):
+    log.info(f"Initializing repository: {repo_url}")
+    with span("init", repo=repo_url):
+        rag = registry.prepare(repo_url)
+    log.info(f"Repository initialized successfully: {repo_url}")
+    return {"chunks": len(rag.transformed_docs)}
+
+# Update the loaded repository; runs on a worker thread inside a background job
+def _update_repository(repo_url: str):
+    log.info(f"Updating repository: {repo_url}")
+    with span("update", repo=repo_url):
+        update = registry.update(repo_url)
+    if update is None:
+        raise RuntimeError(f"Repository not initialized: {repo_url}")
+    return {
+        "commit": update.commit,
+        "chunks_removed": len(update.removed),
+        "chunks_added": len(update.added),
+    }
+
+# Initialize repository endpoint - prepare embeddings in the background
+@app.post("/init", status_code=202)
 async def init_repository(request: InitRequest):
-    """Initialize a GitHub repository: clone, chunk, and create embeddings."""
-    try:
-        print(f"Initializing repository: {request.repo_url}")
-        rag.prepare_retriever(request.repo_url)
-        print(f"Repository initialized successfully: {request.repo_url}")
-        return {"status": "success", "message": f"Repository {request.repo_url} initialized"}
-    except Exception as e:
-        error_msg = f"Error initializing repository: {str(e)}"
-        print(error_msg)
-        raise HTTPException(status_code=500, detail=error_msg)
+    """Start cloning, chunking and embedding a GitHub repository; poll /jobs/{job_id} for progress.
+
+    A repository already being initialized gets the existing job back rather than a second one.
+    """
+    key = repo_key(request.repo_url)
+    job = jobs.find_active("init", key)
+    if job is None:
+        job = jobs.submit("init", request.repo_url, _init_repository, request.repo_url, key=key)
+    return {"status": job.status, "job_id": job.id, "message": f"Initializing {request.repo_url}"}
+
+# Update repository endpoint - re-embed only files changed since the last index
+@app.post("/update", status_code=202)
+async def update_repository(request: InitRequest):
+    """Fetch the latest commit of an initialized repository and re-index changed files in the background."""
+    await _get_rag(request.repo_url)
+    # An update that hasn't started yet will fetch the latest commit anyway
+    key = repo_key(request.repo_url)
+    job = jobs.find_active("update", key, statuses=("queued",))
+    if job is None:
+        job = jobs.submit("update", request.repo_url, _update_repository, request.repo_url, key=key)
+    return {"status": job.status, "job_id": job.id, "message": f"Updating {request.repo_url}"}
+
+# Job status endpoint for background init/update work
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Return the status of a background indexing job."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_dict()
+
+# Convert retrieved chunks into response documents
+def _to_documents(docs) -> list[Document]:
+    return [
+        Document(
+            text=doc.text,
+            meta_data=DocumentMetadata(
+                file_path=doc.meta_data.get('file_path', ''),
+                type=doc.meta_data.get('type', ''),
+                is_code=doc.meta_data.get('is_code', False),
+                is_implementation=doc.meta_data.get('is_implementation', False),
+                title=doc.meta_data.get('title', '')
+            )
+        )
+        for doc in docs or []
+    ]
 
 # Query endpoint to query a GitHub repository with RAG
 @app.post("/query", response_model=QueryResponse)
 async def query_repository(request: QueryRequest):
-    """Query a GitHub repository with RAG"""
+    """Query a GitHub repository with RAG; 429/503 with Retry-After when the server is saturated."""
+    async with query_pool.slot():
+        return await _query(request)
+
+async def _query(request: QueryRequest) -> QueryResponse:
+    rag = await _get_rag(request.repo_url)
     try:
         # Get response and retrieved documents
-        response, retrieved_documents = rag(request.query)
+        response, retrieved_documents = await rag.acall(request.query, sessions.get(request.session_id))
         
         # Format response
         return QueryResponse(
             rationale=response.rationale if hasattr(response, 'rationale') else "",
             answer=response.answer if hasattr(response, 'answer') else response.raw_response,
-            contexts=[
-                Document(
-                    text=doc.text,
-                    meta_data=DocumentMetadata(
-                        file_path=doc.meta_data.get('file_path', ''),
-                        type=doc.meta_data.get('type', ''),
-                        is_code=doc.meta_data.get('is_code', False),
-                        is_implementation=doc.meta_data.get('is_implementation', False),
-                        title=doc.meta_data.get('title', '')
-                    )
-                )
-                for doc in retrieved_documents[0].documents
-            ] if retrieved_documents and retrieved_documents[0].documents else []
+            contexts=_to_documents(retrieved_documents[0].documents) if retrieved_documents else [],
+            usage=getattr(response, "usage", None),
         )
     except Exception as e:
         error_msg = f"Error processing query: {str(e)}"
-        print(error_msg)
+        log.exception(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
+# Format one server-sent event
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Streaming query endpoint - sources first, then answer tokens as they are generated
+@app.post("/query/stream")
+async def query_repository_stream(request: QueryRequest):
+    """Query a GitHub repository with RAG, streaming the response as server-sent events.
+
+    Events: `sources` (retrieved chunks), then `rationale` and `answer` text deltas,
+    then `done` with the complete answer and prompt token usage; `error` if the query fails midway.
+    The query slot is held until the stream ends; 429/503 with Retry-After when saturated.
+    """
+    query_pool.admit()
+    entered = await query_pool.enter()
+    released = False
+
+    # Called when the stream ends, and again by the background task in case it never started
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            query_pool.release(entered)
+
+    try:
+        rag = await _get_rag(request.repo_url)
+    except BaseException:
+        release()
+        raise
+    memory = sessions.get(request.session_id)
+
+    async def events():
+        try:
+            async for event, data in rag.astream(request.query, memory):
+                if event == "sources":
+                    yield _sse(event, [doc.model_dump() for doc in _to_documents(data)])
+                elif event == "done":
+                    yield _sse(event, {"rationale": data.rationale, "answer": data.answer, "usage": data.usage})
+                else:
+                    yield _sse(event, {"delta": data})
+        except Exception as e:
+            error_msg = f"Error processing query: {str(e)}"
+            log.exception(error_msg)
+            yield _sse("error", {"detail": error_msg})
+        finally:
+            release()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(release),
+    )
+
 # Run the app
 if __name__ == "__main__":
     uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True, log_level="info")
\ No newline at end of file
@@ -149,7 +149,7 @@ const ChatPage: React.FC = () => {
       });
       const startTime = performance.now();
 
-      const response = await fetch("http://localhost:8000/query", {
+      const response = await fetch("http://localhost:8000/query/stream", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -157,38 +157,72 @@ const ChatPage: React.FC = () => {
         body: JSON.stringify({
           repo_url: activeConversation.repoUrl,
           query: userMessage.content,
+          session_id: activeConversation.id,
         }),
       });
 
-      const endTime = performance.now();
-      console.log(`⏱️ Response received in ${(endTime - startTime).toFixed(2)}ms`);
-
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         console.error("❌ Response not OK:", response.status, response.statusText);
         throw new Error("Failed to get response");
       }
 
-      const result = await response.json();
-      console.log("✅ API Response:", result);
-      console.log("📝 Answer length:", result.answer?.length || 0);
-      console.log("📚 Contexts count:", result.contexts?.length || 0);
-
-      const assistantMessage: Message = {
-        id: crypto.randomUUID(),
-        role: "assistant",
-        content: result.answer,
-        rationale: result.rationale,
-        contexts: result.contexts,
-      };
-
-      // Add assistant message to conversation
+      // Add an empty assistant message and fill it in as events arrive
+      const assistantId = crypto.randomUUID();
+      const updateAssistant = (update: (message: Message) => Message) =>
+        setConversations((prev) =>
+          prev.map((conv) =>
+            conv.id === activeConversationId
+              ? { ...conv, messages: conv.messages.map((m) => (m.id === assistantId ? update(m) : m)) }
+              : conv
+          )
+        );
       setConversations((prev) =>
         prev.map((conv) =>
           conv.id === activeConversationId
-            ? { ...conv, messages: [...conv.messages, assistantMessage] }
+            ? {
+                ...conv,
+                messages: [...conv.messages, { id: assistantId, role: "assistant", content: "", rationale: "" }],
+              }
             : conv
         )
       );
+
+      // Server-sent events: "event: <name>\ndata: <json>\n\n"
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let firstToken = true;
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+          const block = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          const event = block.match(/^event: (.*)$/m)?.[1];
+          const data = JSON.parse(block.match(/^data: (.*)$/m)?.[1] ?? "null");
+          if (event === "sources") {
+            console.log(`📚 Sources after ${(performance.now() - startTime).toFixed(2)}ms:`, data.length);
+            updateAssistant((m) => ({ ...m, contexts: data }));
+          } else if (event === "rationale" || event === "answer") {
+            if (firstToken) {
+              console.log(`⏱️ First token after ${(performance.now() - startTime).toFixed(2)}ms`);
+              firstToken = false;
+            }
+            updateAssistant((m) =>
+              event === "answer"
+                ? { ...m, content: m.content + data.delta }
+                : { ...m, rationale: (m.rationale ?? "") + data.delta }
+            );
+          } else if (event === "done") {
+            console.log(`✅ Response complete in ${(performance.now() - startTime).toFixed(2)}ms`);
+            updateAssistant((m) => ({ ...m, content: data.answer, rationale: data.rationale }));
+          } else if (event === "error") {
+            throw new Error(data.detail);
+          }
+        }
+      }
     } catch (error) {
       console.error("Error:", error);
       const errorMessage = error instanceof Error ? error.message : "Failed to get response";
@@ -205,20 +239,10 @@ const ChatPage: React.FC = () => {
     }
   };
 
-  // New Chat: Create new conversation in the SAME repo and clear backend memory
+  // New Chat: Create new conversation in the SAME repo; its fresh id is a fresh backend session
   const handleNewChat = async () => {
     if (!activeConversation) return;
     
-    // Clear backend memory for fresh conversation
-    try {
-      await fetch("http://localhost:8000/clear-memory", {
-        method: "POST",
-      });
-      console.log("🧹 Backend memory cleared");
-    } catch (error) {
-      console.error("Failed to clear backend memory:", error);
-    }
-    
     const newConversation: Conversation = {
       id: crypto.randomUUID(),
       repoUrl: activeConversation.repoUrl,
@@ -235,7 +259,7 @@ const ChatPage: React.FC = () => {
     navigate("/");
   };
 
-  // Select a conversation from sidebar - restore its context in backend
+  // Select a conversation from sidebar - restore its session context in backend
   const handleSelectConversation = async (id: string) => {
     const conv = conversations.find((c) => c.id === id);
     if (conv && id !== activeConversationId) {
@@ -246,7 +270,7 @@ const ChatPage: React.FC = () => {
           content: m.content,
         }));
         
-        await fetch("http://localhost:8000/set-context", {
+        await fetch(`http://localhost:8000/set-context?session_id=${encodeURIComponent(conv.id)}`, {
           method: "POST",
           headers: {
             "Content-Type": "application/json",
@@ -335,7 +359,8 @@ const ChatPage: React.FC = () => {
                   contexts={message.contexts}
                 />
               ))}
-              {isLoading && (
+              {/* Placeholder until the streamed answer message appears */}
+              {isLoading && activeConversation?.messages[activeConversation.messages.length - 1]?.role === "user" && (
                 <ChatMessage role="assistant" content="" isLoading />
               )}
             </>
@@ -24,6 +24,21 @@ const LandingPage: React.FC = () => {
         throw new Error(error.detail || "Failed to initialize repository");
       }
 
+      // Indexing runs as a background job; poll until it finishes
+      const { job_id: jobId } = await response.json();
+      while (true) {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        const jobResponse = await fetch(`http://localhost:8000/jobs/${jobId}`);
+        if (!jobResponse.ok) {
+          throw new Error("Failed to check indexing status");
+        }
+        const job = await jobResponse.json();
+        if (job.status === "succeeded") break;
+        if (job.status === "failed") {
+          throw new Error(job.error || "Failed to initialize repository");
+        }
+      }
+
       toast.success("Repository loaded! Starting chat...");
       navigate("/chat", { state: { repoUrl: repoUrl.trim() } });
     } catch (error) {
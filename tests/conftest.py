@@ -0,0 +1,52 @@
+import subprocess
+
+import pytest
+
+from app.config import config
+
+
+@pytest.fixture
+def offline(monkeypatch, tmp_path):
+    """Index and answer with the hashing embedder and mock LLM, storing everything under tmp_path."""
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    embedder = config["embedder"]
+    monkeypatch.setitem(embedder, "provider", "local")
+    monkeypatch.setitem(embedder["model_kwargs"], "model", "hashing")
+    monkeypatch.setitem(embedder, "dimensions", 64)
+    monkeypatch.setitem(embedder, "latency_ms", 0.0)
+    monkeypatch.setitem(config["embedding_cache"], "enabled", False)
+    generator = config["generator"]
+    monkeypatch.setitem(generator, "provider", "mock")
+    monkeypatch.setitem(generator["model_kwargs"], "model", "mock")
+    monkeypatch.setitem(generator, "latency_ms", 0.0)
+    monkeypatch.setitem(generator, "tokens_per_second", 0.0)
+    return config
+
+
+def git(repo_dir, *args) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.email=test@example.com", "-c", "user.name=test", *args],
+        cwd=repo_dir, check=True, capture_output=True, text=True,
+    ).stdout.strip()
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    """A fresh git repo and commit({path: text or None to delete}), which returns the new HEAD."""
+    repo_dir = tmp_path / "repo"
+    repo_dir.mkdir()
+    git(repo_dir, "init", "-q")
+
+    def commit(files):
+        for rel, text in files.items():
+            path = repo_dir / rel
+            if text is None:
+                path.unlink()
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(text)
+        git(repo_dir, "add", "-A")
+        git(repo_dir, "commit", "-qm", "change")
+        return git(repo_dir, "rev-parse", "HEAD")
+
+    return repo_dir, commit
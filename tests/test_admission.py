@@ -0,0 +1,137 @@
+import asyncio
+import threading
+from itertools import count
+from types import SimpleNamespace
+
+import pytest
+
+import backend.admission as admission
+from backend.admission import AdmissionPool, Overloaded
+from backend.jobs import JobManager
+
+_names = count()
+
+
+def _pool(max_concurrent=1, max_queue=1, queue_timeout=5.0) -> AdmissionPool:
+    # Pools register gauges by name, so each test gets its own
+    return AdmissionPool(f"test{next(_names)}", max_concurrent, max_queue, queue_timeout)
+
+
+def test_queue_full_is_429():
+    async def run():
+        pool = _pool(max_concurrent=1, max_queue=1)
+        pool.admit()
+        entered = await pool.enter()
+        pool.admit()  # one caller may wait
+        with pytest.raises(Overloaded) as rejected:
+            pool.admit()
+        assert rejected.value.status_code == 429
+        assert rejected.value.retry_after >= 1
+        assert pool.stats()["waiting"] == 1
+        pool.release(entered)
+
+    asyncio.run(run())
+
+
+def test_queue_timeout_is_503_and_gives_up_its_place():
+    async def run():
+        pool = _pool(max_concurrent=1, max_queue=2, queue_timeout=0.01)
+        async with pool.slot():
+            pool.admit()
+            with pytest.raises(Overloaded) as timed_out:
+                await pool.enter()
+            assert timed_out.value.status_code == 503
+            assert pool.waiting == 0 and pool.active == 1
+        assert pool.active == 0
+
+    asyncio.run(run())
+
+
+def test_slot_is_released_when_the_body_raises():
+    async def run():
+        pool = _pool(max_concurrent=1, max_queue=0, queue_timeout=0.01)
+        with pytest.raises(ValueError):
+            async with pool.slot():
+                raise ValueError("boom")
+        assert pool.active == 0
+        async with pool.slot():  # the slot is free again
+            assert pool.active == 1
+
+    asyncio.run(run())
+
+
+def test_retry_after_follows_hold_times_and_queue_length(monkeypatch):
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(admission, "time", SimpleNamespace(monotonic=lambda: clock.now))
+
+    async def run():
+        pool = _pool(max_concurrent=2, max_queue=10)
+        assert pool.retry_after() == 1  # 1s assumed before anything was measured
+        for _ in range(40):
+            pool.admit()
+            entered = await pool.enter()
+            clock.now += 10
+            pool.release(entered)
+        # The moving average converges on the 10s hold time
+        assert pool._hold_seconds == pytest.approx(10, rel=0.01)
+        assert pool.retry_after() == 5  # 10s * 1 caller / 2 slots
+        pool.waiting = 3
+        assert pool.retry_after() == 20  # 10s * 4 callers / 2 slots
+
+    asyncio.run(run())
+
+
+def test_jobs_wait_for_a_pool_slot_and_duplicates_find_them():
+    async def run():
+        pool = _pool(max_concurrent=1, max_queue=1)
+        jobs = JobManager(pool=pool)
+        gate = threading.Event()
+        first = jobs.submit("init", "repo-a", gate.wait, 5)
+        second = jobs.submit("init", "repo-b", lambda: {"ok": True})
+        with pytest.raises(Overloaded):
+            jobs.submit("init", "repo-c", lambda: None)
+        await asyncio.sleep(0.05)
+        assert first.status == "running" and second.status == "queued"
+        assert jobs.find_active("init", "repo-a") is first
+        assert jobs.find_active("init", "repo-b", statuses=("queued",)) is second
+        assert jobs.find_active("update", "repo-a") is None
+
+        gate.set()
+        while second.status != "succeeded":
+            await asyncio.sleep(0.01)
+        assert second.result == {"ok": True}
+        assert jobs.find_active("init", "repo-a") is None
+        assert pool.active == 0 and pool.waiting == 0
+
+    asyncio.run(run())
+
+
+def test_failed_job_records_error_and_releases_its_slot():
+    def fail():
+        raise RuntimeError("clone failed")
+
+    async def run():
+        pool = _pool(max_concurrent=1, max_queue=0)
+        jobs = JobManager(pool=pool)
+        job = jobs.submit("update", "repo", fail, key="host/owner/repo")
+        while job.status in ("queued", "running"):
+            await asyncio.sleep(0.01)
+        assert job.status == "failed" and job.error == "clone failed"
+        assert job.finished_at is not None
+        assert pool.active == 0
+        assert jobs.find_active("update", "host/owner/repo", statuses=("failed",)) is job
+
+    asyncio.run(run())
+
+
+def test_finished_jobs_are_pruned():
+    async def run():
+        jobs = JobManager(max_jobs=2)
+        done = [jobs.submit("init", f"repo-{i}", lambda: None) for i in range(2)]
+        await asyncio.sleep(0.05)
+        jobs.submit("init", "repo-new", lambda: None)
+        assert jobs.get(done[0].id) is None
+        assert jobs.find_active("init", "repo-0", statuses=("succeeded",)) is None
+        assert len(jobs.jobs) == 2
+
+    asyncio.run(run())
@@ -0,0 +1,133 @@
+import os
+
+import numpy as np
+import pytest
+from adalflow.core.types import Document
+
+import app.ann_index as ann_index
+from app.ann_index import (INDEX_FILE, MatrixIndex, build_index, factory_string, index_nbytes, is_flat,
+                           load_or_build_index, normalized)
+from app.vector_store import VectorStore
+
+CFG = {"min_vectors": 0, "nlist": None, "nprobe": 16, "hnsw_m": 16, "ef_construction": 80, "ef_search": 64,
+       "pq_m": 8, "pq_bits": 8, "train_size": 100_000}
+
+
+def _clustered(count=2000, dim=32, clusters=40, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return (centers[rng.integers(clusters, size=count)] + 0.3 * rng.normal(size=(count, dim))).astype(np.float32)
+
+
+def _exact_top_k(vectors, queries, k):
+    scores = normalized(queries) @ normalized(vectors).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def _recall(found, exact):
+    return np.mean([len(set(f) & set(e)) / len(e) for f, e in zip(found, exact)])
+
+
+@pytest.mark.parametrize("kind, n, expected", [
+    ("flat", 10 ** 6, "Flat"),
+    ("matrix", 10, "Matrix"),
+    ("ivf", 10_000, "IVF256,Flat"),  # min(4 * sqrt(n), n / 39) lists
+    ("ivf", 1000, "IVF25,Flat"),
+    ("hnsw", 10, "HNSW16,Flat"),
+    ("ivfpq", 10_000, "IVF256,PQ8x8"),
+    ("ivfpq", 100, "Flat"),  # too few vectors to train PQ codebooks
+    ("sq8", 10, "SQ8"),
+    ("ivfsq8", 10_000, "IVF256,SQ8"),
+])
+def test_factory_string(kind, n, expected):
+    assert factory_string(kind, n, 96, CFG) == expected
+
+
+def test_factory_string_small_repos_and_unknown_kinds():
+    assert factory_string("hnsw", 999, 96, {**CFG, "min_vectors": 1000}) == "Flat"
+    assert factory_string("ivf", 10_000, 96, {**CFG, "nlist": 8}) == "IVF8,Flat"
+    assert factory_string("ivfpq", 10_000, 100, {**CFG, "pq_m": 32}) == "IVF256,PQ25x8"  # 25 divides 100
+    with pytest.raises(ValueError):
+        factory_string("lsh", 10, 96, CFG)
+
+
+def test_matrix_index_matches_exact_search_in_every_dtype():
+    vectors = _clustered(count=500)
+    queries = vectors[:20] + 0.1
+    exact = _exact_top_k(vectors, queries, 10)
+    for matrix in (vectors, vectors.astype(np.float16), (vectors * 10).astype(np.int8)):
+        scores, ids = MatrixIndex(matrix, block_rows=64).search(queries, 10)
+        assert ids.shape == (20, 10) and np.all(np.diff(scores, axis=1) <= 1e-6)
+        assert _recall(ids, exact) >= (1.0 if matrix.dtype == np.float32 else 0.9)
+    scores, ids = MatrixIndex(vectors[:3]).search(queries[:1], 5)
+    assert ids[0, 3:].tolist() == [-1, -1] and np.isinf(scores[0, 3:]).all()
+
+
+def test_matrix_index_coarse_to_fine():
+    rng = np.random.default_rng(1)
+    # Matryoshka-like: the leading dimensions carry most of the signal
+    vectors = _clustered(count=2000, dim=64) * np.geomspace(4, 0.1, 64).astype(np.float32)
+    queries = vectors[rng.choice(2000, 30)] + 0.05 * rng.normal(size=(30, 64)).astype(np.float32)
+    index = MatrixIndex(vectors)
+    full_bytes = index_nbytes(index)
+    exact_scores, exact = index.search(queries, 10)
+
+    index.set_coarse(16, 200)
+    scores, ids = index.search(queries, 10)
+    assert _recall(ids, exact) >= 0.95
+    # Candidates are rescored at full dimension, so their scores are exact
+    assert np.allclose(scores[ids == exact], exact_scores[ids == exact], atol=1e-5)
+    assert index_nbytes(index) < full_bytes / 2
+
+    index.set_coarse(64, 200)  # not fewer dimensions than the vectors: off
+    assert index.coarse_dims == 0 and index_nbytes(index) == full_bytes
+
+
+@pytest.mark.parametrize("kind, min_recall", [("matrix", 1.0), ("ivf", 0.9), ("hnsw", 0.9), ("ivfsq8", 0.85)])
+def test_recall_against_exact_flat(kind, min_recall):
+    vectors = _clustered()
+    queries = _clustered(count=50, seed=1)
+    exact = _exact_top_k(vectors, queries, 10)
+    flat = build_index(vectors, "flat", CFG)
+    assert _recall(flat.search(normalized(queries), 10)[1], exact) == 1.0
+    index = build_index(vectors, kind, CFG)
+    assert index.ntotal == len(vectors)
+    assert _recall(index.search(normalized(queries), 10)[1], exact) >= min_recall
+    assert is_flat(flat) and not is_flat(index)
+
+
+def _store(tmp_path, vectors):
+    documents = [Document(text=str(i), meta_data={"file_path": f"f{i}.py"}) for i in range(len(vectors))]
+    return VectorStore.write(os.path.join(tmp_path, "repo.store"), documents, vectors=vectors)
+
+
+def test_load_or_build_index_reuses_the_saved_index(tmp_path, monkeypatch):
+    store = _store(tmp_path, _clustered())
+    built = load_or_build_index(store, CFG, "ivf")
+    assert os.path.exists(os.path.join(store.path, INDEX_FILE))
+
+    def no_build(*args):
+        raise AssertionError("the saved index should have been loaded")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(ann_index, "build_index", no_build)
+        loaded = load_or_build_index(store, {**CFG, "nprobe": 4}, "ivf")
+    assert loaded.ntotal == built.ntotal
+    assert ann_index.faiss.extract_index_ivf(loaded).nprobe == 4  # search settings still come from config
+
+
+@pytest.mark.parametrize("kind, changed", [("ivf", {"nlist": 10}), ("hnsw", {"hnsw_m": 8}), ("hnsw", {"ef_construction": 40})])
+def test_changed_config_rebuilds_instead_of_loading_a_stale_index(tmp_path, monkeypatch, kind, changed):
+    store = _store(tmp_path, _clustered(count=500))
+    load_or_build_index(store, CFG, kind)
+    builds = []
+    real_build = ann_index.build_index
+    monkeypatch.setattr(ann_index, "build_index", lambda *args: builds.append(args) or real_build(*args))
+
+    cfg = {**CFG, **changed}
+    index = load_or_build_index(store, cfg, kind)
+    assert len(builds) == 1
+    load_or_build_index(store, cfg, kind)  # saved again under the new settings
+    assert len(builds) == 1
+    if kind == "ivf":
+        assert ann_index.faiss.extract_index_ivf(index).nlist == 10
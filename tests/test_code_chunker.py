@@ -0,0 +1,115 @@
+import textwrap
+
+import pytest
+
+from app.code_chunker import CodeChunker
+
+PYTHON = textwrap.dedent('''\
+    """Module docstring."""
+    import os
+
+
+    # Leading comment stays with the function
+    @decorator
+    def small(a):
+        return a
+
+
+    class Big:
+        """A class larger than max_chars, split at its methods."""
+
+        def first(self):
+            values = [i * 2 for i in range(10)]
+            return sum(values) + len("padding padding padding padding")
+
+        def second(self, x):
+            if x:
+                return x + 1
+            return "padding padding padding padding padding padding"
+
+        def third(self):
+            try:
+                return os.getcwd()
+            except OSError:
+                return None
+
+
+    def tail():
+        return "end"
+''')
+
+JS = textwrap.dedent('''\
+    // Header comment
+    import { x } from "./x";
+
+    /* Block comment with { brace */
+    export function one(a) {
+      const s = "string with } brace";
+      return a + s.length;
+    }
+
+    class Two {
+      method() {
+        return [1, 2, 3].map((v) => v * 2);
+      }
+      other() {
+        return `template ${"literal"} text`;
+      }
+    }
+
+    const three = () => {
+      return 3;
+    };
+''')
+
+
+def _assert_round_trip(text, chunks):
+    """Each chunk is the exact text of its 1-based inclusive line range; ranges cover every non-blank line once."""
+    lines = text.splitlines(keepends=True)
+    by_range = {}
+    for start, end, body in chunks:
+        by_range.setdefault((start, end), []).append(body)
+    ranges = sorted(by_range)
+    for (start, end), bodies in by_range.items():
+        assert 1 <= start <= end <= len(lines)
+        # A line too long for max_chars is cut into several chunks of the same range
+        assert "".join(bodies) == "".join(lines[start - 1:end])
+    for (_, prev_end), (next_start, _) in zip(ranges, ranges[1:]):
+        assert prev_end < next_start
+    covered = {i for start, end in ranges for i in range(start, end + 1)}
+    for number, line in enumerate(lines, start=1):
+        if line.strip():
+            assert number in covered, f"line {number} is in no chunk: {line!r}"
+
+
+@pytest.mark.parametrize("text, ext", [(PYTHON, ".py"), (JS, ".js")])
+@pytest.mark.parametrize("max_chars, min_chars", [(2000, 400), (200, 50), (120, 0), (60, 30)])
+def test_round_trip(text, ext, max_chars, min_chars):
+    chunks = CodeChunker(max_chars=max_chars, min_chars=min_chars).split(text, ext)
+    _assert_round_trip(text, chunks)
+
+
+def test_small_file_is_one_chunk():
+    chunks = CodeChunker().split(PYTHON, ".py")
+    assert chunks == [(1, len(PYTHON.splitlines()), PYTHON)]
+
+
+def test_splits_on_definitions_with_their_comments():
+    chunks = CodeChunker(max_chars=300, min_chars=0).split(PYTHON, ".py")
+    starts = [body.lstrip().splitlines()[0] for _, _, body in chunks]
+    assert "# Leading comment stays with the function" in starts
+    assert any(line.strip().startswith("def second") for line in starts)
+    assert all(len(body) <= 300 for _, _, body in chunks)
+
+
+def test_long_line_is_cut_by_characters():
+    text = "x = '" + "a" * 450 + "'\n"
+    chunks = CodeChunker(max_chars=100, min_chars=0).split(text, ".py")
+    assert len(chunks) == 5
+    assert all(len(body) <= 100 for _, _, body in chunks)
+    _assert_round_trip(text, chunks)
+
+
+def test_unparseable_python_still_round_trips():
+    text = PYTHON.replace("def tail():", "def tail(:")
+    _assert_round_trip(text, CodeChunker(max_chars=200, min_chars=50).split(text, ".py"))
@@ -0,0 +1,62 @@
+import pytest
+from adalflow.core.types import Document
+
+from app.dedup import ChunkDeduplicator, MinHasher, chunk_file_paths, content_hash, estimated_jaccard
+
+BODY = " ".join(f"word{i}" for i in range(200))
+
+
+def _doc(text, path):
+    return Document(text=text, meta_data={"file_path": path})
+
+
+def test_content_hash_ignores_whitespace():
+    assert content_hash("def f(x):\n    return x\n") == content_hash("def f(x):\n\treturn   x")
+    assert content_hash("def f(x): return x") != content_hash("def f(y): return y")
+
+
+def test_chunk_file_paths_of_old_and_new_chunks():
+    assert chunk_file_paths({"file_path": "a.py"}) == ["a.py"]
+    assert chunk_file_paths({"file_path": "a.py", "file_paths": ["a.py", "b/a.py"]}) == ["a.py", "b/a.py"]
+
+
+def test_minhash_estimates_jaccard():
+    hasher = MinHasher(num_perm=128, bands=16)
+    same = hasher.signature(BODY)
+    assert estimated_jaccard(same, hasher.signature(BODY)) == 1.0
+    assert estimated_jaccard(same, hasher.signature(BODY.replace("word100", "changed"))) > 0.85
+    assert estimated_jaccard(same, hasher.signature(" ".join(f"other{i}" for i in range(200)))) < 0.1
+    assert hasher.signature("too short") is None
+    with pytest.raises(ValueError):
+        MinHasher(num_perm=10, bands=3)
+
+
+def test_exact_and_near_duplicates_collapse_into_the_shallowest_copy():
+    documents = [
+        _doc(BODY, "vendor/lib/util.py"),
+        _doc(BODY.replace(" ", "\n"), "util.py"),  # exact: only whitespace differs
+        _doc(BODY.replace("word100", "changed"), "docs/util_copy.py"),  # near duplicate
+        _doc(" ".join(f"other{i}" for i in range(200)), "other.py"),
+        _doc("x = 1", "tiny.py"),
+    ]
+    kept = ChunkDeduplicator(threshold=0.85)(documents)
+
+    assert [doc.meta_data["file_path"] for doc in kept] == ["util.py", "other.py", "tiny.py"]
+    assert kept[0].meta_data["file_paths"] == ["util.py", "vendor/lib/util.py", "docs/util_copy.py"]
+    assert kept[1].meta_data["file_paths"] == ["other.py"]
+    assert all(doc.meta_data["content_hash"] == content_hash(doc.text) for doc in kept)
+
+
+def test_near_duplicates_are_kept_when_disabled():
+    documents = [_doc(BODY, "a.py"), _doc(BODY.replace("word100", "changed"), "b.py"), _doc(BODY, "c/a.py")]
+    kept = ChunkDeduplicator(near_duplicates=False)(documents)
+    assert [doc.meta_data["file_paths"] for doc in kept] == [["a.py", "c/a.py"], ["b.py"]]
+
+
+def test_exact_matches_of_known_chunks_are_folded_into_them():
+    known_doc = _doc(BODY, "util.py")
+    known_doc.meta_data["file_paths"] = ["util.py"]
+    known = {content_hash(BODY): known_doc}
+    kept = ChunkDeduplicator()([_doc(BODY, "copy/util.py"), _doc("something else entirely", "new.py")], known=known)
+    assert [doc.meta_data["file_path"] for doc in kept] == ["new.py"]
+    assert known_doc.meta_data["file_paths"] == ["util.py", "copy/util.py"]
@@ -0,0 +1,133 @@
+import asyncio
+import os
+
+import numpy as np
+from adalflow.core.types import Embedding, EmbedderOutput, ModelType
+
+from app.embedding_cache import CachedEmbedderClient, EmbeddingCache, embedding_cache_key
+
+
+class FakeEmbedder:
+    """Embeds a text as [len(text), 1, 0]; texts in `drop` come back without a vector."""
+
+    def __init__(self, drop=()):
+        self.drop = set(drop)
+        self.requests = []
+
+    def convert_inputs_to_api_kwargs(self, input=None, model_kwargs={}, model_type=None):
+        return {**model_kwargs, "input": list(input)}
+
+    def call(self, api_kwargs={}, model_type=None):
+        self.requests.append(list(api_kwargs["input"]))
+        return [(i, text) for i, text in enumerate(api_kwargs["input"]) if text not in self.drop]
+
+    async def acall(self, api_kwargs={}, model_type=None):
+        return self.call(api_kwargs, model_type)
+
+    def parse_embedding_response(self, response):
+        return EmbedderOutput(data=[Embedding(index=i, embedding=[float(len(t)), 1.0, 0.0]) for i, t in response])
+
+
+def _client(tmp_path, inner=None, max_bytes=1 << 20, dimensions=None):
+    cache = EmbeddingCache(os.path.join(tmp_path, "cache.sqlite"), max_bytes=max_bytes)
+    return CachedEmbedderClient(inner or FakeEmbedder(), cache, dimensions=dimensions)
+
+
+def _embed(client, texts, **model_kwargs):
+    api_kwargs = client.convert_inputs_to_api_kwargs(input=texts, model_kwargs=model_kwargs, model_type=ModelType.EMBEDDER)
+    return client.call(api_kwargs, ModelType.EMBEDDER)
+
+
+def test_keys_separate_model_task_type_and_dimensions():
+    base = embedding_cache_key("m", "RETRIEVAL_DOCUMENT", 768, "text")
+    assert base == embedding_cache_key("m", "RETRIEVAL_DOCUMENT", 768, "text")
+    others = {
+        embedding_cache_key("m2", "RETRIEVAL_DOCUMENT", 768, "text"),
+        embedding_cache_key("m", "RETRIEVAL_QUERY", 768, "text"),
+        embedding_cache_key("m", "RETRIEVAL_DOCUMENT", 256, "text"),
+        embedding_cache_key("m", "RETRIEVAL_DOCUMENT", None, "text"),
+        embedding_cache_key("m", "RETRIEVAL_DOCUMENT", 768, "text2"),
+    }
+    assert base not in others and len(others) == 5
+
+
+def test_only_misses_are_forwarded(tmp_path):
+    inner = FakeEmbedder()
+    client = _client(tmp_path, inner)
+    first = _embed(client, ["a", "bb"], model="m")
+    second = _embed(client, ["bb", "ccc", "a"], model="m")
+    assert inner.requests == [["a", "bb"], ["ccc"]]
+    assert first == [[1.0, 1.0, 0.0], [2.0, 1.0, 0.0]]
+    assert [v[0] for v in second] == [2.0, 3.0, 1.0]
+    assert client.cache.stats()["hits"] == 2
+
+    # Another task type is a separate entry
+    _embed(client, ["a"], model="m", task_type="RETRIEVAL_QUERY")
+    assert inner.requests[-1] == ["a"]
+
+
+def test_dropped_vector_keeps_positions_and_is_not_cached(tmp_path):
+    inner = FakeEmbedder(drop={"bb"})
+    client = _client(tmp_path, inner)
+    _embed(client, ["a"], model="m")
+    vectors = _embed(client, ["bb", "a", "ccc"], model="m")
+    assert inner.requests[-1] == ["bb", "ccc"]
+    assert vectors[0] is None
+    assert vectors[1][0] == 1.0 and vectors[2][0] == 3.0
+    parsed = client.parse_embedding_response(vectors).data
+    assert [e.index for e in parsed] == [1, 2]
+
+    inner.drop.clear()
+    assert _embed(client, ["bb"], model="m")[0][0] == 2.0
+    assert inner.requests[-1] == ["bb"]
+
+
+def test_vectors_of_the_wrong_size_are_misses(tmp_path):
+    inner = FakeEmbedder()
+    client = _client(tmp_path, inner, dimensions=3)
+    key = embedding_cache_key("m", "RETRIEVAL_DOCUMENT", 3, "a")
+    client.cache.put_many({key: [0.5] * 8})
+    assert _embed(client, ["a"], model="m") == [[1.0, 1.0, 0.0]]
+    assert inner.requests == [["a"]]
+
+
+def test_async_path_matches_sync(tmp_path):
+    client = _client(tmp_path)
+    api_kwargs = client.convert_inputs_to_api_kwargs(input=["a", "bb"], model_kwargs={"model": "m"})
+    assert asyncio.run(client.acall(api_kwargs, ModelType.EMBEDDER)) == client.call(api_kwargs, ModelType.EMBEDDER)
+    assert client.cache.stats()["hits"] == 2
+
+
+def test_lru_eviction_at_size_cap(tmp_path):
+    row_bytes = 4 * 4  # four float32s
+    cache = EmbeddingCache(os.path.join(tmp_path, "cache.sqlite"), max_bytes=10 * row_bytes)
+    for i in range(10):
+        cache.put_many({f"k{i}": [float(i)] * 4})
+    cache.get_many(["k0"])  # k0 is now the most recently used
+    cache.put_many({"k10": [10.0] * 4})
+    # Evicted down to 90% of the budget, oldest first
+    assert cache.stats()["size_bytes"] <= 9 * row_bytes
+    assert cache.evictions == 2
+    found = cache.get_many([f"k{i}" for i in range(11)])
+    assert "k0" in found and "k10" in found
+    assert "k1" not in found and "k2" not in found
+
+
+def test_replacing_an_entry_does_not_double_count(tmp_path):
+    cache = EmbeddingCache(os.path.join(tmp_path, "cache.sqlite"))
+    cache.put_many({"k": [1.0] * 4})
+    cache.put_many({"k": [2.0] * 4})
+    assert cache.stats()["size_bytes"] == 16
+    assert cache.get_many(["k"])["k"] == [2.0] * 4
+
+
+def test_entries_persist_across_reopen(tmp_path):
+    path = os.path.join(tmp_path, "cache.sqlite")
+    cache = EmbeddingCache(path)
+    vector = np.linspace(-1, 1, 8, dtype=np.float32).tolist()
+    cache.put_many({"k": vector})
+    cache._conn.close()
+
+    reopened = EmbeddingCache(path)
+    assert reopened.get_many(["k"]) == {"k": vector}
+    assert reopened.stats()["size_bytes"] == 32
@@ -0,0 +1,158 @@
+import gc
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from adalflow.core.types import Document, Embedding, EmbedderOutput
+
+import app.embedding_scheduler as scheduler_module
+from app.embedding_scheduler import EmbeddingScheduler, RateLimiter, ScheduledToEmbeddings, _retry_delay_hint
+
+
+class APIError(Exception):
+    def __init__(self, code, message=""):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeClient:
+    """Embeds a text as [len(text), position]; raises the queued errors first."""
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.calls = []
+
+    def convert_inputs_to_api_kwargs(self, input=None, model_kwargs={}, model_type=None):
+        return {**model_kwargs, "input": list(input)}
+
+    async def acall(self, api_kwargs={}, model_type=None):
+        self.calls.append(api_kwargs["input"])
+        if self.errors:
+            raise self.errors.pop(0)
+        return [[float(len(text)), float(i)] for i, text in enumerate(api_kwargs["input"])]
+
+    def parse_embedding_response(self, response):
+        return EmbedderOutput(data=[Embedding(index=i, embedding=v) for i, v in enumerate(response)])
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock; asyncio.sleep advances it instead of waiting."""
+    state = SimpleNamespace(now=1000.0, sleeps=[])
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds):
+        state.sleeps.append(seconds)
+        state.now += seconds
+        await real_sleep(0)
+
+    monkeypatch.setattr(scheduler_module, "time", SimpleNamespace(monotonic=lambda: state.now, perf_counter=lambda: state.now))
+    monkeypatch.setattr(scheduler_module.asyncio, "sleep", sleep)
+    monkeypatch.setattr(scheduler_module.random, "uniform", lambda a, b: 1.0)
+    return state
+
+
+def _scheduler(client, **kwargs):
+    return EmbeddingScheduler(client, {"model": "fake"}, **kwargs)
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("429 RESOURCE_EXHAUSTED {'retryDelay': '17s'}", 17.0),
+    ('"retryDelay": "2.5s"', 2.5),
+    ("retryDelay: 30s", 30.0),
+    ("429 quota exceeded", None),
+])
+def test_retry_delay_hint(message, expected):
+    assert _retry_delay_hint(APIError(429, message)) == expected
+
+
+def test_rate_limit_honours_retry_delay_then_succeeds(clock):
+    client = FakeClient([APIError(429, "quota {'retryDelay': '17s'}")])
+    started = clock.now
+    vectors = asyncio.run(_scheduler(client).aembed(["ab", "cde"]))
+    assert vectors == [[2.0, 0.0], [3.0, 1.0]]
+    assert len(client.calls) == 2
+    # The retry waited for the server's hint rather than the 1s base delay
+    assert clock.now - started >= 17
+
+
+def test_server_errors_back_off_exponentially(clock):
+    client = FakeClient([APIError(503), APIError(500)])
+    asyncio.run(_scheduler(client, base_delay=1.0).aembed(["a"]))
+    assert len(client.calls) == 3
+    assert clock.sleeps[:2] == [1.0, 2.0]
+
+
+def test_client_errors_and_exhausted_retries_raise(clock):
+    with pytest.raises(APIError):
+        asyncio.run(_scheduler(FakeClient([APIError(400)])).aembed(["a"]))
+    client = FakeClient([APIError(503)] * 3)
+    with pytest.raises(APIError):
+        asyncio.run(_scheduler(client, max_retries=2).aembed(["a"]))
+    assert len(client.calls) == 3
+
+
+def test_batches_keep_input_order(clock):
+    client = FakeClient()
+    texts = [str(i) * (i % 7 + 1) for i in range(25)]
+    vectors = asyncio.run(_scheduler(client, batch_size=10, max_in_flight=2).aembed(texts))
+    assert [len(batch) for batch in client.calls] == [10, 10, 5]
+    assert [v[0] for v in vectors] == [float(len(t)) for t in texts]
+
+
+def test_requests_per_minute_throttle(clock):
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=10 ** 9)
+
+    async def run():
+        for _ in range(70):
+            await limiter.acquire(1)
+
+    started = clock.now
+    asyncio.run(run())
+    # A full bucket of 60, then one request per second
+    assert clock.now - started == pytest.approx(10, abs=0.5)
+
+
+def test_tokens_per_minute_throttle(clock):
+    limiter = RateLimiter(requests_per_minute=10 ** 6, tokens_per_minute=600)
+
+    async def run():
+        for _ in range(4):
+            await limiter.acquire(300)
+
+    started = clock.now
+    asyncio.run(run())
+    # 600 tokens up front, then 10 tokens per second for the remaining 600
+    assert clock.now - started == pytest.approx(60, abs=1)
+
+
+def test_rate_limited_halves_rate_and_success_recovers(clock):
+    limiter = RateLimiter(60, 1000, min_scale=0.1)
+    limiter.on_rate_limited(5)
+    assert limiter.scale == 0.5
+    for _ in range(10):
+        limiter.on_rate_limited(0)
+    assert limiter.scale == 0.1
+    for _ in range(30):
+        limiter.on_success()
+    assert limiter.scale == 1.0
+
+
+def test_scheduled_to_embeddings_runs_its_own_loop():
+    component = ScheduledToEmbeddings(_scheduler(FakeClient(), batch_size=2))
+    documents = [Document(text="x" * n) for n in (1, 2, 3)]
+    embedded = component(documents)
+    assert [doc.vector[0] for doc in embedded] == [1.0, 2.0, 3.0]
+    assert not any(doc.vector for doc in documents)  # inputs are copied, not modified
+
+
+@pytest.mark.filterwarnings("ignore:coroutine .* was never awaited")
+def test_embed_refuses_a_running_loop():
+    scheduler = _scheduler(FakeClient())
+
+    async def inside_loop():
+        scheduler.embed(["a"])
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(inside_loop())
+    gc.collect()  # the coroutine asyncio.run refused is reported here, under this test's filter
@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+
+from app.data_pipeline import DatabaseManager
+from app.index_versions import publish, read_manifest, store_dir, version_dir, write_manifest, writer_lock
+
+
+def _store(path):
+    os.makedirs(path)
+    return path
+
+
+def test_publish_keeps_only_the_newest_versions(tmp_path):
+    base = os.path.join(tmp_path, "repo.store")
+    manifest_path = os.path.join(tmp_path, "repo.meta.json")
+    _store(base)  # written before versioning: version 0
+    for version in (1, 2, 3):
+        path = _store(version_dir(base, version))
+        assert publish(manifest_path, base, path, f"c{version}", "local:hashing:64", keep=2) == version
+
+    assert sorted(os.listdir(tmp_path)) == ["repo.meta.json", "repo.store.v2", "repo.store.v3"]
+    manifest = read_manifest(manifest_path)
+    assert manifest["version"] == 3 and manifest["commit"] == "c3"
+    assert manifest["store"] == "repo.store.v3" and manifest["embedder"] == "local:hashing:64"
+    assert store_dir(base, manifest) == version_dir(base, 3)
+
+
+def test_publish_leaves_other_repos_alone(tmp_path):
+    base = os.path.join(tmp_path, "repo.store")
+    _store(os.path.join(tmp_path, "repo.store2"))
+    _store(os.path.join(tmp_path, "other.store.v1"))
+    publish(os.path.join(tmp_path, "repo.meta.json"), base, _store(version_dir(base, 1)), None, "e", keep=1)
+    publish(os.path.join(tmp_path, "repo.meta.json"), base, _store(version_dir(base, 2)), None, "e", keep=1)
+    assert sorted(os.listdir(tmp_path)) == ["other.store.v1", "repo.meta.json", "repo.store.v2", "repo.store2"]
+
+
+def test_store_dir_of_legacy_and_empty_manifests(tmp_path):
+    base = os.path.join(tmp_path, "repo.store")
+    # Manifests from before versioning have no "store" and describe the unversioned directory
+    assert store_dir(base, {"commit": "abc"}) == base
+    assert store_dir(base, {}) == base
+    assert store_dir(base, {"version": 4, "store": None}) is None
+
+
+def test_manifest_round_trip(tmp_path):
+    path = os.path.join(tmp_path, "repo.meta.json")
+    assert read_manifest(path) == {}
+    write_manifest(path, {"version": 1})
+    write_manifest(path, {"version": 2})
+    assert read_manifest(path) == {"version": 2}
+    assert os.listdir(tmp_path) == ["repo.meta.json"]
+
+
+def test_writer_lock_is_exclusive(tmp_path):
+    base = os.path.join(tmp_path, "repo.store")
+    events = []
+    held = threading.Event()
+
+    def second_writer():
+        held.wait()
+        with writer_lock(base):
+            events.append("second")
+
+    thread = threading.Thread(target=second_writer)
+    thread.start()
+    with writer_lock(base):
+        held.set()
+        time.sleep(0.1)
+        events.append("first")
+    thread.join(5)
+    assert events == ["first", "second"]
+
+
+def _chunks(db):
+    return sorted((doc.meta_data["file_path"], doc.text) for doc in db.documents())
+
+
+def test_incremental_update_replaces_changed_and_deleted_files(offline, git_repo):
+    repo_dir, commit = git_repo
+    first = commit({
+        "keep.py": "def kept():\n    return 'unchanged'\n",
+        "edit.py": "def edited():\n    return 'before'\n",
+        "gone.py": "def removed():\n    return 'deleted'\n",
+    })
+    manager = DatabaseManager()
+    manager.prepare_database(str(repo_dir))
+    assert manager.version == 1
+    assert [path for path, _ in _chunks(manager.db)] == ["edit.py", "gone.py", "keep.py"]
+    before = list(manager.db.documents())
+
+    second = commit({"edit.py": "def edited():\n    return 'after'\n", "gone.py": None})
+    update = manager.update_db_index()
+
+    assert update.commit == second != first and not update.rebuilt
+    assert [before[i].meta_data["file_path"] for i in update.removed] == ["edit.py", "gone.py"]
+    assert [doc.meta_data["file_path"] for doc in update.added] == ["edit.py"]
+    assert _chunks(manager.db) == [
+        ("edit.py", "def edited():\n    return 'after'\n"),
+        ("keep.py", "def kept():\n    return 'unchanged'\n"),
+    ]
+    assert manager.version == 2
+    manifest = read_manifest(manager.repo_paths["save_meta_file"])
+    assert manifest["commit"] == second and manifest["store"] == os.path.basename(manager.db.path)
+
+    # Another process opening the repo sees the published update
+    reader = DatabaseManager()
+    assert reader.load_database(str(repo_dir))
+    assert _chunks(reader.db) == _chunks(manager.db)
@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import config
+from app.lexical_index import LexicalIndex, query_identifiers, reciprocal_rank_fusion, tokenize_code
+from app.rag import RAG
+from app.symbol_index import SymbolHits
+
+CHUNKS = [
+    "def prepare_db_index(self):\n    return self.load_config()\n",
+    "class HTTPServerError(Exception):\n    pass\n",
+    "def load_config(path):\n    return read(path)\n",
+    "def parse_config(text):\n    return text\n",
+    "# parse_config is called here\nvalue = parse_config(raw)\n",
+    "# the README explains how the server starts\n",
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return LexicalIndex.build(CHUNKS)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("prepare_db_index", ["prepare_db_index", "prepare", "db", "index"]),
+    ("HTTPServerError", ["httpservererror", "http", "server", "error"]),
+    ("loadConfig2", ["loadconfig2", "load", "config"]),
+    ("how is the x in Parser", ["parser"]),
+])
+def test_tokenize_splits_camel_and_snake_case(text, expected):
+    assert tokenize_code(text) == expected
+
+
+def test_query_identifiers():
+    query = "where is `HTTPServerError` raised by prepare_db_index or loadConfig() and run()"
+    assert query_identifiers(query) == ["httpservererror", "prepare_db_index", "loadconfig", "run"]
+    assert query_identifiers("how does the server start") == []
+
+
+def test_bm25_ranks_rarer_and_denser_matches_first(index):
+    hits = index.search("load_config")
+    # Both chunks naming load_config beat those sharing only the "config" part; the shorter one ranks first
+    assert [i for i, _ in hits] == [2, 0, 4, 3]
+    assert hits[0][1] > hits[1][1] > hits[2][1] > 0
+    # A part of a compound name matches it too
+    assert {i for i, _ in index.search("server")} == {1, 5}
+    assert index.search("nonexistent") == []
+    assert index.document_frequency("parse_config") == 2
+
+
+def test_save_and_load_round_trip(index, tmp_path):
+    index.save(tmp_path)
+    loaded = LexicalIndex.load(tmp_path)
+    assert loaded.count == index.count
+    assert loaded.search("parse_config") == index.search("parse_config")
+    assert LexicalIndex.load(tmp_path / "missing") is None
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]], k=60)
+    assert [doc for doc, _ in fused] == [1, 3, 2, 4]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 62)
+    assert fused[-1][1] == pytest.approx(1 / 63)
+
+
+def test_confident_requires_a_relative_margin(index):
+    query = "where is load_config"
+    assert index.confident(query, [(2, 12.0), (0, 10.0)], max_df=10, margin=0.2)
+    assert not index.confident(query, [(2, 11.0), (0, 10.0)], max_df=10, margin=0.2)
+    assert index.confident(query, [(2, 11.0), (0, 10.0)], max_df=10, margin=0.05)
+    assert index.confident(query, [(2, 1.0)], max_df=10)
+    # Identifiers too common, not indexed, or not named at all
+    assert not index.confident(query, [(2, 12.0), (0, 10.0)], max_df=1)
+    assert not index.confident("where is missing_name", [(2, 12.0)], max_df=10)
+    assert not index.confident("how does the server start", [(1, 12.0)], max_df=10)
+
+
+def _fast_path(index, query, symbol_hits=SymbolHits()):
+    rag = SimpleNamespace(lexical_index=index)
+    return RAG._fast_path(rag, query, (index.search(query), symbol_hits, 1))
+
+
+def test_fast_path(index):
+    assert _fast_path(index, "what does `HTTPServerError` do") == "lexical"
+    # Two chunks score alike for parse_config: ambiguous, so the query is embedded
+    assert _fast_path(index, "what does parse_config return") is None
+    assert _fast_path(index, "how does the server start") is None
+    assert _fast_path(index, "who calls parse_config", SymbolHits(chunks=[4], structural=True)) == "symbols"
+
+
+def test_fast_path_can_be_disabled(index, monkeypatch):
+    monkeypatch.setitem(config["hybrid"], "fast_path", False)
+    assert _fast_path(index, "what does `HTTPServerError` do") is None
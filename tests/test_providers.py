@@ -0,0 +1,90 @@
+import json
+import asyncio
+from types import SimpleNamespace
+
+import adalflow as adal
+import numpy as np
+import pytest
+from adalflow.core.types import GeneratorOutput, ModelType
+
+from app.local_embedder import HashingEmbedderClient
+from app.mock_llm import MockLLMClient
+from app.providers import create_embedder, create_generator, embedder_defaults, embedder_id
+from app.rag import Memory, RAG, RAGAnswer
+
+EMBEDDER = {"provider": "local", "model_kwargs": {"model": "hashing"}, "dimensions": 96, "latency_ms": 0}
+
+
+@pytest.mark.parametrize("dimensions", [8, 96, 768])
+def test_hashing_embedder_returns_unit_vectors_of_the_configured_width(dimensions):
+    client = create_embedder({**EMBEDDER, "dimensions": dimensions})
+    assert isinstance(client, HashingEmbedderClient)
+    api_kwargs = client.convert_inputs_to_api_kwargs(
+        input=["def load_config(path):", "class HTTPServerError", "start_server"], model_type=ModelType.EMBEDDER
+    )
+    vectors = np.asarray([e.embedding for e in client.parse_embedding_response(client.call(api_kwargs)).data])
+    assert vectors.shape == (3, dimensions)
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1, rtol=1e-5)
+
+
+def test_hashing_embedder_is_deterministic_and_lexical():
+    client = HashingEmbedderClient(dimensions=256)
+    a, b, again, empty = client.embed(["load the config file", "parse the http response", "load the config file", ""])
+    np.testing.assert_array_equal(a, again)
+    assert float(a @ client.embed(["load config files"])[0]) > float(a @ b)
+    assert not empty.any()  # nothing to hash: a zero vector, not NaN
+    assert asyncio.run(client.acall({"input": ["load the config file"]}))[0].tolist() == a.tolist()
+
+
+def test_embedder_id_changes_with_provider_model_and_dimensions():
+    base = embedder_id(EMBEDDER)
+    assert base == "local:hashing:96"
+    assert embedder_id({**EMBEDDER, "dimensions": 768}) != base
+    assert embedder_id({**EMBEDDER, "provider": "gemini"}) != base
+    assert embedder_id({**EMBEDDER, "model_kwargs": {"model": "all-MiniLM-L6-v2"}}) != base
+    assert embedder_defaults("gemini") == ("gemini-embedding-001", 768)
+
+
+def test_unknown_provider():
+    with pytest.raises(ValueError):
+        create_generator({"provider": "nope"})
+
+
+def _mock_reply(prompt: str) -> GeneratorOutput:
+    client = create_generator({"provider": "mock", "latency_ms": 0})
+    assert isinstance(client, MockLLMClient)
+    api_kwargs = client.convert_inputs_to_api_kwargs(input=prompt, model_type=ModelType.LLM)
+    return client.parse_chat_completion(client.call(api_kwargs, ModelType.LLM))
+
+
+def _with_data(reply: GeneratorOutput, data) -> GeneratorOutput:
+    return GeneratorOutput(data=data, raw_response=reply.raw_response, usage=reply.usage)
+
+
+PROMPT = "File Path: app/config.py\ndef load_config(): ...\nFile Path: app/server.py\n...\nHow is config loaded?"
+
+
+def test_mock_llm_reply_is_deterministic_json():
+    reply = _mock_reply(PROMPT)
+    assert reply.raw_response == _mock_reply(PROMPT).raw_response
+    data = json.loads(reply.raw_response)
+    assert set(data) == {"rationale", "answer"}
+    assert "from 2 context files" in data["rationale"]
+    assert "- `app/config.py`\n- `app/server.py`" in data["answer"]
+    assert reply.usage.total_tokens == reply.usage.prompt_tokens + reply.usage.completion_tokens
+    assert json.loads(_mock_reply(PROMPT + "!").raw_response)["rationale"] != data["rationale"]
+
+
+def test_mock_llm_reply_is_accepted_by_the_rag_parser():
+    reply = _mock_reply(PROMPT)
+    parser = adal.DataClassParser(data_class=RAGAnswer, return_data_class=True)
+    memory = Memory()
+    parsed = _with_data(reply, parser(reply.raw_response))
+    answer = RAG._parse_response(SimpleNamespace(), "How is config loaded?", parsed, memory)
+    expected = json.loads(reply.raw_response)
+    assert (answer.rationale, answer.answer) == (expected["rationale"], expected["answer"])
+    assert memory()[0].assistant_response.response_str == expected["answer"]
+
+    # When the output processor yields nothing, the raw JSON is parsed instead
+    fallback = RAG._parse_response(SimpleNamespace(), "q", _with_data(reply, RAGAnswer()), Memory())
+    assert fallback.answer == expected["answer"]
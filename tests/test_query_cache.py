@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import app.query_cache as query_cache
+from app.config import config
+from app.query_cache import AnswerCache, TTLCache, normalize_query
+from app.rag import RAG
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    state = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(query_cache, "time", SimpleNamespace(monotonic=lambda: state.now))
+    return state
+
+
+def test_normalize_query():
+    assert normalize_query("  How does   Indexing work?? ") == "how does indexing work"
+
+
+def test_ttl_cache_evicts_least_recently_used(clock):
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats() == {"entries": 2, "hits": 3, "misses": 1, "hit_rate": 0.75}
+
+
+def test_ttl_cache_entries_expire(clock):
+    cache = TTLCache(ttl_seconds=60)
+    cache.put("a", 1)
+    clock.now = 60
+    assert cache.get("a", count=False) == 1
+    clock.now = 61
+    assert cache.get("a") is None
+    assert len(cache) == 0 and cache.misses == 1 and cache.hits == 0
+
+
+def _rotated(vector, cosine):
+    """A unit vector at the given cosine similarity to the unit vector `vector`, in the plane of its first two axes."""
+    other = np.zeros_like(vector)
+    other[1] = 1.0
+    return cosine * vector + np.sqrt(1 - cosine ** 2) * other
+
+
+def test_answer_cache_shares_answers_between_similar_questions():
+    cache = AnswerCache(similarity_threshold=0.95)
+    question = np.array([1.0, 0.0, 0.0])
+    cache.put(1, question * 3, [4, 2], "answer")  # stored normalized
+    assert cache.get(1, question, [4, 2]) == "answer"
+    assert cache.get(1, _rotated(question, 0.96), [4, 2]) == "answer"
+    assert cache.get(1, _rotated(question, 0.94), [4, 2]) is None
+    # The same question over other chunks, or the same chunks in another order, is another answer
+    assert cache.get(1, question, [4, 3]) is None
+    assert cache.get(1, question, [2, 4]) is None
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 3
+
+
+def test_answer_cache_drops_everything_on_a_new_index_version():
+    cache = AnswerCache()
+    cache.put(1, [1.0, 0.0], [0], "old")
+    assert cache.get(2, [1.0, 0.0], [0]) is None
+    assert cache.stats()["entries"] == 0
+    cache.put(2, [1.0, 0.0], [0], "new")
+    assert cache.get(2, [1.0, 0.0], [0]) == "new"
+    assert cache.get(1, [1.0, 0.0], [0]) is None  # and going back does not resurrect the old answers
+
+
+def test_query_key_follows_the_embedder(monkeypatch):
+    rag = SimpleNamespace()
+    key = RAG._query_key(rag, "What is X?")
+    assert key == RAG._query_key(rag, "what is x")
+    monkeypatch.setitem(config["embedder"], "dimensions", config["embedder"]["dimensions"] // 2)
+    assert RAG._query_key(rag, "What is X?") != key
+    monkeypatch.setitem(config["embedder"], "provider", "other")
+    assert RAG._query_key(rag, "What is X?")[0].startswith("other:")
@@ -0,0 +1,63 @@
+import json
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.rag import Memory
+from backend.main import app, registry
+
+FILES = {
+    "app/server.py": "def start_server(port):\n    return listen(port)\n",
+    "app/config.py": "def load_settings(path):\n    return read(path)\n",
+}
+
+
+@pytest.fixture
+def indexed_repo(offline, monkeypatch, git_repo):
+    monkeypatch.setitem(offline["query_cache"], "enabled", False)
+    repo_dir, commit = git_repo
+    commit(FILES)
+    return str(repo_dir), registry.prepare(str(repo_dir))
+
+
+def _events(body: str):
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        yield event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+def test_stream_matches_the_non_streamed_answer(indexed_repo):
+    _, rag = indexed_repo
+
+    async def run():
+        answer, _ = await rag.acall("How is the server started?", Memory())
+        streamed = [event async for event in rag.astream("How is the server started?", Memory())]
+        return answer, streamed
+
+    answer, streamed = asyncio.run(run())
+    names = [name for name, _ in streamed]
+    assert names[0] == "sources" and names[-1] == "done"
+    # The mock's reply is derived from the whole prompt, so equal answers mean equal prompts
+    done = streamed[-1][1]
+    assert (done.rationale, done.answer) == (answer.rationale, answer.answer)
+    assert "".join(data for name, data in streamed if name == "answer") == answer.answer
+    assert "".join(data for name, data in streamed if name == "rationale") == answer.rationale
+
+
+def test_query_stream_endpoint_sends_server_sent_events(indexed_repo):
+    repo_dir, _ = indexed_repo
+    response = TestClient(app).post(
+        "/query/stream", json={"repo_url": repo_dir, "query": "How is the server started?", "session_id": "sse"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = list(_events(response.text))
+
+    name, sources = events[0]
+    assert name == "sources"
+    assert {doc["meta_data"]["file_path"] for doc in sources} <= set(FILES)
+    name, done = events[-1]
+    assert name == "done" and done["answer"].startswith("Mock answer to: How is the server started?")
+    assert done["usage"]["query"] > 0 and done["usage"]["context_chunks"] == len(sources)
+    assert "".join(data["delta"] for name, data in events if name == "answer") == done["answer"]
@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+from app.repo_scanner import GitIgnore, is_path_ignored
+
+
+def _write(root, rel, text=""):
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+@pytest.mark.parametrize("pattern, path, is_dir, expected", [
+    # No slash: matches at any depth
+    ("*.log", "debug.log", False, True),
+    ("*.log", "a/b/debug.log", False, True),
+    ("build", "src/build", True, True),
+    # A leading or inner slash anchors to the .gitignore's directory
+    ("/build", "build", True, True),
+    ("/build", "src/build", True, None),
+    ("doc/*.txt", "doc/notes.txt", False, True),
+    ("doc/*.txt", "src/doc/notes.txt", False, None),
+    # * and ? stop at slashes, ** crosses them
+    ("doc/*.txt", "doc/sub/notes.txt", False, None),
+    ("file?.py", "file1.py", False, True),
+    ("file?.py", "file10.py", False, None),
+    ("**/logs", "a/b/logs", True, True),
+    ("**/logs", "logs", True, True),
+    ("a/**/b", "a/b", True, True),
+    ("a/**/b", "a/x/y/b", True, True),
+    ("a/**", "a/x/y.py", False, True),
+    ("a/**", "a", True, None),
+    # Character classes, including negated ones
+    ("data[0-9].json", "data7.json", False, True),
+    ("data[!0-9].json", "data7.json", False, None),
+    ("data[!0-9].json", "datax.json", False, True),
+    # A trailing slash only matches directories
+    ("out/", "out", True, True),
+    ("out/", "out", False, None),
+    # Regex metacharacters are literal
+    ("a+b.py", "a+b.py", False, True),
+    ("a+b.py", "aab.py", False, None),
+])
+def test_pattern(pattern, path, is_dir, expected):
+    assert GitIgnore("", [pattern]).match(path, is_dir) is expected
+
+
+def test_negation_re_includes_and_last_rule_wins():
+    ignore = GitIgnore("", ["*.py", "!keep.py", "# a comment", "", "sub/keep.py"])
+    assert ignore.match("drop.py", False) is True
+    assert ignore.match("keep.py", False) is False
+    assert ignore.match("sub/keep.py", False) is True
+    assert ignore.match("README.md", False) is None
+
+
+def test_escaped_leading_characters():
+    ignore = GitIgnore("", ["\\!important.py", "\\#notes.md"])
+    assert ignore.match("!important.py", False) is True
+    assert ignore.match("#notes.md", False) is True
+
+
+def test_rules_are_relative_to_their_directory():
+    ignore = GitIgnore("pkg", ["/generated", "*.tmp"])
+    assert ignore.match("pkg/generated", True) is True
+    assert ignore.match("generated", True) is None
+    assert ignore.match("pkg/sub/x.tmp", False) is True
+    assert ignore.match("pkgx/y.tmp", False) is None
+
+
+def test_nested_gitignore_overrides_parent(tmp_path):
+    root = str(tmp_path)
+    _write(root, ".gitignore", "*.json\n")
+    _write(root, "config/.gitignore", "!settings.json\n")
+    assert is_path_ignored(root, "data.json")
+    assert is_path_ignored(root, "config/other.json")
+    assert not is_path_ignored(root, "config/settings.json")
+
+
+def test_files_in_ignored_directory_cannot_be_re_included(tmp_path):
+    root = str(tmp_path)
+    _write(root, ".gitignore", "build/\n!build/keep.py\n")
+    assert is_path_ignored(root, "build/keep.py")
+    assert not is_path_ignored(root, "src/build.py")
+
+
+def test_hidden_and_vendored_directories_are_ignored(tmp_path):
+    root = str(tmp_path)
+    assert is_path_ignored(root, ".github/workflow.yml")
+    assert is_path_ignored(root, "web/node_modules/pkg/index.js")
+    assert not is_path_ignored(root, "web/src/index.js")
@@ -0,0 +1,74 @@
+import sys
+import logging
+
+import pytest
+from adalflow.core.types import Document, RetrieverOutput
+
+from app.lexical_index import LexicalIndex
+from app.reranker import LexicalReranker, create_reranker
+
+CANDIDATES = [
+    ("README.md", "Run the app, then parse_config reads settings.", False, False),
+    ("tests/test_config.py", "def test_parse():\n    assert parse_config('a=1') == {'a': '1'}\n", True, False),
+    ("vendor/lib/config.py", "def parse_config(text):\n    return dict(line.split('=') for line in text)\n", True, True),
+    ("app/config.py", "def parse_config(text):\n    return dict(line.split('=') for line in text.splitlines())\n", True, True),
+    ("app/server.py", "def start_server(port):\n    return listen(port)\n", True, True),
+]
+
+
+def _output():
+    documents = [
+        Document(text=text, meta_data={"file_path": path, "is_code": code, "is_implementation": impl})
+        for path, text, code, impl in CANDIDATES
+    ]
+    return RetrieverOutput(doc_indices=list(range(len(documents))), doc_scores=None, query="q", documents=documents)
+
+
+def _paths(output):
+    return [doc.meta_data["file_path"] for doc in output.documents]
+
+
+def test_lexical_reranker_prefers_the_definition_in_implementation_code():
+    reranked = LexicalReranker()("where is parse_config defined", _output(), 3)
+    # The vendored copy defines it too but is penalized; the test, README and server only mention it or nothing
+    assert _paths(reranked)[:2] == ["app/config.py", "vendor/lib/config.py"]
+    assert reranked.doc_indices[:2] == [3, 2]
+    assert reranked.doc_scores == sorted(reranked.doc_scores, reverse=True)
+    assert "app/server.py" not in _paths(reranked)
+
+
+def test_asking_for_tests_lifts_the_test_penalty():
+    reranker = LexicalReranker()
+    assert _paths(reranker("where is parse_config defined", _output(), 5))[2:4] == ["README.md", "tests/test_config.py"]
+    assert _paths(reranker("how are tests for parse_config written", _output(), 5))[2:4] == ["tests/test_config.py", "README.md"]
+
+
+def test_lexical_reranker_is_deterministic_with_or_without_bm25():
+    reranker = LexicalReranker()
+    index = LexicalIndex.build([text for _, text, _, _ in CANDIDATES])
+    for lexical_index in (None, index):
+        first = reranker("where is parse_config defined", _output(), 5, lexical_index)
+        again = reranker("where is parse_config defined", _output(), 5, lexical_index)
+        assert again.doc_indices == first.doc_indices and again.doc_scores == first.doc_scores
+        assert _paths(first) == ["app/config.py", "vendor/lib/config.py", *_paths(first)[2:4], "app/server.py"]
+
+
+def test_lexical_reranker_without_candidates():
+    empty = RetrieverOutput(doc_indices=[], doc_scores=None, query="q", documents=[])
+    assert LexicalReranker()("anything", empty, 3).doc_indices == []
+
+
+def test_create_reranker():
+    assert create_reranker({"provider": "none", "candidates": 10}) is None
+    reranker = create_reranker({"provider": "lexical", "candidates": 10})
+    assert isinstance(reranker, LexicalReranker) and reranker.candidates == 10
+    with pytest.raises(ValueError):
+        create_reranker({"provider": "colbert", "candidates": 10})
+
+
+def test_cross_encoder_falls_back_to_lexical_without_sentence_transformers(monkeypatch, caplog):
+    monkeypatch.setitem(sys.modules, "sentence_transformers", None)  # makes the import fail
+    with caplog.at_level(logging.WARNING, logger="app.reranker"):
+        reranker = create_reranker({"provider": "cross-encoder", "model": "some/model", "candidates": 20})
+    assert isinstance(reranker, LexicalReranker) and reranker.candidates == 20
+    assert "lexical reranker" in caplog.text
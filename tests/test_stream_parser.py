@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from app.stream_parser import JSONFieldStreamParser
+
+PAYLOAD = json.dumps({
+    "meta": {"answer": "nested, not watched"},
+    "rationale": 'quotes " and \\ backslashes\n\ttabs / slashes',
+    "answer": "unicode café ☃ and a pair \U0001F600 end",
+}, ensure_ascii=True)
+
+
+def _parse(chunks):
+    parser = JSONFieldStreamParser()
+    deltas = [delta for chunk in chunks for delta in parser.feed(chunk)]
+    return parser, deltas
+
+
+def _joined(deltas, field):
+    return "".join(text for name, text in deltas if name == field)
+
+
+def test_whole_object():
+    parser, deltas = _parse([PAYLOAD])
+    expected = json.loads(PAYLOAD)
+    assert parser.values == {"rationale": expected["rationale"], "answer": expected["answer"]}
+    assert _joined(deltas, "answer") == expected["answer"]
+
+
+@pytest.mark.parametrize("cut", range(len(PAYLOAD) + 1))
+def test_split_at_every_offset(cut):
+    # Escapes and \uXXXX surrogate pairs cut in half must decode the same
+    parser, deltas = _parse([PAYLOAD[:cut], PAYLOAD[cut:]])
+    expected = json.loads(PAYLOAD)
+    assert parser.values["rationale"] == expected["rationale"]
+    assert parser.values["answer"] == expected["answer"]
+    assert _joined(deltas, "rationale") == expected["rationale"]
+
+
+def test_one_character_at_a_time():
+    parser, _ = _parse(list(PAYLOAD))
+    assert parser.values["answer"] == json.loads(PAYLOAD)["answer"]
+
+
+def test_text_around_the_object_is_skipped():
+    parser, _ = _parse(["Sure!\n```json\n", '{"answer": "42", "rationale": "because"}', "\n```"])
+    assert parser.values == {"rationale": "because", "answer": "42"}
+
+
+def test_keys_are_not_emitted_and_unwatched_fields_are_ignored():
+    parser, deltas = _parse(['{"other": "x", "answer": "y", "list": ["answer", {"answer": "z"}]}'])
+    assert deltas == [("answer", "y")]
+    assert parser.values["answer"] == "y"
+
+
+def test_deltas_are_merged_per_feed():
+    parser = JSONFieldStreamParser(fields=("answer",))
+    assert parser.feed('{"answer": "ab') == [("answer", "ab")]
+    assert parser.feed('c\\n') == [("answer", "c\n")]
+    assert parser.feed('"}') == []
+    assert parser.values == {"answer": "abc\n"}
@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+from adalflow.core.types import Document
+
+from app.dedup import ChunkDeduplicator
+from app.symbol_index import SymbolIndex, collect_symbols
+from app.vector_store import VectorStore
+
+FILES = {
+    "lib/util.py": "import os\n\n\ndef helper(x):\n    return x + 1\n",
+    "vendor/pkg/util.py": "# vendored copy\ndef helper(x):\n    return x + 1\n",
+}
+
+
+def _chunk(path, start, end):
+    text = "".join(FILES[path].splitlines(keepends=True)[start - 1:end])
+    return Document(text=text, meta_data={"file_path": path, "start_line": start, "end_line": end})
+
+
+def _index(tmp_path, chunks):
+    store = VectorStore.write(os.path.join(tmp_path, "repo.store"), chunks, vectors=np.zeros((len(chunks), 4)))
+    files = {}
+    for _ in collect_symbols([Document(text=text, meta_data={"file_path": path}) for path, text in FILES.items()], files):
+        pass
+    return SymbolIndex.build(files, store), store
+
+
+def test_deduplicated_chunk_is_found_at_each_copys_own_lines(tmp_path):
+    chunks = [
+        _chunk("lib/util.py", 1, 1),
+        _chunk("lib/util.py", 4, 5),
+        _chunk("vendor/pkg/util.py", 1, 1),
+        _chunk("vendor/pkg/util.py", 2, 3),
+    ]
+    kept = ChunkDeduplicator(near_duplicates=False)(chunks)
+    assert len(kept) == 3
+    assert kept[1].meta_data["line_ranges"] == {"lib/util.py": [4, 5], "vendor/pkg/util.py": [2, 3]}
+    index, store = _index(tmp_path, kept)
+
+    helper = 1
+    assert index.chunk_at("lib/util.py", 4) == helper
+    assert index.chunk_at("vendor/pkg/util.py", 2) == helper
+    assert index.chunk_at("vendor/pkg/util.py", 1) == 2  # not shadowed by the canonical copy's lines
+    assert index.chunk_at("vendor/pkg/util.py", 4) is None
+    assert index.definition_chunks("helper") == [helper]
+
+
+def test_chunks_without_per_file_ranges_index_only_their_canonical_file(tmp_path):
+    # Stores written before ranges were recorded per file
+    chunk = _chunk("lib/util.py", 4, 5)
+    chunk.meta_data["file_paths"] = ["lib/util.py", "vendor/pkg/util.py"]
+    index, _ = _index(tmp_path, [chunk])
+    assert index.chunks == {"lib/util.py": [[4, 5, 0]]}
@@ -0,0 +1,96 @@
+import re
+
+from fastapi.testclient import TestClient
+
+from app.telemetry import MetricsRegistry, STAGE_SECONDS, render_metrics, span
+
+# One sample line of the Prometheus text format: name, optional labels, value
+_SAMPLE_RE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_]\w*="(\\.|[^"\\])*",?)*\})? ([-+0-9.eE]+|[-+]Inf|NaN)$')
+
+
+def _assert_exposition_format(text: str):
+    assert text.endswith("\n")
+    declared = {}
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert kind in ("counter", "gauge", "histogram")
+            declared[name] = kind
+            continue
+        assert _SAMPLE_RE.match(line), line
+        name = line.split("{")[0].split(" ")[0]
+        family = re.sub(r"_(bucket|sum|count)$", "", name) if name not in declared else name
+        assert family in declared, f"{name} has no TYPE line"
+
+
+def test_counter_rendering_and_label_escaping():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests.", ("route", "status"))
+    counter.inc(route="/query", status="200")
+    counter.inc(2, route="/query", status="200")
+    counter.inc(route='/a"b\\c\nd', status="500")
+    assert registry.counter("requests_total", "Requests.", ("route", "status")) is counter  # registered once
+    assert counter.value(route="/query", status="200") == 3
+
+    text = registry.render()
+    _assert_exposition_format(text)
+    assert text.splitlines() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a\\"b\\\\c\\nd",status="500"} 1',
+        'requests_total{route="/query",status="200"} 3',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1, 10))
+    for value in (0.05, 0.1, 0.5, 20):
+        histogram.observe(value, stage="search")
+
+    text = registry.render()
+    _assert_exposition_format(text)
+    assert text.splitlines()[2:] == [
+        'latency_seconds_bucket{stage="search",le="0.1"} 2',  # bounds are inclusive
+        'latency_seconds_bucket{stage="search",le="1"} 3',
+        'latency_seconds_bucket{stage="search",le="10"} 3',
+        'latency_seconds_bucket{stage="search",le="+Inf"} 4',
+        'latency_seconds_sum{stage="search"} 20.65',
+        'latency_seconds_count{stage="search"} 4',
+    ]
+
+
+def test_gauges_are_read_at_scrape_time_and_failures_are_skipped():
+    registry = MetricsRegistry()
+    values = [1]
+    registry.gauge("loaded", "Loaded.", lambda: values[-1])
+    registry.gauge("broken", "Broken.", lambda: 1 / 0)
+    values.append(7)
+    assert registry.render() == "# HELP loaded Loaded.\n# TYPE loaded gauge\nloaded 7\n"
+    registry.gauge("loaded", "Loaded.", lambda: 2)  # replaced, not duplicated
+    assert registry.render().count("# TYPE loaded") == 1
+
+
+def test_spans_feed_the_stage_histogram():
+    before = STAGE_SECONDS._series.get(("test_stage",), (None, [0.0, 0]))[1][1]
+    with span("test_stage"):
+        pass
+    assert STAGE_SECONDS._series[("test_stage",)][1][1] == before + 1
+    assert 'githubchat_stage_duration_seconds_count{stage="test_stage"}' in render_metrics()
+
+
+def test_metrics_endpoint():
+    from backend.main import app
+
+    client = TestClient(app)
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    _assert_exposition_format(response.text)
+    assert "# TYPE githubchat_http_requests_total counter" in response.text
+    assert 'githubchat_http_requests_total{method="GET",route="/health",status="200"}' in response.text
+    assert "# TYPE githubchat_http_request_duration_seconds histogram" in response.text
+    assert "# TYPE githubchat_loaded_indexes gauge" in response.text
@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+import pytest
+from adalflow.core.types import Document
+
+from app.config import config
+from app.vector_store import VectorStore, _quantize_int8
+
+
+def _vectors(count=64, dim=48, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, dim)).astype(np.float32)
+    vectors[:, 0] *= 10  # one dominant component sets the row's scale
+    return vectors * rng.uniform(0.1, 5, size=(count, 1)).astype(np.float32)
+
+
+def _unit(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _documents(count):
+    return [Document(text=f"chunk {i} ✓", meta_data={"file_path": f"f{i}.py"}) for i in range(count)]
+
+
+def test_quantize_int8_error_bound():
+    vectors = _vectors()
+    codes, scales = _quantize_int8(vectors)
+    assert codes.dtype == np.int8 and scales.dtype == np.float32
+    unit = _unit(vectors)
+    restored = codes.astype(np.float32) * scales[:, None]
+    # Rounding to the nearest step: at most half a step per component, a step being max|row| / 127
+    bound = np.abs(unit).max(axis=1) / 254
+    assert np.all(np.abs(restored - unit).max(axis=1) <= bound + 1e-7)
+    assert np.abs(codes).max(axis=1).tolist() == [127] * len(codes)
+
+
+def test_quantize_int8_preserves_directions():
+    vectors = _vectors(dim=768)
+    codes, scales = _quantize_int8(vectors)
+    restored = codes.astype(np.float32) * scales[:, None]
+    cosines = np.sum(_unit(restored) * _unit(vectors), axis=1)
+    assert cosines.min() > 0.999
+
+
+def test_quantize_int8_zero_row():
+    codes, scales = _quantize_int8(np.zeros((2, 4), dtype=np.float32))
+    assert not codes.any()
+    assert np.all(scales == 1)
+
+
+@pytest.mark.parametrize("dtype, tolerance", [("float32", 0), ("float16", 1e-3), ("int8", 1e-2)])
+def test_write_and_open_round_trip(tmp_path, dtype, tolerance):
+    vectors = _unit(_vectors(count=10, dim=16))
+    documents = _documents(10)
+    path = os.path.join(tmp_path, "repo.store")
+    VectorStore.write(path, documents, dtype=dtype, vectors=vectors)
+    store = VectorStore.open(path)
+
+    assert len(store) == 10 and store.dim == 16
+    assert store.vectors.dtype == np.dtype(dtype)
+    assert os.path.exists(os.path.join(path, "scales.npy")) == (dtype == "int8")
+    np.testing.assert_allclose(store.vector_matrix(), vectors, atol=tolerance)
+    rows = np.array([7, 2, 9])
+    np.testing.assert_array_equal(store.vector_rows(rows), store.vector_matrix()[rows])
+    np.testing.assert_array_equal(store.vector_rows(slice(3, 5)), store.vector_matrix()[3:5])
+    assert [doc.text for doc in store.documents()] == [doc.text for doc in documents]
+    assert store.document(-1).meta_data == {"file_path": "f9.py"}
+
+
+def test_write_replaces_store_and_rejects_unknown_dtype(tmp_path):
+    path = os.path.join(tmp_path, "repo.store")
+    VectorStore.write(path, _documents(3), vectors=_vectors(count=3, dim=8))
+    store = VectorStore.write(path, _documents(2), dtype="int8", vectors=_vectors(count=2, dim=8))
+    assert len(store) == 2 and store.vectors.dtype == np.int8
+    assert sorted(os.listdir(tmp_path)) == ["repo.store"]
+    with pytest.raises(ValueError):
+        VectorStore.write(path, _documents(1), dtype="int4", vectors=_vectors(count=1, dim=8))
+
+
+def test_empty_store(tmp_path):
+    path = os.path.join(tmp_path, "repo.store")
+    store = VectorStore.write(path, [], dtype="int8", vectors=np.zeros((0, 8), dtype=np.float32))
+    assert len(store) == 0
+    assert list(store.documents()) == []
+
+
+def test_empty_store_without_vectors_has_the_configured_width(tmp_path):
+    path = os.path.join(tmp_path, "repo.store")
+    VectorStore.write(path, [])
+    store = VectorStore.open(path)
+    assert len(store) == 0 and store.dim == config["embedder"]["dimensions"]
+    assert store.vector_matrix().shape == (0, store.dim)